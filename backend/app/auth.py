@@ -1,19 +1,161 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import httpx
 from fastapi import Header, HTTPException
 from jose import jwt
 from dotenv import load_dotenv
-import os
 
-load_dotenv() 
-JWT_SECRET = os.getenv("JWT_SECRET") # ou vérifier via signing keys selon ta config
+from app.metrics import log_event
+
+load_dotenv()
+JWT_SECRET = os.getenv("JWT_SECRET")  # legacy shared secret (HS256)
 JWT_ALG = "HS256"
+# Asymmetric Supabase signing keys (RS256 / ES256), published as a JWKS
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_JWKS_URL = os.getenv(
+    "SUPABASE_JWKS_URL", f"{(SUPABASE_URL or '').rstrip('/')}/auth/v1/.well-known/jwks.json"
+)
+JWKS_REFRESH_SECONDS = int(os.getenv("JWKS_REFRESH_SECONDS", "600"))
+# An unknown key id triggers at most one refetch per this interval (key rotation)
+JWKS_MIN_REFETCH_SECONDS = 30
+AUTH_CACHE_ENTRIES = int(os.getenv("AUTH_CACHE_ENTRIES", "10000"))
+
+ASYMMETRIC_ALGS = ("RS256", "ES256")
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified tokens: sha256(token) -> claims, until the token's `exp`.
+
+    Only the hash of the token is kept, so a memory dump doesn't leak usable tokens.
+    """
+
+    def __init__(self, max_entries: int = AUTH_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # hash -> (claims, expires_at)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def put(self, token: str, claims: Dict) -> None:
+        expires_at = claims.get("exp")
+        if not expires_at:
+            return  # never cache a token that doesn't expire
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, float(expires_at))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
+
+
+class JWKSCache:
+    """Supabase's public signing keys by key id, fetched at startup and refreshed in the background."""
+
+    def __init__(self, url: str = SUPABASE_JWKS_URL, refresh_seconds: int = JWKS_REFRESH_SECONDS):
+        self.url = url
+        self.refresh_seconds = refresh_seconds
+        self.keys: Dict[str, Dict] = {}
+        self.fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> None:
+        async with self._lock:
+            self.fetched_at = time.time()
+            try:
+                async with httpx.AsyncClient(timeout=10) as client:
+                    res = await client.get(self.url)
+                    res.raise_for_status()
+                keys = res.json().get("keys", [])
+            except Exception as e:
+                log_event("jwks refresh failed", url=self.url, error=str(e))
+                return
+            self.keys = {key["kid"]: key for key in keys if "kid" in key}
+
+    async def get(self, kid: str) -> Optional[Dict]:
+        key = self.keys.get(kid)
+        if key is None and time.time() - self.fetched_at > JWKS_MIN_REFETCH_SECONDS:
+            # Keys were probably rotated since the last refresh
+            await self.refresh()
+            key = self.keys.get(kid)
+        return key
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self.refresh()
+
+    async def start(self) -> None:
+        if not self.url.startswith("http"):
+            return  # no Supabase URL: HS256 tokens only
+        await self.refresh()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+
+token_cache = TokenCache()
+jwks = JWKSCache()
+
+
+async def verify_token(token: str) -> Dict:
+    """Claims of a valid token; raises on a bad signature, an expired token or an unknown key."""
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+    if alg == JWT_ALG and JWT_SECRET:
+        key = JWT_SECRET
+    elif alg in ASYMMETRIC_ALGS:
+        key = await jwks.get(header.get("kid", ""))
+        if key is None:
+            raise ValueError(f"Unknown signing key {header.get('kid')!r}")
+    else:
+        raise ValueError(f"Unsupported token algorithm {alg!r}")
+
+    claims = jwt.decode(token, key, algorithms=[alg], options={"verify_aud": False})
+    token_cache.put(token, claims)
+    return claims
+
 
-def get_current_user_id(authorization: str = Header(...)) -> str:
+async def get_current_user_id(authorization: str = Header(...)) -> str:
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing Bearer token")
     token = authorization.split(" ", 1)[1]
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG], options={"verify_aud": False})
+        payload = await verify_token(token)
         return payload["sub"]
     except Exception as e:
-        print(f"Token validation error: {e}")
+        log_event("token validation error", error=str(e))
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
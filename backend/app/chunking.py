@@ -0,0 +1,132 @@
+import math
+import os
+import re
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover
+    tiktoken = None  # type: ignore
+
+# Token budget of the transcript part of one LLM call, per model
+CHUNK_TOKEN_BUDGETS = {
+    "gpt-4o-mini": 5000,
+    "gpt-4o": 5000,
+}
+DEFAULT_CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", "5000"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "150"))
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    """tiktoken encoding for `model`, or None when unavailable (not installed / offline)."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            return None
+    except Exception:
+        # Encodings are downloaded on first use; no network means no tokenizer
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Offline token estimate: BPE tokenizers use about one token per short word
+    or punctuation mark, and one extra token per ~4 characters of longer words
+    (which is what makes French transcripts cost more than English ones).
+    """
+    tokens = 0
+    for word in _WORD_RE.findall(text):
+        tokens += max(1, math.ceil(len(word) / 4))
+    return tokens
+
+
+def get_token_counter(model: str) -> Callable[[str], int]:
+    """Return a `text -> token count` function for `model`."""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return estimate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def chunk_token_budget(model: str) -> int:
+    return CHUNK_TOKEN_BUDGETS.get(model, DEFAULT_CHUNK_TOKEN_BUDGET)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s for s in _SENTENCE_RE.split(text) if s]
+
+
+def pack_lines(
+    lines: List[str],
+    counts: List[int],
+    max_tokens: int,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    count_tokens: Optional[Callable[[str], int]] = None,
+) -> List[str]:
+    """
+    Greedily pack lines (one per segment) into chunks of at most `max_tokens`.
+
+    `counts` holds the precomputed token count of each line, so packing is a
+    single pass of additions. Chunks never break inside a segment, except for a
+    segment that is larger than the whole budget on its own, which is split at
+    sentence boundaries. The last lines of a chunk (up to `overlap_tokens`) are
+    repeated at the start of the next one to keep context across boundaries.
+    """
+    count_tokens = count_tokens or estimate_tokens
+    chunks: List[str] = []
+    current: List[str] = []
+    current_counts: List[int] = []
+    current_tokens = 0
+    fresh = 0  # lines added since the last flush (the rest is overlap)
+
+    def flush() -> None:
+        nonlocal current, current_counts, current_tokens, fresh
+        chunks.append("\n".join(current))
+        # Carry the tail of the chunk over as overlap
+        keep = 0
+        carried_tokens = 0
+        for n in reversed(current_counts):
+            if carried_tokens + n > overlap_tokens or keep + 1 >= len(current):
+                break
+            carried_tokens += n
+            keep += 1
+        current = current[len(current) - keep:] if keep else []
+        current_counts = current_counts[len(current_counts) - keep:] if keep else []
+        current_tokens = carried_tokens
+        fresh = 0
+
+    def add(line: str, n: int) -> None:
+        nonlocal current_tokens, fresh
+        if current_tokens + n > max_tokens and fresh > 0:
+            flush()
+        # Drop the overlap if it would prevent this line from fitting
+        while current and current_tokens + n > max_tokens:
+            current_tokens -= current_counts.pop(0)
+            current.pop(0)
+        current.append(line)
+        current_counts.append(n)
+        current_tokens += n
+        fresh += 1
+
+    for line, n in zip(lines, counts):
+        pieces = split_sentences(line) if n > max_tokens else [line]
+        if len(pieces) > 1:
+            for piece in pieces:
+                add(piece, count_tokens(piece))
+        else:
+            add(line, n)
+
+    if fresh > 0:
+        chunks.append("\n".join(current))
+
+    return chunks
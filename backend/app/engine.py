@@ -0,0 +1,112 @@
+import asyncio
+import multiprocessing
+import os
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+
+from app.metrics import stage_duration
+from app.transcription import init_worker, ping, run_timed
+
+# Engine configuration (overridable via .env)
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "2"))
+# Torch intra-op threads per worker; by default the cores are split evenly between workers
+TORCH_THREADS_PER_WORKER = int(os.getenv(
+    "TORCH_THREADS_PER_WORKER", str(max(1, (os.cpu_count() or 1) // TRANSCRIBE_WORKERS))
+))
+ENGINE_METRICS_WINDOW = 1000
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class TranscriptionEngine:
+    """
+    Pool of worker processes, each holding its own Whisper models.
+
+    Every task is timed on both sides of the process boundary, so the engine
+    can report how long tasks waited for a free worker vs. how long they
+    actually computed.
+    """
+
+    def __init__(
+        self,
+        workers: int = TRANSCRIBE_WORKERS,
+        threads_per_worker: int = TORCH_THREADS_PER_WORKER,
+        model_loader: Optional[Callable[[str], object]] = None,
+    ):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        # Replaces whisper.load_model in the workers (load tests); set before start()
+        self.model_loader = model_loader
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._queue_wait = deque(maxlen=ENGINE_METRICS_WINDOW)
+        self._compute = deque(maxlen=ENGINE_METRICS_WINDOW)
+        self._completed = 0
+        self._failed = 0
+
+    def start(self) -> None:
+        # 'spawn' avoids forking a process that already holds threads and sockets
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(self.threads_per_worker, self.model_loader),
+        )
+        # Spawn the workers now so model warm-up starts right after startup
+        for _ in range(self.workers):
+            self.pool.submit(ping)
+
+    def shutdown(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable, *args):
+        """Run `fn(*args)` in a worker process and record its wait/compute times."""
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        self._in_flight += 1
+        try:
+            result, started_at, finished_at = await loop.run_in_executor(self.pool, run_timed, fn, *args)
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+        self._completed += 1
+        self._queue_wait.append(started_at - submitted_at)
+        self._compute.append(finished_at - started_at)
+        stage_duration.observe(started_at - submitted_at, stage="engine_queue_wait")
+        stage_duration.observe(finished_at - started_at, stage=f"worker:{fn.__name__}")
+        return result
+
+    def stats(self) -> Dict:
+        wait = list(self._queue_wait)
+        compute = list(self._compute)
+        return {
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "failed": self._failed,
+            "queue_wait_seconds": {
+                "mean": statistics.fmean(wait) if wait else 0.0,
+                "p50": _percentile(wait, 50),
+                "p95": _percentile(wait, 95),
+            },
+            "compute_seconds": {
+                "mean": statistics.fmean(compute) if compute else 0.0,
+                "p50": _percentile(compute, 50),
+                "p95": _percentile(compute, 95),
+            },
+        }
+
+
+engine = TranscriptionEngine()
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+# Finished channels are kept this long so late subscribers can still replay them
+JOB_EVENTS_TTL_SECONDS = 600
+KEEPALIVE_SECONDS = 15
+
+Event = Tuple[str, dict]
+
+
+class _Channel:
+    def __init__(self):
+        self.history: List[Event] = []
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.closed_at: Optional[float] = None
+
+
+class JobEvents:
+    """
+    In-process pub/sub of job progress events.
+
+    Every event is kept in the channel history, so a client connecting in the
+    middle of a job first receives what it missed, then live events.
+    """
+
+    def __init__(self, ttl: int = JOB_EVENTS_TTL_SECONDS):
+        self.ttl = ttl
+        self._channels: Dict[str, _Channel] = {}
+
+    def _channel(self, job_id: str) -> _Channel:
+        channel = self._channels.get(job_id)
+        if channel is None:
+            channel = self._channels[job_id] = _Channel()
+        return channel
+
+    def _purge(self) -> None:
+        now = time.time()
+        expired = [
+            job_id for job_id, channel in self._channels.items()
+            if channel.closed_at is not None and now - channel.closed_at > self.ttl and not channel.subscribers
+        ]
+        for job_id in expired:
+            del self._channels[job_id]
+
+    def has(self, job_id: str) -> bool:
+        return job_id in self._channels
+
+    def publish(self, job_id: str, event: str, data: dict) -> None:
+        channel = self._channel(job_id)
+        channel.history.append((event, data))
+        for queue in channel.subscribers:
+            queue.put_nowait((event, data))
+
+    def close(self, job_id: str) -> None:
+        """Mark the job as finished: subscribers stop after the last event."""
+        channel = self._channel(job_id)
+        channel.closed_at = time.time()
+        for queue in channel.subscribers:
+            queue.put_nowait(None)
+        self._purge()
+
+    async def subscribe(self, job_id: str, keepalive: float = KEEPALIVE_SECONDS) -> AsyncIterator[Optional[Event]]:
+        """
+        Yield past then live events until the job is closed.
+
+        Yields None every `keepalive` seconds without events, so callers can
+        send a keep-alive and check that the job is still running.
+        """
+        channel = self._channel(job_id)
+        # Events published from here on (even during the replay) go to the queue
+        history, closed = list(channel.history), channel.closed_at is not None
+        queue: asyncio.Queue = asyncio.Queue()
+        channel.subscribers.add(queue)
+        try:
+            for event in history:
+                yield event
+            if closed:
+                return
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if item is None:
+                    return
+                yield item
+        finally:
+            channel.subscribers.discard(queue)
+
+
+job_events = JobEvents()
@@ -0,0 +1,429 @@
+"""
+Transcript and summary exports: SRT, WebVTT, Markdown, plain text, DOCX and PDF.
+
+Every renderer is an async generator of byte chunks fed by an async source
+of segments (fetched page by page with `db.iter_segments`) or summary lines,
+so the API can stream a 10k-segment transcript without ever holding it in
+memory. DOCX and PDF are written by hand for the same reason: the DOCX
+document part goes through a zip stream with data descriptors, and the PDF
+writer emits each page as soon as it is full and the page tree last.
+
+Finished artifacts are kept on disk by ExportCache under a key derived from
+their content, so repeat downloads are a file read.
+"""
+import asyncio
+import io
+import os
+import textwrap
+import time
+import unicodedata
+import zipfile
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", "export_cache")
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+
+TRANSCRIPT_FORMATS = ("srt", "vtt", "md", "txt", "docx", "pdf")
+SUMMARY_FORMATS = ("md", "txt", "docx", "pdf")
+
+MEDIA_TYPES = {
+    "srt": "application/x-subrip",
+    "vtt": "text/vtt; charset=utf-8",
+    "md": "text/markdown; charset=utf-8",
+    "txt": "text/plain; charset=utf-8",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf",
+}
+
+# (style, text), style being one of "title", "heading", "bullet", "body"
+Paragraph = Tuple[str, str]
+SegmentPages = AsyncIterator[List[Dict]]
+
+
+def timestamp(seconds: float, separator: str = ",") -> str:
+    """HH:MM:SS,mmm (SRT) or HH:MM:SS.mmm (WebVTT)."""
+    millis = int(round(float(seconds) * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def clock(seconds: float) -> str:
+    return timestamp(seconds)[:8]
+
+
+# Text formats ---------------------------------------------------------
+# One string per page of segments, so chunks stay reasonably large.
+
+async def render_srt(title: str, pages: SegmentPages) -> AsyncIterator[str]:
+    index = 0
+    async for page in pages:
+        parts = []
+        for seg in page:
+            index += 1
+            parts.append(
+                f"{index}\n{timestamp(seg['start_seconds'])} --> {timestamp(seg['end_seconds'])}\n{seg['text'].strip()}\n\n"
+            )
+        yield "".join(parts)
+
+
+async def render_vtt(title: str, pages: SegmentPages) -> AsyncIterator[str]:
+    yield "WEBVTT\n\n"
+    async for page in pages:
+        yield "".join(
+            f"{timestamp(seg['start_seconds'], '.')} --> {timestamp(seg['end_seconds'], '.')}\n{seg['text'].strip()}\n\n"
+            for seg in page
+        )
+
+
+async def render_transcript_md(title: str, pages: SegmentPages) -> AsyncIterator[str]:
+    yield f"# {title}\n\n"
+    async for page in pages:
+        yield "".join(f"**[{clock(seg['start_seconds'])}]** {seg['text'].strip()}\n\n" for seg in page)
+
+
+async def render_transcript_txt(title: str, pages: SegmentPages) -> AsyncIterator[str]:
+    yield f"{title}\n\n"
+    async for page in pages:
+        yield "".join(f"[{clock(seg['start_seconds'])}] {seg['text'].strip()}\n" for seg in page)
+
+
+async def transcript_paragraphs(title: str, pages: SegmentPages) -> AsyncIterator[Paragraph]:
+    yield "title", title
+    async for page in pages:
+        for seg in page:
+            yield "body", f"[{clock(seg['start_seconds'])}] {seg['text'].strip()}"
+
+
+async def summary_paragraphs(title: str, text: str) -> AsyncIterator[Paragraph]:
+    """Markdown summary -> paragraphs: '#' headings, '-'/'*' bullets, the rest as body text."""
+    yield "title", title
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            yield "heading", line.lstrip("#").strip()
+        elif line.startswith(("- ", "* ")):
+            yield "bullet", line[2:].replace("**", "")
+        else:
+            yield "body", line.replace("**", "")
+
+
+async def summary_text_chunks(title: str, text: str, format: str) -> AsyncIterator[str]:
+    if format == "md":
+        yield f"# {title}\n\n{text}\n"
+    else:
+        async for style, line in summary_paragraphs(title, text):
+            prefix = "• " if style == "bullet" else ""
+            yield f"{prefix}{line}\n" + ("\n" if style in ("title", "heading") else "")
+
+
+# DOCX -----------------------------------------------------------------
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable stream collecting what zipfile writes, drained between yields."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+DOCX_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+</Types>"""
+
+DOCX_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+DOCX_DOCUMENT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+DOCX_STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:pPr><w:spacing w:after="120"/></w:pPr><w:rPr><w:sz w:val="22"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/><w:pPr><w:spacing w:after="240"/></w:pPr><w:rPr><w:b/><w:sz w:val="40"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/><w:pPr><w:spacing w:before="240"/></w:pPr><w:rPr><w:b/><w:sz w:val="28"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="ListBullet"><w:name w:val="List Bullet"/><w:basedOn w:val="Normal"/><w:pPr><w:ind w:left="360" w:hanging="360"/></w:pPr></w:style>
+</w:styles>"""
+
+DOCX_STYLE_IDS = {"title": "Title", "heading": "Heading1", "bullet": "ListBullet", "body": "Normal"}
+
+
+def docx_paragraph(style: str, text: str) -> str:
+    if style == "bullet":
+        text = "• " + text
+    return (
+        f'<w:p><w:pPr><w:pStyle w:val="{DOCX_STYLE_IDS[style]}"/></w:pPr>'
+        f'<w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+    )
+
+
+async def render_docx(paragraphs: AsyncIterator[Paragraph], batch: int = 200) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", DOCX_CONTENT_TYPES)
+        zf.writestr("_rels/.rels", DOCX_RELS)
+        zf.writestr("word/_rels/document.xml.rels", DOCX_DOCUMENT_RELS)
+        zf.writestr("word/styles.xml", DOCX_STYLES)
+        yield sink.drain()
+
+        with zf.open("word/document.xml", "w", force_zip64=True) as document:
+            document.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+            )
+            pending: List[str] = []
+            async for style, text in paragraphs:
+                pending.append(docx_paragraph(style, text))
+                if len(pending) >= batch:
+                    document.write("".join(pending).encode("utf-8"))
+                    pending.clear()
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+            document.write("".join(pending).encode("utf-8"))
+            document.write(b"</w:body></w:document>")
+    yield sink.drain()
+
+
+# PDF ------------------------------------------------------------------
+
+class PdfWriter:
+    """
+    Minimal streaming PDF: A4 pages, the standard Helvetica fonts (WinAnsi,
+    so accented Latin text renders), text wrapped on an average glyph width.
+
+    Objects 1-4 are the catalog, the page tree and the two fonts; the page
+    tree is written last, once all the pages it lists are known.
+    """
+
+    WIDTH, HEIGHT, MARGIN = 595, 842, 56
+    STYLES = {"title": ("F2", 18, 28), "heading": ("F2", 13, 22), "bullet": ("F1", 10, 14), "body": ("F1", 10, 14)}
+
+    def __init__(self):
+        self.offsets: Dict[int, int] = {}
+        self.position = 0
+        self.next_id = 5
+        self.page_ids: List[int] = []
+        self.lines: List[str] = []
+        self.y = self.HEIGHT - self.MARGIN
+
+    def _object(self, number: int, body: bytes) -> bytes:
+        self.offsets[number] = self.position
+        data = f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+        self.position += len(data)
+        return data
+
+    @staticmethod
+    def _text(text: str) -> str:
+        encoded = text.encode("cp1252", "replace").decode("latin-1")
+        return encoded.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    def header(self) -> bytes:
+        data = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        self.position = len(data)
+        data += self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        data += self._object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        data += self._object(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+        return data
+
+    def add(self, style: str, text: str) -> bytes:
+        """Lay out one paragraph; returns the pages it completed, if any."""
+        font, size, leading = self.STYLES[style]
+        indent = 14 if style == "bullet" else 0
+        width = int((self.WIDTH - 2 * self.MARGIN - indent) / (size * 0.5))
+        wrapped = textwrap.wrap(text, width) or [""]
+        if style == "bullet":
+            wrapped[0] = "• " + wrapped[0]
+        out = b""
+        for i, line in enumerate(wrapped):
+            if self.y - leading < self.MARGIN:
+                out += self.flush_page()
+            self.y -= leading
+            x = self.MARGIN + (indent if i or style != "bullet" else 0)
+            self.lines.append(f"BT /{font} {size} Tf 1 0 0 1 {x} {self.y} Tm ({self._text(line)}) Tj ET")
+        self.y -= leading * 0.4
+        return out
+
+    def flush_page(self) -> bytes:
+        if not self.lines:
+            return b""
+        content = "\n".join(self.lines).encode("latin-1")
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        self.lines = []
+        self.y = self.HEIGHT - self.MARGIN
+        return self._object(
+            content_id, f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream"
+        ) + self._object(
+            page_id,
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.WIDTH} {self.HEIGHT}] /Contents {content_id} 0 R "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>".encode(),
+        )
+
+    def trailer(self) -> bytes:
+        if not self.page_ids and not self.lines:
+            self.lines.append("")  # an empty export is still a one-page document
+        data = self.flush_page()
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        data += self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        xref_at = self.position
+        entries = ["0000000000 65535 f "] + [f"{self.offsets[n]:010d} 00000 n " for n in range(1, self.next_id)]
+        data += (
+            f"xref\n0 {self.next_id}\n" + "\n".join(entries) + "\n"
+            f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n"
+        ).encode()
+        return data
+
+
+async def render_pdf(paragraphs: AsyncIterator[Paragraph]) -> AsyncIterator[bytes]:
+    writer = PdfWriter()
+    yield writer.header()
+    async for style, text in paragraphs:
+        pages = writer.add(style, text)
+        if pages:
+            yield pages
+    yield writer.trailer()
+
+
+# Entry points ---------------------------------------------------------
+
+async def _encode(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        yield chunk.encode("utf-8")
+
+
+TRANSCRIPT_TEXT_RENDERERS = {
+    "srt": render_srt,
+    "vtt": render_vtt,
+    "md": render_transcript_md,
+    "txt": render_transcript_txt,
+}
+
+
+def render_transcript(title: str, pages: SegmentPages, format: str) -> AsyncIterator[bytes]:
+    if format == "docx":
+        return render_docx(transcript_paragraphs(title, pages))
+    if format == "pdf":
+        return render_pdf(transcript_paragraphs(title, pages))
+    return _encode(TRANSCRIPT_TEXT_RENDERERS[format](title, pages))
+
+
+def render_summary(title: str, text: str, format: str) -> AsyncIterator[bytes]:
+    if format == "docx":
+        return render_docx(summary_paragraphs(title, text))
+    if format == "pdf":
+        return render_pdf(summary_paragraphs(title, text))
+    return _encode(summary_text_chunks(title, text, format))
+
+
+class ExportCache:
+    """
+    Rendered exports on disk, by content key, bounded in total size (least
+    recently downloaded evicted first). An export is written to the cache
+    while it streams to the first client and only kept if it completes.
+    """
+
+    def __init__(self, directory: str = EXPORT_CACHE_DIR, max_bytes: int = EXPORT_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def path(self, key: str) -> Path:
+        return self.directory / key
+
+    def get(self, key: str) -> Optional[Path]:
+        path = self.path(key)
+        if not path.exists():
+            self.stats["misses"] += 1
+            return None
+        os.utime(path)  # recency for eviction
+        self.stats["hits"] += 1
+        return path
+
+    async def tee(self, key: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        tmp = self.path(f"{key}.{os.getpid()}.{time.monotonic_ns()}.tmp")
+        complete = False
+        f = await asyncio.to_thread(tmp.open, "wb")
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(f.write, chunk)
+                yield chunk
+            complete = True
+        finally:
+            await asyncio.to_thread(f.close)
+            if complete:
+                await asyncio.to_thread(self._commit, tmp, key)
+            else:
+                # Client went away mid-download: don't keep a truncated file
+                await asyncio.to_thread(tmp.unlink, missing_ok=True)
+
+    def _commit(self, tmp: Path, key: str) -> None:
+        os.replace(tmp, self.path(key))
+        self._evict()
+
+    def _evict(self) -> None:
+        files = [(p.stat().st_mtime, p.stat().st_size, p) for p in self.directory.iterdir() if not p.name.endswith(".tmp")]
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files, key=lambda f: f[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.stats["evictions"] += 1
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
+
+
+async def iterate_file(path: Path, chunk_size: int = 256 * 1024) -> AsyncIterator[bytes]:
+    """A file's bytes, read in a worker thread so the event loop never waits on the disk."""
+    f = await asyncio.to_thread(path.open, "rb")
+    try:
+        while chunk := await asyncio.to_thread(f.read, chunk_size):
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+def content_disposition(title: str, format: str) -> str:
+    """
+    `attachment` header for `title`: an ASCII `filename=` fallback (header
+    values are latin-1, and old clients only read this one) plus the exact
+    UTF-8 name in an RFC 5987 `filename*=`.
+    """
+    name = "".join(c if c.isalnum() or c in " -_." else "_" for c in title).strip() or "export"
+    # Accents are dropped ("réunion" -> "reunion"); anything else non-ASCII becomes "_"
+    folded = "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c))
+    fallback = "".join(c if c.isascii() else "_" for c in folded)
+    return f"attachment; filename=\"{fallback}.{format}\"; filename*=UTF-8''{quote(f'{name}.{format}', safe='')}"
+
+
+export_cache = ExportCache()
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.engine import TranscriptionEngine, engine
+from app.events import job_events
+from app.metrics import log_event
+
+# Queue configuration (overridable via .env)
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.db")
+# 'fifo' or 'sjf' (shortest audio first, with aging so long jobs are not starved)
+JOB_SCHEDULING = os.getenv("JOB_SCHEDULING", "fifo")
+# SJF aging: seconds of audio forgiven per second spent waiting in the queue
+JOB_SJF_AGING = float(os.getenv("JOB_SJF_AGING", "1.0"))
+JOB_QUEUE_MAX_SIZE = int(os.getenv("JOB_QUEUE_MAX_SIZE", "20"))
+JOB_RETRY_AFTER_SECONDS = int(os.getenv("JOB_RETRY_AFTER_SECONDS", "30"))
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has reached its maximum size."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """
+    Persistent job queue backed by a local SQLite database.
+
+    Jobs are claimed oldest first, or shortest audio first when `scheduling`
+    is 'sjf'; the SJF priority improves with waiting time to avoid starvation.
+
+    Jobs survive a restart of the API: anything left in 'running' is put back
+    in 'queued' by `requeue_running()` when the dispatcher starts.
+    """
+
+    def __init__(
+        self,
+        db_path: str = JOBS_DB_PATH,
+        max_size: int = JOB_QUEUE_MAX_SIZE,
+        scheduling: str = JOB_SCHEDULING,
+    ):
+        if scheduling not in ("fifo", "sjf"):
+            raise ValueError("scheduling must be 'fifo' or 'sjf'.")
+        self.db_path = db_path
+        self.max_size = max_size
+        self.scheduling = scheduling
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                user_id TEXT,
+                meeting_id TEXT,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                duration_seconds REAL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "duration_seconds" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN duration_seconds REAL")
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def pending_count(self) -> int:
+        """Number of jobs waiting or currently being processed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()
+        return row[0]
+
+    def check_capacity(self) -> None:
+        """Raise QueueFullError if no new job can be accepted right now."""
+        if self.pending_count() >= self.max_size:
+            raise QueueFullError(JOB_RETRY_AFTER_SECONDS)
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict,
+        user_id: Optional[str] = None,
+        meeting_id: Optional[str] = None,
+        duration_seconds: Optional[float] = None,
+    ) -> Dict:
+        """Insert a new job in 'queued' state, enforcing the queue size limit."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                pending = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+                ).fetchone()[0]
+                if pending >= self.max_size:
+                    raise QueueFullError(JOB_RETRY_AFTER_SECONDS)
+                self._conn.execute(
+                    "INSERT INTO jobs (id, kind, user_id, meeting_id, status, payload, duration_seconds, created_at) "
+                    "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                    (job_id, kind, user_id, meeting_id, json.dumps(payload), duration_seconds, time.time()),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(job_id)
+
+    def claim_next(self) -> Optional[Dict]:
+        """Atomically move the next queued job to 'running' and return it."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.scheduling == "sjf":
+                    # Unknown durations are scheduled as if they were one hour long
+                    row = self._conn.execute(
+                        "SELECT id FROM jobs WHERE status = 'queued' "
+                        "ORDER BY COALESCE(duration_seconds, 3600) - (? - created_at) * ?, created_at LIMIT 1",
+                        (now, JOB_SJF_AGING),
+                    ).fetchone()
+                else:
+                    row = self._conn.execute(
+                        "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                    ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                    (now, row["id"]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"])
+
+    def mark_done(self, job_id: str, result: Dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, finished_at = ? WHERE id = ?",
+                (json.dumps(result), time.time(), job_id),
+            )
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id),
+            )
+
+    def requeue_running(self) -> int:
+        """Put jobs interrupted by a restart back in the queue."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'"
+            )
+        return cur.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+
+JobHandler = Callable[[Dict, TranscriptionEngine], Awaitable[Dict]]
+
+
+class JobDispatcher:
+    """
+    Drains a JobQueue onto a TranscriptionEngine.
+
+    Each job kind has an async handler running in the API process; handlers
+    offload CPU-heavy work (ffmpeg, Whisper) to the engine's worker processes
+    so the event loop stays responsive. At most one job per worker runs at
+    the same time, the rest stays in the queue where it can be scheduled.
+    """
+
+    def __init__(self, queue: JobQueue, engine: TranscriptionEngine):
+        self.queue = queue
+        self.engine = engine
+        self.max_workers = engine.workers
+        self._handlers: Dict[str, JobHandler] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: set = set()
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    def notify(self) -> None:
+        """Wake the dispatch loop after a job has been enqueued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        self.engine.start()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_workers)
+        requeued = self.queue.requeue_running()
+        if requeued:
+            log_event("re-queued interrupted jobs", jobs=requeued)
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.engine.shutdown()
+
+    async def _loop(self) -> None:
+        while True:
+            await self._slots.acquire()
+            job = self.queue.claim_next()
+            if job is None:
+                self._slots.release()
+                self._wakeup.clear()
+                try:
+                    # Poll periodically in case another process enqueued jobs
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.create_task(self._run(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, job: Dict) -> None:
+        try:
+            handler = self._handlers.get(job["kind"])
+            if handler is None:
+                raise RuntimeError(f"No handler registered for job kind '{job['kind']}'")
+            result = await handler(job, self.engine)
+            self.queue.mark_done(job["id"], result)
+            job_events.publish(job["id"], "done", result)
+        except Exception as e:
+            log_event("job failed", logging.ERROR, job_id=job["id"], kind=job["kind"], error=str(e))
+            self.queue.mark_failed(job["id"], str(e))
+            job_events.publish(job["id"], "failed", {"error": str(e)})
+        finally:
+            job_events.close(job["id"])
+            self._slots.release()
+
+
+job_queue = JobQueue()
+dispatcher = JobDispatcher(job_queue, engine)
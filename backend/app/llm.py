@@ -0,0 +1,342 @@
+"""
+Process-wide gateway to the OpenAI API.
+
+Every LLM call of the API goes through `llm`, which owns:
+
+- one OpenAI client over a pooled httpx connection pool, created on first use;
+- a fair scheduler: at most LLM_MAX_CONCURRENCY calls in flight, and when
+  saturated, free slots go round-robin to the users with waiting calls, so
+  one long meeting can't starve everyone else;
+- token buckets on requests and tokens per minute, to stay under the
+  account's rate limits instead of bursting into 429s;
+- retries with exponential backoff and jitter on rate limits, timeouts,
+  connection and server errors;
+- a circuit breaker that fails fast with CircuitOpenError after
+  LLM_CIRCUIT_FAILURES consecutive failures, for LLM_CIRCUIT_RESET_SECONDS.
+
+Both exhausted retries and an open circuit raise LLMUnavailableError, which
+the API turns into a 503 with Retry-After instead of a 500.
+
+Calls are blocking (the summarizer runs them from worker threads); use
+`llm.for_user(user_id)` to get a client bound to the caller. Set
+OPENAI_BASE_URL to point the gateway at a local fake server.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import httpx
+from openai import OpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+from app.chunking import get_token_counter
+from app.metrics import llm_call_duration, llm_tokens, log_event
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))
+LLM_CIRCUIT_FAILURES = int(os.getenv("LLM_CIRCUIT_FAILURES", "5"))
+LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+class LLMUnavailableError(RuntimeError):
+    """The provider kept failing (after retries) or the circuit is open."""
+
+    def __init__(self, retry_after: float, message: str = "LLM provider unavailable"):
+        super().__init__(f"{message}, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` units, sleeping until they are available. Returns the time waited."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return waited
+                delay = (amount - self.level) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class FairScheduler:
+    """At most `slots` concurrent calls; waiting users are served round-robin."""
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.active = 0
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self._cond = threading.Condition()
+
+    def _is_next(self, user: str, ticket: object) -> bool:
+        first_user = next(iter(self._waiting))
+        return first_user == user and self._waiting[user][0] is ticket
+
+    @contextmanager
+    def slot(self, user: str):
+        ticket = object()
+        with self._cond:
+            self._waiting.setdefault(user, deque()).append(ticket)
+            while self.active >= self.slots or not self._is_next(user, ticket):
+                self._cond.wait()
+            queue = self._waiting[user]
+            queue.popleft()
+            # The user's next call goes behind everyone else's
+            del self._waiting[user]
+            if queue:
+                self._waiting[user] = queue
+            self.active += 1
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify_all()
+
+    def waiting(self) -> int:
+        with self._cond:
+            return sum(len(queue) for queue in self._waiting.values())
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures -> half-open (one trial call) after `reset_seconds`."""
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def check(self) -> None:
+        with self._lock:
+            if self.opened_at is None:
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.reset_seconds or self._trial:
+                raise CircuitOpenError(max(1.0, self.reset_seconds - elapsed))
+            self._trial = True
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_delay: float = LLM_RETRY_BASE_DELAY,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.scheduler = FairScheduler(max_concurrency)
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.breaker = CircuitBreaker(LLM_CIRCUIT_FAILURES, LLM_CIRCUIT_RESET_SECONDS)
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0, "throttled_seconds": 0.0}
+        self._client: Optional[OpenAI] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> OpenAI:
+        with self._lock:
+            if self._client is None:
+                self._client = OpenAI(
+                    api_key=os.environ["OPENAI_API_KEY"],
+                    base_url=OPENAI_BASE_URL,
+                    max_retries=0,  # retried here, with the rate limiter and breaker in the loop
+                    http_client=httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=self.max_concurrency,
+                            max_keepalive_connections=self.max_concurrency,
+                        ),
+                        timeout=LLM_TIMEOUT_SECONDS,
+                    ),
+                )
+            return self._client
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    def for_user(self, user_id: Optional[str]) -> "LLMClient":
+        return LLMClient(self, user_id or "anonymous")
+
+    @staticmethod
+    def estimate_tokens(request: Dict) -> int:
+        """Prompt tokens plus the completion budget, as counted by the provider's rate limiter."""
+        count = get_token_counter(request["model"])
+        prompt = sum(count(message["content"]) + 4 for message in request["messages"])
+        return prompt + request.get("max_tokens", 1000)
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    @contextmanager
+    def _call(self, request: Dict, user: str, stream: bool):
+        """
+        Send `request` with throttling and retries and yield the response,
+        holding a scheduler slot for each attempt and while the caller reads
+        the response. The slot is given back during the back-off sleeps.
+        """
+        tokens = self.estimate_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            with self.scheduler.slot(user):
+                try:
+                    self.breaker.check()
+                except CircuitOpenError:
+                    self._count("rejected")
+                    raise
+                self._count("throttled_seconds", self.requests.acquire() + self.tokens.acquire(tokens))
+                try:
+                    self._count("calls")
+                    response = self.client.chat.completions.create(**request, stream=stream)
+                except RETRYABLE_ERRORS as e:
+                    self._count("failures")
+                    self.breaker.failure()
+                    if attempt == self.max_retries:
+                        raise LLMUnavailableError(LLM_CIRCUIT_RESET_SECONDS, f"LLM call failed: {e}") from e
+                    delay = self.retry_base_delay * (2 ** attempt) + random.uniform(0, self.retry_base_delay)
+                    self._count("retries")
+                    log_event(
+                        "llm call failed, retrying", logging.WARNING,
+                        user=user, error=type(e).__name__, attempt=attempt + 1, retry_in=round(delay, 1),
+                    )
+                except Exception:
+                    # The provider answered (e.g. a 400): not a sign of an outage
+                    self.breaker.success()
+                    raise
+                else:
+                    self.breaker.success()
+                    yield response
+                    return
+            time.sleep(delay)
+
+    def complete(self, request: Dict, user: str) -> str:
+        """`chat.completions.create(**request)` and return the message text."""
+        start = time.perf_counter()
+        with self._call(request, user, stream=False) as response:
+            self._record(request, user, "complete", start, response.usage)
+            return response.choices[0].message.content
+
+    def stream(self, request: Dict, user: str) -> Iterator[str]:
+        """
+        Streamed `chat.completions.create(**request)`, yielding text deltas.
+        Only opening the stream is retried: once tokens have been sent to the
+        client, a failure is surfaced instead of starting over.
+        """
+        start = time.perf_counter()
+        first_token = None
+        usage = None
+        # The last chunk then carries the token counts
+        with self._call({**request, "stream_options": {"include_usage": True}}, user, stream=True) as chunks:
+            for chunk in chunks:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    yield chunk.choices[0].delta.content
+        self._record(request, user, "stream", start, usage, first_token)
+
+    @staticmethod
+    def _record(request: Dict, user: str, mode: str, start: float, usage, first_token: Optional[float] = None) -> None:
+        """Latency (including scheduling, throttling and retries) and token usage of one call."""
+        duration = time.perf_counter() - start
+        model = request["model"]
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        llm_call_duration.observe(duration, model=model, mode=mode)
+        if prompt_tokens is not None:
+            llm_tokens.inc(prompt_tokens, model=model, type="prompt")
+        if completion_tokens is not None:
+            llm_tokens.inc(completion_tokens, model=model, type="completion")
+        log_event(
+            "llm_call", model=model, mode=mode, user=user, duration_ms=round(duration * 1000, 1),
+            first_token_ms=None if first_token is None else round(first_token * 1000, 1),
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+        )
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "in_flight": self.scheduler.active,
+            "waiting": self.scheduler.waiting(),
+            "circuit": self.breaker.state,
+        }
+
+
+class LLMClient:
+    """The gateway, bound to the user the calls are made for."""
+
+    def __init__(self, gateway: LLMGateway, user: str):
+        self.gateway = gateway
+        self.user = user
+
+    def complete(self, request: Dict) -> str:
+        return self.gateway.complete(request, self.user)
+
+    def stream(self, request: Dict) -> Iterator[str]:
+        return self.gateway.stream(request, self.user)
+
+
+llm = LLMGateway()
@@ -1,16 +1,36 @@
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from pathlib import Path
-import uuid, subprocess, whisper, time
-from typing import Optional
-
-from app.supabase_client import supabase
-from app.auth import get_current_user_id
-from app.summarize import summarize
-from openai import OpenAI
-import os
+from datetime import datetime
+import asyncio, base64, hashlib, json, logging, uuid, time
+from typing import AsyncIterator, Iterator, List, Optional
+
+from app.repository import db
+from app.auth import get_current_user_id, jwks, token_cache
+from app.summarize import summarize, summarize_stream, summarize_variants, count_tokens, SUMMARY_MODEL
+from app.llm import llm, LLMUnavailableError
+from app.metrics import http_request_duration, log_event, render_metrics, request_id_var, span
+from app.summary_cache import summary_cache, make_key
+from app.jobs import job_queue, dispatcher, QueueFullError
+from app.engine import engine
+from app.events import job_events
+from app.pipeline import process_transcription_job
+from app.preferences import user_preferences
+from app.search import search_index, SEARCH_KINDS
+from app.exporters import (
+    export_cache, render_summary, render_transcript, iterate_file, content_disposition,
+    EXPORT_PAGE_SIZE, MEDIA_TYPES, SUMMARY_FORMATS, TRANSCRIPT_FORMATS,
+)
+from app.retrieval import BM25Index, transcript_indexes, REFINE_CONTEXT_TOKENS
+from app.segments import SegmentTable, REFINE_LINE
+from app.refine_sessions import (
+    refine_sessions, RefineSession, SessionExpiredError, REFINE_HISTORY_TOKENS, REFINE_PROMPT_TOKENS,
+)
+from app.utils.audio_utils import probe_duration
+from app.uploads import save_upload, UploadTooLargeError
+from app.whisper_models import validate_model_name, UnknownModelError, WHISPER_DEFAULT_MODEL
 
 app = FastAPI(title="Meeting Notes API")
 
@@ -31,6 +51,16 @@ class SummarizeRequest(BaseModel):
     detail_level: str = "medium"  # brief, medium, detailed
     include_timestamps: bool = True
 
+class SummaryVariant(BaseModel):
+    format: str = "structured"
+    language: str = "en"
+    detail_level: str = "medium"
+
+class SummarizeBatchRequest(BaseModel):
+    meeting_id: str
+    variants: List[SummaryVariant]
+    include_timestamps: bool = True
+
 class UserPreferences(BaseModel):
     default_format: str = "structured"
     default_language: str = "en"
@@ -39,25 +69,58 @@ class UserPreferences(BaseModel):
     include_timestamps: bool = True
     include_action_items: bool = True
     include_decisions: bool = True
+    whisper_model: str = WHISPER_DEFAULT_MODEL  # tiny, base, small, medium
 
 class RefineSummaryRequest(BaseModel):
     summary_id: str
     user_message: str
-    chat_history: list = []  # List of {"role": "user"|"assistant", "content": str}
-
-# Load Whisper model - 'base' for best speed/accuracy trade-off
-# Options: tiny, base, small, medium, large
-# 'base' is fastest while maintaining good accuracy (runs locally, no cost)
-MODEL = whisper.load_model("base")
+    chat_history: list = []  # List of {"role": "user"|"assistant", "content": str}; only to (re)seed a session
+    session_id: Optional[str] = None  # Conversation id generated by the client; history is then kept server-side
+    session_turns: int = 0  # Turns the client has already had in this session
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True, parents=True)
 
-def to_wav(input_path: Path) -> Path:
-    out = input_path.with_suffix(".wav")
-    cmd = ["ffmpeg", "-y", "-i", str(input_path), "-ar", "16000", "-ac", "1", str(out)]
-    subprocess.run(cmd, check=True, capture_output=True)
-    return out
+dispatcher.register("transcribe", process_transcription_job)
+
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Request id (X-Request-ID, generated if absent), latency histogram and one JSON access log line."""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        # Streaming responses: time until the headers, the stream itself is logged by its spans
+        duration = time.perf_counter() - start
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        http_request_duration.observe(duration, method=request.method, route=route, status=status)
+        log_event(
+            "request", method=request.method, route=route, path=request.url.path,
+            status=status, duration_ms=round(duration * 1000, 1),
+        )
+        request_id_var.reset(token)
+
+
+@app.on_event("startup")
+async def startup():
+    await db.start()
+    await jwks.start()
+    await dispatcher.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await dispatcher.stop()
+    await jwks.stop()
+    llm.close()
+    await db.close()
 
 
 @app.get("/")
@@ -65,80 +128,266 @@ def home():
     return {"message": "🚀 API is running!"}
 
 
-@app.post("/transcribe")
+@app.post("/transcribe", status_code=202)
 async def transcribe(
     file: UploadFile = File(...),
+    model: Optional[str] = Form(None),
+    auto_summary: Optional[bool] = Form(None),
     user_id: str = Depends(get_current_user_id),
 ):
+    """
+    Persist the upload and queue it for transcription. Poll /jobs/{job_id} for the result.
+
+    With auto_summary (default: the user's auto_generate_summary preference),
+    the job also summarizes the meeting with the user's default options once
+    transcribed; the job result then carries the summary_id.
+    """
+    # Until the job is queued, a failure leaves nothing behind: no file in uploads/, no meeting row
+    raw_path: Optional[Path] = None
+    meeting_id: Optional[str] = None
+    queued = False
     try:
+        job_queue.check_capacity()
+        prefs = await user_preferences.get(user_id)
+
+        # Model: explicit request > user preference > server default
+        if model is None:
+            model = prefs.get("whisper_model") or WHISPER_DEFAULT_MODEL
+        validate_model_name(model)
+
+        if auto_summary is None:
+            auto_summary = bool(prefs.get("auto_generate_summary"))
+        summary_options = {
+            "format": prefs.get("default_format") or "structured",
+            "language": prefs.get("default_language") or "en",
+            "detail_level": prefs.get("default_detail_level") or "medium",
+            "include_timestamps": prefs.get("include_timestamps", True),
+        } if auto_summary else None
+
         file_id = uuid.uuid4().hex
         raw_path = UPLOAD_DIR / f"{file_id}_{file.filename}"
-        content = await file.read()
-
-        with raw_path.open("wb") as f:
-            f.write(content)
+        with span("upload_write") as fields:
+            size_bytes, sha256 = await save_upload(file, raw_path)
+            fields["bytes"] = size_bytes
+        with span("ffprobe"):
+            duration_seconds = await asyncio.to_thread(probe_duration, raw_path)
 
         meeting_title = file.filename.rsplit(".", 1)[0]
 
         # Créer le meeting en base
-        meeting_res = supabase.table("meetings").insert({
+        meeting_rows = await db.insert("meetings", {
             "user_id": user_id,
             "title": meeting_title,
-            "status": "processing"
-        }).execute()
-        meeting_id = meeting_res.data[0]["id"]
-
-        # Upload audio dans Storage
-        storage_path = f"{user_id}/{meeting_id}/{file.filename}"
-        supabase.storage.from_("meetings-audios").upload(
-            path=storage_path,
-            file=content,
-            file_options={"content-type": file.content_type, "upsert": False},
-        )
-
-        # Conversion et transcription
-        wav_path = to_wav(raw_path)
-        result = MODEL.transcribe(str(wav_path), fp16=False, word_timestamps=False)
-
-        # Mise à jour du meeting
-        supabase.table("meetings").update({
-            "audio_path": storage_path,
-            "language": result.get("language"),
-            "status": "done"
-        }).eq("id", meeting_id).execute()
+            "audio_sha256": sha256,
+            "status": "processing",
+            "progress": 0
+        })
+        meeting_id = meeting_rows[0]["id"]
 
-        # Insertion de la transcription globale
-        transcript_res = supabase.table("transcripts").insert({
-            "meeting_id": meeting_id,
-            "model": "whisper-base",
-            "text": result.get("text"),
-            "language": result.get("language")
-        }).execute()
-        transcript_id = transcript_res.data[0]["id"]
-
-        # Segments
-        segments_payload = [
+        job = job_queue.enqueue(
+            "transcribe",
             {
-                "transcript_id": transcript_id,
-                "start_seconds": seg["start"],
-                "end_seconds": seg["end"],
-                "speaker_label": None,
-                "text": seg["text"],
-            }
-            for seg in result.get("segments", [])
-        ]
-        if segments_payload:
-            supabase.table("segments").insert(segments_payload).execute()
+                "meeting_id": meeting_id,
+                "title": meeting_title,
+                "raw_path": str(raw_path),
+                "content_type": file.content_type,
+                "storage_path": f"{user_id}/{meeting_id}/{file.filename}",
+                "model": model,
+                "size_bytes": size_bytes,
+                "sha256": sha256,
+                "summary": summary_options,
+                "request_id": request_id_var.get(),
+            },
+            user_id=user_id,
+            meeting_id=meeting_id,
+            duration_seconds=duration_seconds,
+        )
+        queued = True
+        dispatcher.notify()
 
         return JSONResponse({
             "meeting_id": meeting_id,
-            "transcript_id": transcript_id,
-            "language": result.get("language"),
-            "text": result.get("text"),
-        })
-
+            "job_id": job["id"],
+            "status": job["status"],
+        }, status_code=202)
+
+    except UnknownModelError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many transcriptions in progress, please retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if not queued:
+            await discard_upload(raw_path, meeting_id)
+
+
+async def discard_upload(raw_path: Optional[Path], meeting_id: Optional[str]) -> None:
+    """Remove what a /transcribe request created before failing (the check_capacity pre-check is racy)."""
+    if raw_path is not None:
+        raw_path.unlink(missing_ok=True)
+    if meeting_id is not None:
+        try:
+            # No job and the client never got the id: nothing would ever complete this meeting
+            await db.delete("meetings", id=meeting_id)
+        except Exception as e:
+            log_event("orphan meeting cleanup failed", meeting_id=meeting_id, error=str(e))
+
+
+@app.get("/jobs/metrics")
+async def get_job_metrics(
+    user_id: str = Depends(get_current_user_id),
+):
+    """Queue depth and transcription engine timings (queue wait vs. compute)."""
+    return JSONResponse({
+        "pending_jobs": job_queue.pending_count(),
+        "scheduling": job_queue.scheduling,
+        "engine": engine.stats(),
+    })
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Get the status of a queued transcription job."""
+    job = job_queue.get(job_id)
+    if job is None or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return JSONResponse({
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "meeting_id": job["meeting_id"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    })
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def iterate_in_thread(iterator: Iterator[str]) -> AsyncIterator[str]:
+    """Consume a blocking iterator (e.g. an OpenAI stream) in a thread, yielding its items on the event loop."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    end = object()
+
+    def pump():
+        try:
+            for item in iterator:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, end)
+
+    pumping = loop.run_in_executor(None, pump)
+    while True:
+        item = await queue.get()
+        if item is end:
+            break
+        if isinstance(item, Exception):
+            raise item
+        yield item
+    await pumping
+
+
+def llm_unavailable(e: LLMUnavailableError) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Server-Sent Events stream of a transcription job: 'progress', 'transcript',
+    'segments' as windows are decoded, then 'done' or 'failed'.
+    """
+    job = job_queue.get(job_id)
+    if job is None or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        # Finished long ago: the in-memory history is gone, answer from the queue
+        if job["status"] in ("done", "failed") and not job_events.has(job_id):
+            yield sse_event(job["status"], job["result"] or {"error": job["error"]})
+            return
+        async for item in job_events.subscribe(job_id):
+            if item is None:
+                # No event for a while: make sure we did not miss the end of the job
+                current = job_queue.get(job_id)
+                if current["status"] in ("done", "failed"):
+                    yield sse_event(current["status"], current["result"] or {"error": current["error"]})
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            yield sse_event(*item)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+async def load_meeting_for_summary(meeting_id: str, user_id: str) -> tuple:
+    """Meeting, transcript id and segments to summarize, checking ownership."""
+    # Get the meeting, its transcript and segments in one query, and verify ownership
+    meeting, transcript_id, segments = await db.get_meeting_with_segments(meeting_id)
+    if meeting is None:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+
+    if meeting["user_id"] != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this meeting")
+
+    if transcript_id is None:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+
+    if not segments:
+        raise HTTPException(status_code=404, detail="No segments found")
+
+    # Columnar form, built once and shared by formatting, token counting and chunking
+    return meeting, transcript_id, SegmentTable.from_rows(segments)
+
+
+async def save_summary(
+    request: SummarizeRequest, user_id: str, meeting: dict, transcript_id: str, summary_text: str, generation_time: float
+) -> dict:
+    """Insert the summary, index it for search and return the /summarize response."""
+    summary_rows = await db.insert("summaries", {
+        "meeting_id": request.meeting_id,
+        "user_id": user_id,
+        "transcript_id": transcript_id,
+        "title": meeting["title"],
+        "summary_text": summary_text,
+        "format": request.format,
+        "language": request.language,
+        "detail_level": request.detail_level,
+        "model_used": SUMMARY_MODEL,
+        "generation_time_seconds": generation_time
+    })
+    await search_index.index_summary(summary_rows[0])
+
+    return {
+        "summary_id": summary_rows[0]["id"],
+        "meeting_id": request.meeting_id,
+        "summary_text": summary_text,
+        "generation_time_seconds": generation_time
+    }
 
 
 @app.post("/summarize")
@@ -149,83 +398,260 @@ async def generate_summary(
     """Generate a summary for a meeting transcript with user preferences."""
     try:
         start_time = time.time()
+        meeting, transcript_id, segments = await load_meeting_for_summary(request.meeting_id, user_id)
 
-        # Get the meeting and verify ownership
-        meeting_res = supabase.table("meetings").select("*").eq("id", request.meeting_id).execute()
-        if not meeting_res.data:
-            raise HTTPException(status_code=404, detail="Meeting not found")
-
-        meeting = meeting_res.data[0]
-        if meeting["user_id"] != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized to access this meeting")
-
-        # Get the transcript
-        transcript_res = supabase.table("transcripts").select("id").eq("meeting_id", request.meeting_id).execute()
-        if not transcript_res.data:
-            raise HTTPException(status_code=404, detail="Transcript not found")
-
-        transcript_id = transcript_res.data[0]["id"]
-
-        # Get the segments
-        segments_res = supabase.table("segments").select("*").eq("transcript_id", transcript_id).order("start_seconds").execute()
-        if not segments_res.data:
-            raise HTTPException(status_code=404, detail="No segments found")
-
-        # Generate summary using the summarize function
-        summary_text = summarize(
-            segments=segments_res.data,
+        # Generate summary using the summarize function (off the event loop)
+        summary_text = await asyncio.to_thread(
+            summarize,
+            segments=segments,
             format=request.format,
             language=request.language,
             detail_level=request.detail_level,
-            include_timestamps=request.include_timestamps
+            include_timestamps=request.include_timestamps,
+            user_id=user_id,
         )
 
         generation_time = time.time() - start_time
 
         # Save summary to database
-        summary_res = supabase.table("summaries").insert({
-            "meeting_id": request.meeting_id,
-            "user_id": user_id,
-            "transcript_id": transcript_id,
-            "title": meeting["title"],
-            "summary_text": summary_text,
-            "format": request.format,
-            "language": request.language,
-            "detail_level": request.detail_level,
-            "model_used": "gpt-4o-mini",
-            "generation_time_seconds": generation_time
-        }).execute()
+        return JSONResponse(
+            await save_summary(request, user_id, meeting, transcript_id, summary_text, generation_time)
+        )
+
+    except HTTPException:
+        raise
+    except LLMUnavailableError as e:
+        raise llm_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+SUMMARIZE_BATCH_MAX_VARIANTS = 8
 
-        summary_id = summary_res.data[0]["id"]
+
+@app.post("/summarize/batch")
+async def generate_summaries_batch(
+    request: SummarizeBatchRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Generate several summaries of one meeting (e.g. structured + action_items +
+    bullet_points) in one call: segments are fetched and chunked once, the
+    variants run concurrently and all summaries are inserted in one write.
+    """
+    variants = [variant.dict() for variant in request.variants]
+    if not variants:
+        raise HTTPException(status_code=400, detail="At least one variant is required")
+    if len(variants) > SUMMARIZE_BATCH_MAX_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"At most {SUMMARIZE_BATCH_MAX_VARIANTS} variants per request")
+    # Duplicate variants would produce the same summary twice
+    variants = list({tuple(v.values()): v for v in variants}.values())
+
+    try:
+        start_time = time.time()
+        meeting, transcript_id, segments = await load_meeting_for_summary(request.meeting_id, user_id)
+
+        summary_texts = await asyncio.to_thread(
+            summarize_variants,
+            segments=segments,
+            variants=variants,
+            include_timestamps=request.include_timestamps,
+            user_id=user_id,
+        )
+        generation_time = time.time() - start_time
+
+        summary_rows = await db.insert("summaries", [
+            {
+                "meeting_id": request.meeting_id,
+                "user_id": user_id,
+                "transcript_id": transcript_id,
+                "title": meeting["title"],
+                "summary_text": summary_text,
+                "format": variant["format"],
+                "language": variant["language"],
+                "detail_level": variant["detail_level"],
+                "model_used": SUMMARY_MODEL,
+                "generation_time_seconds": generation_time
+            }
+            for variant, summary_text in zip(variants, summary_texts)
+        ])
+        for row in summary_rows:
+            await search_index.index_summary(row)
 
         return JSONResponse({
-            "summary_id": summary_id,
             "meeting_id": request.meeting_id,
-            "summary_text": summary_text,
+            "summaries": [
+                {
+                    "summary_id": row["id"],
+                    "format": row["format"],
+                    "language": row["language"],
+                    "detail_level": row["detail_level"],
+                    "summary_text": row["summary_text"],
+                }
+                for row in summary_rows
+            ],
             "generation_time_seconds": generation_time
         })
 
     except HTTPException:
         raise
+    except LLMUnavailableError as e:
+        raise llm_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/summaries")
-async def get_summaries(
+@app.post("/summarize/stream")
+async def generate_summary_stream(
+    request: SummarizeRequest,
     user_id: str = Depends(get_current_user_id),
 ):
-    """Get all summaries for the current user."""
+    """
+    Same as /summarize as Server-Sent Events: 'token' events with the summary
+    text as it is generated, then 'done' with the /summarize response once the
+    summary is saved (or 'error').
+    """
+    start_time = time.time()
     try:
-        summaries_res = supabase.table("summaries").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
+        meeting, transcript_id, segments = await load_meeting_for_summary(request.meeting_id, user_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream():
+        parts = []
+        try:
+            tokens = summarize_stream(
+                segments=segments,
+                format=request.format,
+                language=request.language,
+                detail_level=request.detail_level,
+                include_timestamps=request.include_timestamps,
+                user_id=user_id,
+            )
+            async for delta in iterate_in_thread(tokens):
+                parts.append(delta)
+                yield sse_event("token", {"text": delta})
+            generation_time = time.time() - start_time
+            yield sse_event(
+                "done", await save_summary(request, user_id, meeting, transcript_id, "".join(parts), generation_time)
+            )
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.get("/db/stats")
+async def get_db_stats(
+    user_id: str = Depends(get_current_user_id),
+):
+    """Per-query timings of the data-access layer."""
+    return JSONResponse(db.stats.snapshot())
+
+
+@app.get("/cache/stats")
+async def get_cache_stats(
+    user_id: str = Depends(get_current_user_id),
+):
+    """Hit/miss counters and sizes of the summary, verified-token, preferences, export and refinement session caches."""
+    return JSONResponse({
+        **summary_cache.get_stats(),
+        "auth": token_cache.get_stats(),
+        "preferences": user_preferences.get_stats(),
+        "exports": export_cache.get_stats(),
+        "refine_sessions": refine_sessions.get_stats(),
+    })
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Latency histograms and token counters in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/llm/stats")
+async def get_llm_stats(
+    user_id: str = Depends(get_current_user_id),
+):
+    """Calls, retries, throttling and circuit state of the LLM gateway."""
+    return JSONResponse(llm.get_stats())
+
+
+SUMMARIES_PAGE_SIZE = 20
+SUMMARIES_MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(row: dict) -> str:
+    """Opaque keyset cursor pointing after `row`."""
+    raw = f"{row['created_at']}|{row['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
-        return JSONResponse({
-            "summaries": summaries_res.data
-        })
 
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, summary_id = raw.split("|", 1)
+        created_at = datetime.fromisoformat(created_at).isoformat()
+        summary_id = str(uuid.UUID(summary_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, summary_id
+
+
+def parse_timestamp(value: Optional[str], name: str) -> Optional[str]:
+    """ISO 8601 timestamp from a query parameter, normalized before it goes into a PostgREST filter."""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO 8601 timestamp")
+
+
+@app.get("/summaries")
+async def get_summaries(
+    request: Request,
+    limit: int = Query(SUMMARIES_PAGE_SIZE, ge=1, le=SUMMARIES_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: Optional[str] = None,
+    language: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    List the current user's summaries, newest first, one page at a time.
+
+    Items carry a 200-character `summary_preview` instead of the full text
+    (fetch it with GET /summaries/{id}). Pass `next_cursor` back as `cursor`
+    to get the next page; it is null on the last page.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    created_after = parse_timestamp(created_after, "created_after")
+    created_before = parse_timestamp(created_before, "created_before")
+    try:
+        # One extra row tells whether there is a next page
+        rows = await db.list_summaries(
+            user_id, limit + 1, after=after, format=format, language=language,
+            created_after=created_after, created_before=created_before,
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    page = rows[:limit]
+    body = json.dumps({
+        "summaries": page,
+        "next_cursor": encode_cursor(page[-1]) if len(rows) > limit else None,
+    }, default=str).encode()
+
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 @app.get("/summaries/{summary_id}")
 async def get_summary(
@@ -234,12 +660,12 @@ async def get_summary(
 ):
     """Get a specific summary by ID."""
     try:
-        summary_res = supabase.table("summaries").select("*").eq("id", summary_id).eq("user_id", user_id).execute()
+        summaries = await db.select("summaries", id=summary_id, user_id=user_id)
 
-        if not summary_res.data:
+        if not summaries:
             raise HTTPException(status_code=404, detail="Summary not found")
 
-        return JSONResponse(summary_res.data[0])
+        return JSONResponse(summaries[0])
 
     except HTTPException:
         raise
@@ -254,14 +680,12 @@ async def delete_summary(
 ):
     """Delete a specific summary by ID."""
     try:
-        # First verify the summary exists and belongs to the user
-        summary_res = supabase.table("summaries").select("id").eq("id", summary_id).eq("user_id", user_id).execute()
+        # Delete the summary; no row back means it doesn't exist or belongs to someone else
+        deleted = await db.delete("summaries", id=summary_id, user_id=user_id)
 
-        if not summary_res.data:
+        if not deleted:
             raise HTTPException(status_code=404, detail="Summary not found")
-
-        # Delete the summary
-        supabase.table("summaries").delete().eq("id", summary_id).eq("user_id", user_id).execute()
+        await search_index.remove_summary(summary_id)
 
         return JSONResponse({
             "message": "Summary deleted successfully",
@@ -274,100 +698,136 @@ async def delete_summary(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/preferences")
-async def get_preferences(
-    user_id: str = Depends(get_current_user_id),
-):
-    """Get user preferences, creating default if not exists."""
-    try:
-        prefs_res = supabase.table("user_preferences").select("*").eq("user_id", user_id).execute()
+def export_response(request: Request, key: Optional[str], chunks: AsyncIterator[bytes], title: str, format: str) -> Response:
+    """Stream an export, from the export cache when `key` (a content hash) was rendered before."""
+    headers = {"Content-Disposition": content_disposition(title, format)}
+    if key is None:
+        return StreamingResponse(chunks, media_type=MEDIA_TYPES[format], headers=headers)
 
-        if not prefs_res.data:
-            # Create default preferences
-            default_prefs = {
-                "user_id": user_id,
-                "default_format": "structured",
-                "default_language": "en",
-                "default_detail_level": "medium",
-                "auto_generate_summary": True,
-                "include_timestamps": True,
-                "include_action_items": True,
-                "include_decisions": True
-            }
-            prefs_res = supabase.table("user_preferences").insert(default_prefs).execute()
+    etag = '"' + key[:32] + '"'
+    headers.update({"ETag": etag, "Cache-Control": "private, no-cache"})
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    cached = export_cache.get(key)
+    if cached is not None:
+        return StreamingResponse(iterate_file(cached), media_type=MEDIA_TYPES[format], headers=headers)
+    return StreamingResponse(export_cache.tee(key, chunks), media_type=MEDIA_TYPES[format], headers=headers)
 
-        return JSONResponse(prefs_res.data[0])
 
+@app.get("/meetings/{meeting_id}/export")
+async def export_transcript(
+    meeting_id: str,
+    request: Request,
+    format: str = Query("srt"),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Download a meeting's transcript as srt, vtt, md, txt, docx or pdf.
+    Segments are fetched and rendered page by page while the file streams.
+    """
+    if format not in TRANSCRIPT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(TRANSCRIPT_FORMATS)}")
+    try:
+        meetings = await db.select(
+            "meetings", "id,title,status,transcripts(id,source_transcript_id)", id=meeting_id, user_id=user_id
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.post("/preferences")
-async def update_preferences(
-    preferences: UserPreferences,
+    if not meetings:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    meeting = meetings[0]
+    if not meeting.get("transcripts"):
+        raise HTTPException(status_code=404, detail="Transcript not found")
+
+    transcript = meeting["transcripts"][0]
+    # A reused transcript reads the segments of the one it references
+    transcript_id = transcript.get("source_transcript_id") or transcript["id"]
+    title = meeting.get("title") or "transcript"
+    chunks = render_transcript(title, db.iter_segments(transcript_id, EXPORT_PAGE_SIZE), format)
+    # Segments never change once the meeting is done, so their transcript id stands for their content
+    key = make_key("transcript", format, transcript_id, title) if meeting.get("status") == "done" else None
+    return export_response(request, key, chunks, title, format)
+
+
+@app.get("/summaries/{summary_id}/export")
+async def export_summary(
+    summary_id: str,
+    request: Request,
+    format: str = Query("md"),
     user_id: str = Depends(get_current_user_id),
 ):
-    """Update user preferences."""
+    """Download a summary as md, txt, docx or pdf."""
+    if format not in SUMMARY_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(SUMMARY_FORMATS)}")
     try:
-        # Check if preferences exist
-        prefs_res = supabase.table("user_preferences").select("id").eq("user_id", user_id).execute()
-
-        prefs_data = {
-            "user_id": user_id,
-            "default_format": preferences.default_format,
-            "default_language": preferences.default_language,
-            "default_detail_level": preferences.default_detail_level,
-            "auto_generate_summary": preferences.auto_generate_summary,
-            "include_timestamps": preferences.include_timestamps,
-            "include_action_items": preferences.include_action_items,
-            "include_decisions": preferences.include_decisions
-        }
+        summaries = await db.select("summaries", "title,summary_text", id=summary_id, user_id=user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not summaries:
+        raise HTTPException(status_code=404, detail="Summary not found")
 
-        if prefs_res.data:
-            # Update existing
-            result = supabase.table("user_preferences").update(prefs_data).eq("user_id", user_id).execute()
-        else:
-            # Insert new
-            result = supabase.table("user_preferences").insert(prefs_data).execute()
+    title = summaries[0].get("title") or "summary"
+    text = summaries[0]["summary_text"]
+    key = make_key("summary", format, title, text)
+    return export_response(request, key, render_summary(title, text, format), title, format)
 
-        return JSONResponse(result.data[0])
 
+@app.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    kind: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Full-text search in the current user's transcripts and summaries.
+
+    Results are ranked best first; `snippet` highlights matches with <mark>,
+    and segment results carry start/end seconds to jump into the recording.
+    """
+    if kind is not None and kind not in SEARCH_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(SEARCH_KINDS)}")
+    try:
+        results = await search_index.search(user_id, q, limit=limit, kind=kind)
+        return JSONResponse({"query": q, "results": results})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/refine-summary")
-async def refine_summary(
-    request: RefineSummaryRequest,
+@app.get("/preferences")
+async def get_preferences(
     user_id: str = Depends(get_current_user_id),
 ):
-    """Refine a summary through conversational chat with the LLM."""
+    """Get user preferences, creating default if not exists."""
     try:
-        # Get the summary and verify ownership
-        summary_res = supabase.table("summaries").select("*").eq("id", request.summary_id).eq("user_id", user_id).execute()
+        return JSONResponse(await user_preferences.get(user_id))
 
-        if not summary_res.data:
-            raise HTTPException(status_code=404, detail="Summary not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        summary = summary_res.data[0]
 
-        # Get the original transcript segments
-        transcript_res = supabase.table("segments").select("*").eq("transcript_id", summary["transcript_id"]).order("start_seconds").execute()
+@app.post("/preferences")
+async def update_preferences(
+    preferences: UserPreferences,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Update user preferences."""
+    try:
+        validate_model_name(preferences.whisper_model)
+        return JSONResponse(await user_preferences.save(user_id, preferences.dict()))
 
-        if not transcript_res.data:
-            raise HTTPException(status_code=404, detail="Transcript not found")
+    except UnknownModelError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Build context for the LLM
-        segments_text = "\n".join([
-            f"[{seg['start_seconds']:.1f}s-{seg['end_seconds']:.1f}s] {seg['text']}"
-            for seg in transcript_res.data[:100]  # Limit to first 100 segments to avoid token limits
-        ])
 
-        # Prepare the conversation with context
-        system_prompt = f"""You are an expert assistant helping to refine a meeting summary.
+def refine_system_prompt(summary: dict, segments_text: str) -> str:
+    """Instructions of a /refine-summary turn, with the transcript excerpts retrieved for it."""
+    return f"""You are an expert assistant helping to refine a meeting summary.
 
 You have access to:
-1. The original transcript (partial, for reference)
+1. Excerpts of the original transcript relevant to the request (for reference)
 2. The current summary
 3. User's refinement requests
 
@@ -390,79 +850,175 @@ CRITICAL INSTRUCTIONS:
 
 Language: {'English' if summary['language'] == 'en' else 'French'}
 Current format: {summary['format']}
-Detail level: {summary['detail_level']}"""
+Detail level: {summary['detail_level']}
+
+Relevant transcript excerpts:
+{segments_text}"""
+
+
+async def prepare_refinement(request: RefineSummaryRequest, user_id: str) -> tuple:
+    """Load the summary (checking ownership) and build the chat request of this refinement turn."""
+    # Get the summary (verifying ownership)
+    summaries = await db.select("summaries", id=request.summary_id, user_id=user_id)
+    if not summaries:
+        raise HTTPException(status_code=404, detail="Summary not found")
+    summary = summaries[0]
+    if not summary.get("transcript_id"):
+        raise HTTPException(status_code=404, detail="Transcript not found")
+
+    # Transcript index, built at transcription time; segments are only reloaded on a cache miss
+    index = transcript_indexes.get(summary["transcript_id"])
+    if index is None:
+        segments = await db.get_transcript_segments(summary["transcript_id"])
+        if not segments:
+            raise HTTPException(status_code=404, detail="Transcript not found")
+        index = await asyncio.to_thread(lambda: BM25Index(SegmentTable.from_rows(segments)))
+        transcript_indexes.put(summary["transcript_id"], index)
+
+    # Conversation state lives server-side; the client only resends its history if the session is gone
+    try:
+        session = refine_sessions.open(
+            user_id, request.summary_id, request.session_id, request.chat_history, request.session_turns
+        )
+    except SessionExpiredError:
+        raise HTTPException(status_code=409, detail="Refinement session expired, resend chat_history")
+    await session.settled()
+
+    preamble = {"role": "assistant", "content": f"I have the current summary and original transcript ready. What would you like me to adjust?\n\nCurrent summary:\n{summary['summary_text'][:500]}...\n\n(I can see the full summary and transcript)"}
+    user_turn = {"role": "user", "content": request.user_message}
+
+    # Token budget of the whole prompt: instructions and this message first, then memo and recent turns,
+    # then transcript excerpts with what is left, so a turn costs the same however long the chat is
+    fixed = (refine_system_prompt(summary, ""), preamble["content"], request.user_message)
+    used = sum(count_tokens(text) for text in fixed)
+    history, history_tokens = session.history_messages(min(REFINE_HISTORY_TOKENS, REFINE_PROMPT_TOKENS - used), count_tokens)
+    context_tokens = max(0, min(REFINE_CONTEXT_TOKENS, REFINE_PROMPT_TOKENS - used - history_tokens))
+
+    # Build context for the LLM: the parts of the whole meeting relevant to this turn
+    query = " ".join(filter(None, [session.last_user_message, request.user_message]))
+    context_segments = await asyncio.to_thread(index.select_context, query, context_tokens, count_tokens)
+    system_prompt = refine_system_prompt(summary, context_segments.render(REFINE_LINE))
+
+    messages = [{"role": "system", "content": system_prompt}, preamble, *history, user_turn]
+
+    return summary, session, {
+        "model": "gpt-4o-mini",
+        "messages": messages,
+        "temperature": 0.3,
+        "max_tokens": 3000,
+    }
+
+
+async def finish_refinement(
+    request: RefineSummaryRequest, user_id: str, summary: dict, session: RefineSession, assistant_message: str
+) -> dict:
+    """
+    Classify the completed answer; if it is a refined summary, save and re-index it.
+    The turn is then added to the session (older turns roll into its memo in the background).
+    """
+    # Detect if this is a refined summary vs. a conversational response
+    # A refined summary should:
+    # 1. Contain markdown headings (##)
+    # 2. Be substantial in length (>300 chars)
+    # 3. NOT contain meta-commentary phrases
+
+    meta_phrases = [
+        "here's the", "i've made", "i've updated", "based on your request",
+        "i have", "let me", "i can", "would you like", "here is the"
+    ]
+
+    has_markdown = "##" in assistant_message
+    is_substantial = len(assistant_message) > 300
+    has_meta_commentary = any(phrase in assistant_message.lower()[:200] for phrase in meta_phrases)
+
+    # It's a refined summary if it has markdown, is substantial, and doesn't have meta-commentary
+    is_refined_summary = has_markdown and is_substantial and not has_meta_commentary
+
+    # If it's a refined summary, update the database
+    if is_refined_summary:
+        # Strip any potential meta-commentary from the beginning
+        cleaned_summary = assistant_message
+
+        # Remove common meta-commentary patterns if they exist
+        for phrase in ["Here's the refined version:", "Here is the refined version:", "Here's the updated summary:"]:
+            if cleaned_summary.startswith(phrase):
+                cleaned_summary = cleaned_summary[len(phrase):].strip()
+
+        updated_rows = await db.update("summaries", {
+            "summary_text": cleaned_summary,
+            "updated_at": "now()"
+        }, id=request.summary_id)
+        if updated_rows:
+            await search_index.index_summary(updated_rows[0])
+
+        result = {
+            "assistant_message": cleaned_summary,
+            "is_summary_updated": True,
+            "updated_summary": cleaned_summary
+        }
+    else:
+        # It's a conversational response
+        result = {
+            "assistant_message": assistant_message,
+            "is_summary_updated": False,
+            "updated_summary": summary['summary_text']
+        }
 
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "assistant", "content": f"I have the current summary and original transcript ready. What would you like me to adjust?\n\nCurrent summary:\n{summary['summary_text'][:500]}...\n\n(I can see the full summary and transcript)"},
-        ]
+    if request.session_id:  # Older clients resend their history and have no stored session
+        session.record(request.user_message, result["assistant_message"], user_id, count_tokens)
+        result["session_turns"] = session.turn_count
+    return result
 
-        # Add chat history
-        for msg in request.chat_history:
-            messages.append({"role": msg["role"], "content": msg["content"]})
 
-        # Add new user message
-        messages.append({"role": "user", "content": request.user_message})
+@app.post("/refine-summary")
+async def refine_summary(
+    request: RefineSummaryRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Refine a summary through conversational chat with the LLM."""
+    try:
+        summary, session, chat_request = await prepare_refinement(request, user_id)
 
         # Get LLM response
-        client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.3,
-            max_tokens=3000,
-        )
+        assistant_message = await asyncio.to_thread(llm.for_user(user_id).complete, chat_request)
 
-        assistant_message = response.choices[0].message.content
-
-        # Detect if this is a refined summary vs. a conversational response
-        # A refined summary should:
-        # 1. Contain markdown headings (##)
-        # 2. Be substantial in length (>300 chars)
-        # 3. NOT contain meta-commentary phrases
-
-        meta_phrases = [
-            "here's the", "i've made", "i've updated", "based on your request",
-            "i have", "let me", "i can", "would you like", "here is the"
-        ]
-
-        has_markdown = "##" in assistant_message
-        is_substantial = len(assistant_message) > 300
-        has_meta_commentary = any(phrase in assistant_message.lower()[:200] for phrase in meta_phrases)
-
-        # It's a refined summary if it has markdown, is substantial, and doesn't have meta-commentary
-        is_refined_summary = has_markdown and is_substantial and not has_meta_commentary
-
-        # If it's a refined summary, update the database
-        if is_refined_summary:
-            # Strip any potential meta-commentary from the beginning
-            cleaned_summary = assistant_message
-
-            # Remove common meta-commentary patterns if they exist
-            for phrase in ["Here's the refined version:", "Here is the refined version:", "Here's the updated summary:"]:
-                if cleaned_summary.startswith(phrase):
-                    cleaned_summary = cleaned_summary[len(phrase):].strip()
-
-            supabase.table("summaries").update({
-                "summary_text": cleaned_summary,
-                "updated_at": "now()"
-            }).eq("id", request.summary_id).execute()
-
-            return JSONResponse({
-                "assistant_message": cleaned_summary,
-                "is_summary_updated": True,
-                "updated_summary": cleaned_summary
-            })
-        else:
-            # It's a conversational response
-            return JSONResponse({
-                "assistant_message": assistant_message,
-                "is_summary_updated": False,
-                "updated_summary": summary['summary_text']
-            })
+        return JSONResponse(await finish_refinement(request, user_id, summary, session, assistant_message))
 
     except HTTPException:
         raise
+    except LLMUnavailableError as e:
+        raise llm_unavailable(e)
     except Exception as e:
-        print(f"Error refining summary: {e}")
+        log_event("refine summary failed", logging.ERROR, summary_id=request.summary_id, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/refine-summary/stream")
+async def refine_summary_stream(
+    request: RefineSummaryRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Same as /refine-summary as Server-Sent Events: 'token' events as the answer
+    is generated, then 'done' with the /refine-summary response (or 'error').
+    """
+    try:
+        summary, session, chat_request = await prepare_refinement(request, user_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream():
+        parts = []
+        try:
+            async for delta in iterate_in_thread(llm.for_user(user_id).stream(chat_request)):
+                parts.append(delta)
+                yield sse_event("token", {"text": delta})
+            # The classification needs the whole answer
+            yield sse_event("done", await finish_refinement(request, user_id, summary, session, "".join(parts)))
+        except Exception as e:
+            log_event("refine summary failed", logging.ERROR, summary_id=request.summary_id, error=str(e))
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
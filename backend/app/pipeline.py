@@ -0,0 +1,297 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.engine import TranscriptionEngine
+from app.events import job_events
+from app.metrics import log_event, record_stage, request_id_var, span
+from app.repository import db
+from app.retrieval import BM25Index, transcript_indexes
+from app.search import search_index
+from app.segments import SegmentTable
+from app.summarize import summarize, Segments, SUMMARY_MODEL
+from app.supabase_client import supabase
+from app.transcription import analyze_upload, pcm_path_for, transcribe_window
+from app.utils.vad import SegmentStitcher
+from app.whisper_models import covers, WHISPER_DEFAULT_MODEL
+
+# Long recordings are split at silences into windows of about this length,
+# transcribed in parallel on the engine's workers
+VAD_WINDOW_SECONDS = float(os.getenv("VAD_WINDOW_SECONDS", "300"))
+# Shorter first window so the first segments reach the client within seconds
+VAD_FIRST_WINDOW_SECONDS = float(os.getenv("VAD_FIRST_WINDOW_SECONDS", "30"))
+SEGMENT_INSERT_BATCH_SIZE = int(os.getenv("SEGMENT_INSERT_BATCH_SIZE", "50"))
+
+
+async def set_progress(job_id: str, meeting_id: str, percent: int) -> None:
+    job_events.publish(job_id, "progress", {"percent": percent})
+    await db.update("meetings", {"progress": percent}, id=meeting_id)
+
+
+async def generate_auto_summary(job: Dict, transcript_id: str, segments: Segments) -> Dict:
+    """
+    Summarize the meeting just transcribed with the options resolved by
+    /transcribe from the user's preferences. A failure here doesn't fail the
+    job: the transcript is done, and the result reports the summary error.
+    """
+    payload = job["payload"]
+    options = payload["summary"]
+    job_events.publish(job["id"], "summarizing", {})
+    try:
+        with span("auto_summary", job_id=job["id"]):
+            start = time.time()
+            summary_text = await asyncio.to_thread(
+                summarize, segments=segments, user_id=job["user_id"], **options
+            )
+            summary_rows = await db.insert("summaries", {
+                "meeting_id": payload["meeting_id"],
+                "user_id": job["user_id"],
+                "transcript_id": transcript_id,
+                "title": payload.get("title", ""),
+                "summary_text": summary_text,
+                "format": options["format"],
+                "language": options["language"],
+                "detail_level": options["detail_level"],
+                "model_used": SUMMARY_MODEL,
+                "generation_time_seconds": time.time() - start,
+            })
+            await search_index.index_summary(summary_rows[0])
+    except Exception as e:
+        log_event("auto summary failed", job_id=job["id"], error=str(e))
+        return {"summary_error": str(e)}
+    return {"summary_id": summary_rows[0]["id"]}
+
+
+async def upload_audio(job: Dict) -> None:
+    """Upload audio dans Storage, streamed from disk in multipart chunks."""
+    payload = job["payload"]
+    with span("storage_upload", job_id=job["id"], bytes=payload.get("size_bytes")), \
+            Path(payload["raw_path"]).open("rb") as audio_file:
+        await asyncio.to_thread(
+            supabase.storage.from_("meetings-audios").upload,
+            path=payload["storage_path"],
+            file=audio_file,
+            file_options={"content-type": payload["content_type"], "upsert": False},
+        )
+
+
+async def copy_audio(job: Dict, source_path: Optional[str]) -> None:
+    """
+    Give the meeting its own copy of an already stored recording (a copy
+    inside Storage, nothing goes through this server), so deleting either
+    meeting's audio never breaks the other. Uploads the local file if the
+    source object is gone.
+    """
+    if source_path:
+        try:
+            with span("storage_copy", job_id=job["id"]):
+                await asyncio.to_thread(
+                    supabase.storage.from_("meetings-audios").copy, source_path, job["payload"]["storage_path"]
+                )
+            return
+        except Exception as e:
+            log_event("storage copy failed, uploading", job_id=job["id"], error=str(e))
+    await upload_audio(job)
+
+
+async def find_reusable_transcript(user_id: str, column: str, digest: Optional[str], model_name: str) -> Optional[Dict]:
+    """A done meeting of the user with the same audio hash and a transcript from `model_name` or a larger model."""
+    if not digest:
+        return None
+    for meeting in await db.find_transcribed_audio(user_id, column, digest):
+        for transcript in meeting.get("transcripts") or []:
+            if covers(transcript["model"], model_name):
+                return {"meeting": meeting, "transcript": transcript}
+    return None
+
+
+async def reuse_transcript(job: Dict, match: Dict, pcm_sha256: Optional[str]) -> Dict:
+    """
+    Complete the job with a copy-on-write reference to an existing transcript
+    of the same user's same audio: no inference and no segment copies. The
+    audio object is copied within Storage so each meeting owns its own.
+    """
+    payload = job["payload"]
+    job_id = job["id"]
+    meeting_id = payload["meeting_id"]
+    source = match["transcript"]
+    source_id = source.get("source_transcript_id") or source["id"]
+
+    with span("transcript_reuse", job_id=job_id, source_transcript_id=source_id):
+        text_rows = await db.select("transcripts", "text", id=source_id)
+        transcript_rows = await db.insert("transcripts", {
+            "meeting_id": meeting_id,
+            "model": source["model"],
+            "text": text_rows[0]["text"] if text_rows else "",
+            "language": source.get("language"),
+            "source_transcript_id": source_id,
+        })
+        transcript_id = transcript_rows[0]["id"]
+        job_events.publish(job_id, "transcript", {"meeting_id": meeting_id, "transcript_id": transcript_id})
+
+        index = transcript_indexes.get(source_id)
+        if index is not None:
+            transcript_indexes.put(transcript_id, index)
+        # Shared segments are only loaded when something needs them
+        segments: List[Dict] = []
+        if search_index.indexes_segments or payload.get("summary"):
+            async for page in db.iter_segments(source_id, SEGMENT_INSERT_BATCH_SIZE * 10):
+                await search_index.index_segments(job["user_id"], meeting_id, payload.get("title", ""), page)
+                segments.extend(page)
+
+        await copy_audio(job, match["meeting"].get("audio_path"))
+        await db.update("meetings", {
+            "audio_path": payload["storage_path"],
+            "audio_pcm_sha256": pcm_sha256 or match["meeting"].get("audio_pcm_sha256"),
+            "language": source.get("language"),
+            "status": "done",
+            "progress": 100
+        }, id=meeting_id)
+    job_events.publish(job_id, "progress", {"percent": 100})
+
+    result = {
+        "meeting_id": meeting_id,
+        "transcript_id": transcript_id,
+        "language": source.get("language"),
+        "reused_transcript_id": source_id,
+    }
+    if payload.get("summary") and segments:
+        result.update(await generate_auto_summary(job, transcript_id, segments))
+    return result
+
+
+async def process_transcription_job(job: Dict, engine: TranscriptionEngine) -> Dict:
+    """
+    Run a queued /transcribe job: storage upload, Whisper inference and
+    Supabase writes. Database writes go through the async repository, the
+    storage upload runs in a thread and inference runs on the transcription
+    engine, so the event loop is never blocked.
+
+    Windows are transcribed concurrently but consumed in order: as soon as
+    the next window is ready its segments are stitched, inserted in
+    micro-batches and published on the job's event stream.
+
+    Audio already transcribed, byte for byte or once decoded, with the same
+    or a larger model reuses that transcript instead (see reuse_transcript).
+    """
+    payload = job["payload"]
+    job_id = job["id"]
+    meeting_id = payload["meeting_id"]
+    raw_path = Path(payload["raw_path"])
+    storage_path = payload["storage_path"]
+    model_name = payload.get("model", WHISPER_DEFAULT_MODEL)
+    window_tasks: List[asyncio.Future] = []
+    # Logs of the job carry the id of the /transcribe request that queued it
+    request_id_var.set(payload.get("request_id"))
+
+    try:
+        # Same file already transcribed (a retry, a teammate's upload)
+        match = await find_reusable_transcript(job["user_id"], "audio_sha256", payload.get("sha256"), model_name)
+        if match is not None:
+            return await reuse_transcript(job, match, None)
+
+        # Décodage unique : découpage aux silences, empreinte PCM, et échantillons gardés pour les fenêtres
+        with span("vad_plan", job_id=job_id):
+            analysis = await engine.run(analyze_upload, str(raw_path), VAD_WINDOW_SECONDS, VAD_FIRST_WINDOW_SECONDS)
+        windows = analysis["windows"]
+        pcm_sha256 = analysis["pcm_sha256"]
+
+        # Same recording in another container or with other tags
+        match = await find_reusable_transcript(job["user_id"], "audio_pcm_sha256", pcm_sha256, model_name)
+        if match is not None:
+            return await reuse_transcript(job, match, pcm_sha256)
+
+        await upload_audio(job)
+        duration = windows[-1][1] or 1.0
+        if len(windows) > 1:
+            log_event("transcribing windows in parallel", job_id=job_id, windows=len(windows))
+        window_tasks = [
+            asyncio.ensure_future(engine.run(transcribe_window, analysis["pcm_path"], start, end, model_name))
+            for start, end in windows
+        ]
+        await set_progress(job_id, meeting_id, 5)
+
+        # Transcription globale, complétée à la fin
+        transcript_rows = await db.insert("transcripts", {
+            "meeting_id": meeting_id,
+            "model": f"whisper-{model_name}",
+            "text": "",
+            "language": None
+        })
+        transcript_id = transcript_rows[0]["id"]
+        job_events.publish(job_id, "transcript", {"meeting_id": meeting_id, "transcript_id": transcript_id})
+
+        stitcher = SegmentStitcher()
+        texts: List[str] = []
+        all_rows: List[Dict] = []
+        languages: Counter = Counter()
+        for (start, end), task in zip(windows, window_tasks):
+            result = await task
+            for stage, seconds in result.get("timings", {}).items():
+                record_stage(stage, seconds, job_id=job_id, window_start=start, model=model_name)
+            if result.get("language"):
+                languages[result["language"]] += 1
+            segments = stitcher.add(result["segments"])
+            texts.extend(seg["text"] for seg in segments)
+
+            # Segments, insérés par micro-lots
+            rows = [
+                {
+                    "transcript_id": transcript_id,
+                    "start_seconds": seg["start"],
+                    "end_seconds": seg["end"],
+                    "speaker_label": None,
+                    "text": seg["text"],
+                }
+                for seg in segments
+            ]
+            all_rows.extend(rows)
+            for i in range(0, len(rows), SEGMENT_INSERT_BATCH_SIZE):
+                inserted = await db.insert("segments", rows[i:i + SEGMENT_INSERT_BATCH_SIZE])
+                await search_index.index_segments(job["user_id"], meeting_id, payload.get("title", ""), inserted)
+            if segments:
+                job_events.publish(job_id, "segments", {"segments": segments})
+            await set_progress(job_id, meeting_id, 5 + int(90 * end / duration))
+
+        # Whisper detects the language per window; keep the majority
+        language = languages.most_common(1)[0][0] if languages else None
+        await db.update("transcripts", {
+            "text": "".join(texts),
+            "language": language
+        }, id=transcript_id)
+
+        # Index de recherche pour /refine-summary, construit une seule fois ; la table sert aussi au résumé auto
+        table = await asyncio.to_thread(SegmentTable.from_rows, all_rows)
+        transcript_indexes.put(transcript_id, await asyncio.to_thread(BM25Index, table))
+
+        # Mise à jour du meeting une fois les segments en base
+        await db.update("meetings", {
+            "audio_path": storage_path,
+            "audio_pcm_sha256": pcm_sha256,
+            "language": language,
+            "status": "done",
+            "progress": 100
+        }, id=meeting_id)
+
+        result = {
+            "meeting_id": meeting_id,
+            "transcript_id": transcript_id,
+            "language": language,
+        }
+        if payload.get("summary") and len(table):
+            result.update(await generate_auto_summary(job, transcript_id, table))
+        return result
+
+    except Exception:
+        for task in window_tasks:
+            task.cancel()
+        await db.update("meetings", {"status": "failed"}, id=meeting_id)
+        raise
+
+    finally:
+        # The audio lives in Storage now; nothing else reads the local copy or its decoded samples
+        raw_path.unlink(missing_ok=True)
+        pcm_path_for(str(raw_path)).unlink(missing_ok=True)
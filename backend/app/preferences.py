@@ -0,0 +1,95 @@
+"""
+User preferences, read through an in-process TTL cache.
+
+Reads hit Supabase at most once per user per PREFERENCES_CACHE_TTL_SECONDS;
+writes are a single upsert on user_id and go through the cache, so the
+instance that handled a POST never serves the old values. Other instances
+catch up within the TTL, or right away if something calls `invalidate`.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.repository import db
+from app.whisper_models import WHISPER_DEFAULT_MODEL
+
+PREFERENCES_CACHE_TTL_SECONDS = float(os.getenv("PREFERENCES_CACHE_TTL_SECONDS", "300"))
+PREFERENCES_CACHE_ENTRIES = int(os.getenv("PREFERENCES_CACHE_ENTRIES", "10000"))
+
+DEFAULT_PREFERENCES = {
+    "default_format": "structured",
+    "default_language": "en",
+    "default_detail_level": "medium",
+    "auto_generate_summary": True,
+    "include_timestamps": True,
+    "include_action_items": True,
+    "include_decisions": True,
+    "whisper_model": WHISPER_DEFAULT_MODEL,
+}
+
+
+class PreferencesService:
+    def __init__(self, ttl: float = PREFERENCES_CACHE_TTL_SECONDS, max_entries: int = PREFERENCES_CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # user_id -> (row, expires_at)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _cached(self, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is None or entry[1] <= time.monotonic():
+                self.stats["misses"] += 1
+                return None
+            self._cache.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def _remember(self, user_id: str, row: Dict) -> None:
+        with self._lock:
+            self._cache[user_id] = (row, time.monotonic() + self.ttl)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    async def get(self, user_id: str) -> Dict:
+        """The user's preferences row, created with the defaults if missing."""
+        row = self._cached(user_id)
+        if row is not None:
+            return row
+
+        rows = await db.select("user_preferences", user_id=user_id)
+        if not rows:
+            # DO NOTHING on conflict: a concurrent POST from another tab wins
+            rows = await db.upsert(
+                "user_preferences", {"user_id": user_id, **DEFAULT_PREFERENCES},
+                on_conflict="user_id", ignore_duplicates=True,
+            )
+            if not rows:
+                rows = await db.select("user_preferences", user_id=user_id)
+        self._remember(user_id, rows[0])
+        return rows[0]
+
+    async def save(self, user_id: str, values: Dict) -> Dict:
+        """Insert or update in one round-trip (user_id is UNIQUE), and write through the cache."""
+        rows = await db.upsert("user_preferences", {**values, "user_id": user_id}, on_conflict="user_id")
+        self._remember(user_id, rows[0])
+        return rows[0]
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        """Drop one user's cached preferences, or all of them."""
+        with self._lock:
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(user_id, None)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._cache)}
+
+
+user_preferences = PreferencesService()
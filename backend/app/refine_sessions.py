@@ -0,0 +1,218 @@
+"""
+Server-side state of /refine-summary conversations.
+
+Clients used to resend the whole chat on every turn, and all of it went into
+the prompt, so every turn cost more than the one before. A session now lives
+here per (user, summary, session id). It keeps the last REFINE_RECENT_TURNS
+turns verbatim; older turns are rolled into a running memo by the LLM once
+they leave that window, in the background after the answer is sent.
+`history_messages` packs memo + recent turns under a token budget, so the
+size of a turn's prompt no longer depends on how long the conversation is.
+
+Sessions are in-process and expire after REFINE_SESSION_TTL_SECONDS without
+a turn. A client whose session is gone (restart, expiry) gets a 409 and
+resends its history once to reseed it.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.llm import llm
+from app.metrics import log_event
+
+REFINE_SESSION_TTL_SECONDS = float(os.getenv("REFINE_SESSION_TTL_SECONDS", "3600"))
+REFINE_SESSION_ENTRIES = int(os.getenv("REFINE_SESSION_ENTRIES", "10000"))
+# Turns (user message + answer) kept verbatim; older ones only survive in the memo
+REFINE_RECENT_TURNS = int(os.getenv("REFINE_RECENT_TURNS", "3"))
+# Token budgets: the whole prompt, the verbatim turns in it, and the memo
+REFINE_PROMPT_TOKENS = int(os.getenv("REFINE_PROMPT_TOKENS", "8000"))
+REFINE_HISTORY_TOKENS = int(os.getenv("REFINE_HISTORY_TOKENS", "2500"))
+REFINE_MEMO_TOKENS = int(os.getenv("REFINE_MEMO_TOKENS", "400"))
+REFINE_MEMO_MODEL = "gpt-4o-mini"
+
+MEMO_PROMPT = """You keep a compact memo of a conversation in which a user refines a meeting summary with an assistant.
+
+Merge the new exchanges into the current memo. Keep what matters for the next turns:
+- what the user asked for and their preferences (length, tone, format, sections to add or drop)
+- what was changed or decided, and what the user rejected
+- open questions
+
+Do not copy summary text, only describe it. At most {words} words. Return only the memo."""
+
+
+class SessionExpiredError(LookupError):
+    """The client expects turns the server no longer has; it must resend its chat history."""
+
+
+class RefineSession:
+    def __init__(self):
+        self.memo = ""
+        self.turns: List[Tuple[str, str]] = []  # (user message, assistant answer), oldest first
+        self.turn_count = 0  # all turns, memo included
+        self._rolling: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_history(cls, chat_history: List[Dict]) -> "RefineSession":
+        """
+        Session seeded from a client-side chat history. Turns beyond the
+        recent window go into an extractive memo (no LLM call on this path).
+        """
+        session = cls()
+        pending_user: Optional[str] = None
+        for msg in chat_history:
+            if msg.get("role") == "user":
+                pending_user = msg.get("content", "")
+            elif msg.get("role") == "assistant" and pending_user is not None:
+                session.turns.append((pending_user, msg.get("content", "")))
+                pending_user = None
+        session.turn_count = len(session.turns)
+        older = session.turns[:-REFINE_RECENT_TURNS] if REFINE_RECENT_TURNS else session.turns
+        if older:
+            session.turns = session.turns[len(older):]
+            session.memo = extractive_memo("", older)
+        return session
+
+    @property
+    def last_user_message(self) -> Optional[str]:
+        return self.turns[-1][0] if self.turns else None
+
+    async def settled(self) -> None:
+        """Wait for the memo update of the previous turn, if it is still running."""
+        task = self._rolling
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+            if self._rolling is task:
+                self._rolling = None
+
+    def history_messages(self, max_tokens: int, count_tokens: Callable[[str], int]) -> Tuple[List[Dict], int]:
+        """
+        Chat messages for the memo and as many recent turns (newest first) as
+        fit in `max_tokens`, in conversation order, and their token count.
+        """
+        messages: List[Dict] = []
+        used = 0
+        if self.memo:
+            memo = {"role": "system", "content": f"Memo of the earlier conversation:\n{self.memo}"}
+            used = count_tokens(memo["content"])
+            messages.append(memo)
+        recent: List[Dict] = []
+        for user_message, answer in reversed(self.turns):
+            cost = count_tokens(user_message) + count_tokens(answer) + 8  # + message overhead
+            if used + cost > max_tokens:
+                break
+            recent[:0] = [{"role": "user", "content": user_message}, {"role": "assistant", "content": answer}]
+            used += cost
+        return messages + recent, used
+
+    def record(self, user_message: str, answer: str, user_id: str, count_tokens: Callable[[str], int]) -> None:
+        """Add a finished turn, and roll the turns leaving the recent window into the memo in the background."""
+        self.turns.append((user_message, answer))
+        self.turn_count += 1
+        older: List[Tuple[str, str]] = []
+        while len(self.turns) > 1 and (
+            len(self.turns) > REFINE_RECENT_TURNS
+            or sum(count_tokens(u) + count_tokens(a) for u, a in self.turns) > REFINE_HISTORY_TOKENS
+        ):
+            older.append(self.turns.pop(0))
+        if older:
+            self._rolling = asyncio.create_task(self._roll(older, user_id, self._rolling))
+
+    async def _roll(self, older: List[Tuple[str, str]], user_id: str, previous: Optional[asyncio.Task]) -> None:
+        if previous is not None:
+            # Memo updates apply in turn order
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            self.memo = await asyncio.to_thread(compress_memo, self.memo, older, user_id)
+        except Exception as e:
+            # No LLM: keep the user's requests verbatim (truncated) rather than lose them
+            log_event("refine memo fallback", level=logging.WARNING, error=str(e))
+            self.memo = extractive_memo(self.memo, older)
+
+
+def format_exchanges(turns: List[Tuple[str, str]], answer_chars: int = 1500) -> str:
+    return "\n\n".join(
+        f"User: {user_message}\nAssistant: {answer[:answer_chars]}{'…' if len(answer) > answer_chars else ''}"
+        for user_message, answer in turns
+    )
+
+
+def compress_memo(memo: str, turns: List[Tuple[str, str]], user_id: str) -> str:
+    """Current memo + exchanges leaving the recent window -> new memo (one LLM call)."""
+    return llm.for_user(user_id).complete({
+        "model": REFINE_MEMO_MODEL,
+        "messages": [
+            {"role": "system", "content": MEMO_PROMPT.format(words=int(REFINE_MEMO_TOKENS * 0.7))},
+            {"role": "user", "content": f"Current memo:\n{memo or '(empty)'}\n\nNew exchanges:\n{format_exchanges(turns)}"},
+        ],
+        "temperature": 0,
+        "max_tokens": REFINE_MEMO_TOKENS,
+    }).strip()
+
+
+def extractive_memo(memo: str, turns: List[Tuple[str, str]], max_chars: int = REFINE_MEMO_TOKENS * 3) -> str:
+    """Memo without an LLM: earlier user requests, newest kept when it gets too long."""
+    lines = ([memo] if memo else []) + [f"- User asked: {user_message[:200]}" for user_message, _ in turns]
+    return "\n".join(lines)[-max_chars:]
+
+
+class RefineSessionStore:
+    """In-process LRU of refinement sessions, expiring after `ttl` seconds without a turn."""
+
+    def __init__(self, ttl: float = REFINE_SESSION_TTL_SECONDS, max_entries: int = REFINE_SESSION_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._sessions: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (session, expires_at)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "reseeded": 0, "expired": 0}
+
+    def open(
+        self,
+        user_id: str,
+        summary_id: str,
+        session_id: Optional[str],
+        chat_history: List[Dict],
+        expected_turns: int = 0,
+    ) -> RefineSession:
+        """
+        The session of this conversation, created (or reseeded from
+        `chat_history`) if missing. Without a session id, as sent by older
+        clients, an unstored session is built from `chat_history` each turn.
+
+        Raises SessionExpiredError if the client expects `expected_turns`
+        earlier turns that the server no longer has and sent no history.
+        """
+        if not session_id:
+            return RefineSession.from_history(chat_history)
+
+        key = (user_id, summary_id, session_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None and entry[1] > now and entry[0].turn_count >= expected_turns:
+                self._sessions[key] = (entry[0], now + self.ttl)
+                self._sessions.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0]
+            if entry is not None:
+                self.stats["expired"] += 1
+            if expected_turns > 0 and not chat_history:
+                self.stats["misses"] += 1
+                raise SessionExpiredError(session_id)
+            session = RefineSession.from_history(chat_history)
+            self.stats["reseeded" if chat_history else "misses"] += 1
+            self._sessions[key] = (session, now + self.ttl)
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+            return session
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._sessions)}
+
+
+refine_sessions = RefineSessionStore()
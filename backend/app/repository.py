@@ -0,0 +1,279 @@
+"""
+Async data-access layer over Supabase's PostgREST API.
+
+All queries share one pooled httpx.AsyncClient (keep-alive connections, no
+per-request TLS handshake) and never block the event loop. Related rows are
+fetched with PostgREST resource embedding, so e.g. a meeting, its transcript
+and all segments come back in a single round-trip.
+"""
+import os
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+from app.metrics import db_query_duration
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_TIMEOUT_SECONDS = float(os.getenv("DB_TIMEOUT_SECONDS", "30"))
+
+
+# Columns returned by list endpoints: everything but the full summary text
+SUMMARY_LIST_COLUMNS = (
+    "id,meeting_id,transcript_id,title,summary_preview,format,language,detail_level,"
+    "model_used,generation_time_seconds,created_at,updated_at"
+)
+
+
+class QueryStats:
+    """Per-query-name timing counters."""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0})
+
+    def record(self, name: str, seconds: float) -> None:
+        stat = self._stats[name]
+        stat["count"] += 1
+        stat["total"] += seconds
+        stat["max"] = max(stat["max"], seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "count": int(stat["count"]),
+                "mean_seconds": stat["total"] / stat["count"] if stat["count"] else 0.0,
+                "max_seconds": stat["max"],
+            }
+            for name, stat in self._stats.items()
+        }
+
+
+class Repository:
+    def __init__(self, url: Optional[str] = SUPABASE_URL, key: Optional[str] = SUPABASE_SERVICE_ROLE_KEY):
+        self.base_url = f"{(url or '').rstrip('/')}/rest/v1"
+        self.key = key
+        self.stats = QueryStats()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"apikey": self.key or "", "Authorization": f"Bearer {self.key}"},
+            limits=httpx.Limits(max_connections=DB_POOL_SIZE, max_keepalive_connections=DB_POOL_SIZE),
+            timeout=DB_TIMEOUT_SECONDS,
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("Repository not started")
+        return self._client
+
+    async def _request(
+        self,
+        name: str,
+        method: str,
+        table: str,
+        params: Optional[Dict[str, str]] = None,
+        json: Any = None,
+        prefer: Optional[str] = None,
+    ) -> List[Dict]:
+        headers = {"Prefer": prefer} if prefer else {}
+        start = time.perf_counter()
+        try:
+            res = await self.client.request(method, f"/{table}", params=params, json=json, headers=headers)
+            res.raise_for_status()
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stats.record(name, elapsed)
+            db_query_duration.observe(elapsed, query=name)
+        return res.json() if res.content else []
+
+    @staticmethod
+    def _eq(filters: Dict[str, Any]) -> Dict[str, str]:
+        return {column: f"eq.{value}" for column, value in filters.items()}
+
+    # Generic operations -------------------------------------------------
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+        params: Optional[Dict[str, str]] = None,
+        **eq,
+    ) -> List[Dict]:
+        """SELECT columns FROM table WHERE col = value AND ... (order like 'created_at.desc')."""
+        query = {"select": columns, **self._eq(eq), **(params or {})}
+        if order:
+            query["order"] = order
+        if limit is not None:
+            query["limit"] = str(limit)
+        return await self._request(f"select:{table}", "GET", table, params=query)
+
+    async def insert(self, table: str, rows: Dict | List[Dict]) -> List[Dict]:
+        return await self._request(f"insert:{table}", "POST", table, json=rows, prefer="return=representation")
+
+    async def upsert(self, table: str, rows: Dict | List[Dict], on_conflict: str, ignore_duplicates: bool = False) -> List[Dict]:
+        """
+        INSERT ... ON CONFLICT (on_conflict) DO UPDATE (or DO NOTHING with
+        `ignore_duplicates`, in which case existing rows are not returned).
+        """
+        resolution = "ignore-duplicates" if ignore_duplicates else "merge-duplicates"
+        return await self._request(
+            f"upsert:{table}", "POST", table, params={"on_conflict": on_conflict}, json=rows,
+            prefer=f"resolution={resolution},return=representation",
+        )
+
+    async def update(self, table: str, values: Dict, **eq) -> List[Dict]:
+        return await self._request(
+            f"update:{table}", "PATCH", table, params=self._eq(eq), json=values, prefer="return=representation"
+        )
+
+    async def delete(self, table: str, **eq) -> List[Dict]:
+        return await self._request(f"delete:{table}", "DELETE", table, params=self._eq(eq), prefer="return=representation")
+
+    async def rpc(self, function: str, args: Dict) -> List[Dict]:
+        """Call a Postgres function exposed by PostgREST."""
+        return await self._request(f"rpc:{function}", "POST", f"rpc/{function}", json=args)
+
+    async def list_summaries(
+        self,
+        user_id: str,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        format: Optional[str] = None,
+        language: Optional[str] = None,
+        created_after: Optional[str] = None,
+        created_before: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        One page of a user's summaries, newest first, with the list projection.
+
+        Keyset pagination on (created_at, id): `after` is the (created_at, id)
+        of the last row of the previous page, so each page is an index range
+        scan whatever its depth.
+        """
+        params = {
+            "select": SUMMARY_LIST_COLUMNS,
+            "user_id": f"eq.{user_id}",
+            "order": "created_at.desc,id.desc",
+            "limit": str(limit),
+        }
+        if format:
+            params["format"] = f"eq.{format}"
+        if language:
+            params["language"] = f"eq.{language}"
+        created_filters = []
+        if created_after:
+            created_filters.append(f'created_at.gte."{created_after}"')
+        if created_before:
+            created_filters.append(f'created_at.lt."{created_before}"')
+        if after is not None:
+            created_at, last_id = after
+            created_filters.append(
+                f'or(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{last_id}))'
+            )
+        if created_filters:
+            params["and"] = f"({','.join(created_filters)})"
+        return await self._request("list_summaries", "GET", "summaries", params=params)
+
+    # Joined queries -----------------------------------------------------
+
+    async def iter_segments(self, transcript_id: str, page_size: int) -> AsyncIterator[List[Dict]]:
+        """
+        A transcript's segments in chronological order, one page at a time.
+
+        Keyset pagination on (start_seconds, id), so long transcripts are
+        never loaded whole and deep pages cost the same as the first.
+        """
+        after: Optional[Tuple[float, str]] = None
+        while True:
+            params = {
+                "select": "id,start_seconds,end_seconds,text",
+                "transcript_id": f"eq.{transcript_id}",
+                "order": "start_seconds.asc,id.asc",
+                "limit": str(page_size),
+            }
+            if after is not None:
+                start, last_id = after
+                params["or"] = f"(start_seconds.gt.{start},and(start_seconds.eq.{start},id.gt.{last_id}))"
+            page = await self._request("iter_segments", "GET", "segments", params=params)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            after = (page[-1]["start_seconds"], page[-1]["id"])
+
+    async def get_meeting_with_segments(self, meeting_id: str) -> Tuple[Optional[Dict], Optional[str], List[Dict]]:
+        """
+        Meeting, its transcript id and its ordered segments, in one round-trip
+        (two when the transcript reuses another one's segments).
+
+        Returns (None, None, []) if the meeting doesn't exist and
+        (meeting, None, []) if it has no transcript yet.
+        """
+        rows = await self._request(
+            "get_meeting_with_segments", "GET", "meetings",
+            params={
+                "select": "*,transcripts(id,source_transcript_id,segments(start_seconds,end_seconds,text))",
+                "id": f"eq.{meeting_id}",
+                "transcripts.segments.order": "start_seconds.asc",
+            },
+        )
+        if not rows:
+            return None, None, []
+        meeting = rows[0]
+        transcripts = meeting.pop("transcripts", None) or []
+        if not transcripts:
+            return meeting, None, []
+        transcript = transcripts[0]
+        if transcript.get("source_transcript_id"):
+            return meeting, transcript["id"], await self._segments(transcript["source_transcript_id"])
+        return meeting, transcript["id"], transcript.get("segments") or []
+
+    async def _segments(self, transcript_id: str) -> List[Dict]:
+        return await self.select(
+            "segments", "start_seconds,end_seconds,text", order="start_seconds.asc", transcript_id=transcript_id
+        )
+
+    async def get_transcript_segments(self, transcript_id: str) -> List[Dict]:
+        """A transcript's ordered segments, following its copy-on-write reference if it has one."""
+        rows = await self._request(
+            "get_transcript_segments", "GET", "transcripts",
+            params={
+                "select": "source_transcript_id,segments(start_seconds,end_seconds,text)",
+                "id": f"eq.{transcript_id}",
+                "segments.order": "start_seconds.asc",
+            },
+        )
+        if not rows:
+            return []
+        if rows[0].get("source_transcript_id"):
+            return await self._segments(rows[0]["source_transcript_id"])
+        return rows[0].get("segments") or []
+
+    async def find_transcribed_audio(self, user_id: str, column: str, digest: str) -> List[Dict]:
+        """
+        The user's done meetings whose audio has this hash (`audio_sha256` or
+        `audio_pcm_sha256`), oldest first. Never another user's: a match would
+        hand them that user's transcript.
+        """
+        return await self.select(
+            "meetings", "id,audio_path,language,audio_pcm_sha256,transcripts(id,model,language,source_transcript_id)",
+            order="created_at.asc", limit=5, user_id=user_id, status="done", **{column: digest},
+        )
+
+
+db = Repository()
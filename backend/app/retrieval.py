@@ -0,0 +1,120 @@
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from app.segments import SegmentTable
+
+# Transcript tokens given to each /refine-summary turn, and how many segments may be retrieved
+REFINE_CONTEXT_TOKENS = int(os.getenv("REFINE_CONTEXT_TOKENS", "3000"))
+REFINE_CONTEXT_TOP_K = int(os.getenv("REFINE_CONTEXT_TOP_K", "40"))
+TRANSCRIPT_INDEX_CACHE_ENTRIES = int(os.getenv("TRANSCRIPT_INDEX_CACHE_ENTRIES", "128"))
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words without accents, so 'réunion' matches 'reunion'."""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return [t for t in _TOKEN_RE.findall(folded) if len(t) > 1]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the segments of one transcript.
+
+    Built once per transcript; each query only walks the postings of its own
+    terms, so retrieval stays cheap whatever the length of the meeting.
+    """
+
+    def __init__(self, segments: SegmentTable, k1: float = 1.5, b: float = 0.75):
+        self.segments = segments
+        self.k1 = k1
+        self.b = b
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[tuple]] = {}  # term -> [(segment index, term frequency)]
+        for i, text in enumerate(segments.texts()):
+            terms = tokenize(text)
+            self.lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings.setdefault(term, []).append((i, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """Segment index -> BM25 score, for segments matching at least one query term."""
+        n = len(self.segments)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[i] / (self.avg_length or 1))
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return scores
+
+    def select_context(
+        self,
+        query: str,
+        max_tokens: int,
+        count_tokens: Callable[[str], int],
+        top_k: int = REFINE_CONTEXT_TOP_K,
+    ) -> SegmentTable:
+        """
+        Best matching segments for `query` that fit in `max_tokens`, in chronological order.
+
+        Queries that match nothing ("make it shorter") get segments spread
+        evenly over the meeting instead, so the model still sees all of it.
+        """
+        scores = self.scores(query)
+        if scores:
+            candidates = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        else:
+            # About as many segments as fit in the budget (~1.3 tokens per word), evenly spaced
+            fits = int(max_tokens / (self.avg_length * 1.3 + 8)) if self.segments else 0
+            count = max(1, min(top_k, fits))
+            step = max(1, len(self.segments) // count)
+            candidates = list(range(0, len(self.segments), step))[:count]
+
+        # Counted once per transcript, then shared by every turn of every refinement
+        counts = self.segments.token_counts(count_tokens)
+        picked: List[int] = []
+        used = 0
+        for i in candidates:
+            cost = int(counts[i]) + 8  # + timestamp prefix
+            if used + cost > max_tokens:
+                continue
+            picked.append(i)
+            used += cost
+        return self.segments.take(sorted(picked))
+
+
+class TranscriptIndexCache:
+    """LRU of BM25 indexes by transcript id, filled at transcription time or on first use."""
+
+    def __init__(self, max_entries: int = TRANSCRIPT_INDEX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._indexes: "OrderedDict[str, BM25Index]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, transcript_id: str) -> Optional[BM25Index]:
+        with self._lock:
+            index = self._indexes.get(transcript_id)
+            if index is not None:
+                self._indexes.move_to_end(transcript_id)
+            return index
+
+    def put(self, transcript_id: str, index: BM25Index) -> None:
+        with self._lock:
+            self._indexes[transcript_id] = index
+            self._indexes.move_to_end(transcript_id)
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+
+
+transcript_indexes = TranscriptIndexCache()
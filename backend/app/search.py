@@ -0,0 +1,178 @@
+"""
+Full-text search over transcript segments and summaries.
+
+Two interchangeable backends, selected with SEARCH_BACKEND:
+
+- postgres (default): tsvector columns generated by Postgres on every insert
+  and update of `segments` / `summaries` (migration 006), GIN indexes, and a
+  `search_meetings` SQL function called through PostgREST RPC. The index is
+  maintained by the database itself, so the `index_*` hooks are no-ops.
+- sqlite: a local FTS5 index for development and tests, fed incrementally by
+  the `index_*` hooks called where segments and summaries are written.
+
+Both return the same hits, best first:
+    {kind: "segment" | "summary", id, meeting_id, title, start_seconds,
+     end_seconds, snippet, rank}
+Snippets highlight matches with <mark>...</mark>; segment hits carry their
+timestamps so the client can jump to that point of the recording.
+"""
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from app.repository import db
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "postgres")  # postgres, sqlite
+SEARCH_DB_PATH = os.getenv("SEARCH_DB_PATH", "search.db")
+SEARCH_KINDS = ("segment", "summary")
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def fts5_query(query: str) -> str:
+    """User input -> FTS5 MATCH expression: every word must match (prefix match on the last one)."""
+    terms = _TERM.findall(query)
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class PostgresSearchIndex:
+    """Search through the `search_meetings` function; Postgres keeps the index up to date."""
+
+    indexes_segments = False  # callers needn't load segments just to index them
+
+    async def index_segments(self, user_id: str, meeting_id: str, title: str, segments: Iterable[Dict]) -> None:
+        pass
+
+    async def index_summary(self, summary: Dict) -> None:
+        pass
+
+    async def remove_summary(self, summary_id: str) -> None:
+        pass
+
+    async def search(self, user_id: str, query: str, limit: int = 20, kind: Optional[str] = None) -> List[Dict]:
+        return await db.rpc("search_meetings", {
+            "p_user_id": user_id,
+            "p_query": query,
+            "p_limit": limit,
+            "p_kind": kind,
+        })
+
+
+class SqliteSearchIndex:
+    """Local FTS5 index, ranked with bm25 (lower is better, negated into `rank`)."""
+
+    indexes_segments = True
+
+    def __init__(self, db_path: str = SEARCH_DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+                text, id UNINDEXED, user_id UNINDEXED, meeting_id UNINDEXED, title UNINDEXED,
+                start_seconds UNINDEXED, end_seconds UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        self._conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS summaries_fts USING fts5(
+                title, summary_text, id UNINDEXED, user_id UNINDEXED, meeting_id UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+
+    # sqlite3 calls block: the async methods run them in a thread
+
+    async def index_segments(self, user_id: str, meeting_id: str, title: str, segments: Iterable[Dict]) -> None:
+        rows = [
+            (seg["text"], seg["id"], user_id, meeting_id, title, seg["start_seconds"], seg["end_seconds"])
+            for seg in segments
+        ]
+        await asyncio.to_thread(self._insert_segments, rows)
+
+    async def index_summary(self, summary: Dict) -> None:
+        """Insert or replace a summary (called after /summarize and /refine-summary)."""
+        await asyncio.to_thread(self._replace_summary, summary)
+
+    async def remove_summary(self, summary_id: str) -> None:
+        await asyncio.to_thread(self._delete_summary, summary_id)
+
+    async def search(self, user_id: str, query: str, limit: int = 20, kind: Optional[str] = None) -> List[Dict]:
+        match = fts5_query(query)
+        if not match:
+            return []
+        return await asyncio.to_thread(self._search, user_id, match, limit, kind)
+
+    def _insert_segments(self, rows: List[tuple]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO segments_fts (text, id, user_id, meeting_id, title, start_seconds, end_seconds) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _replace_summary(self, summary: Dict) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM summaries_fts WHERE id = ?", (summary["id"],))
+                self._conn.execute(
+                    "INSERT INTO summaries_fts (title, summary_text, id, user_id, meeting_id) VALUES (?, ?, ?, ?, ?)",
+                    (summary["title"], summary["summary_text"], summary["id"], summary["user_id"], summary["meeting_id"]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _delete_summary(self, summary_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM summaries_fts WHERE id = ?", (summary_id,))
+
+    def _search(self, user_id: str, match: str, limit: int, kind: Optional[str]) -> List[Dict]:
+        hits: List[Dict] = []
+        with self._lock:
+            if kind in (None, "segment"):
+                rows = self._conn.execute(
+                    """
+                    SELECT 'segment' AS kind, id, meeting_id, title, start_seconds, end_seconds,
+                           snippet(segments_fts, 0, '<mark>', '</mark>', '…', 30) AS snippet,
+                           -bm25(segments_fts) AS rank
+                    FROM segments_fts
+                    WHERE segments_fts MATCH ? AND user_id = ?
+                    ORDER BY bm25(segments_fts) LIMIT ?
+                    """,
+                    (match, user_id, limit),
+                )
+                hits.extend(dict(row) for row in rows)
+            if kind in (None, "summary"):
+                rows = self._conn.execute(
+                    """
+                    SELECT 'summary' AS kind, id, meeting_id, title, NULL AS start_seconds, NULL AS end_seconds,
+                           snippet(summaries_fts, 1, '<mark>', '</mark>', '…', 30) AS snippet,
+                           -bm25(summaries_fts, 2.0, 1.0) AS rank
+                    FROM summaries_fts
+                    WHERE summaries_fts MATCH ? AND user_id = ?
+                    ORDER BY bm25(summaries_fts, 2.0, 1.0) LIMIT ?
+                    """,
+                    (match, user_id, limit),
+                )
+                hits.extend(dict(row) for row in rows)
+        hits.sort(key=lambda hit: hit["rank"], reverse=True)
+        return hits[:limit]
+
+
+if SEARCH_BACKEND == "postgres":
+    search_index = PostgresSearchIndex()
+elif SEARCH_BACKEND == "sqlite":
+    search_index = SqliteSearchIndex()
+else:
+    raise ValueError("SEARCH_BACKEND must be 'postgres' or 'sqlite'.")
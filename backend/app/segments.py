@@ -0,0 +1,170 @@
+"""
+Columnar in-memory form of a transcript's segments.
+
+Segments come back from PostgREST as one dict per row, with the timestamps
+as JSON numbers or numeric strings. The summarization and refinement paths
+used to walk those dicts again on every pass (float() conversions, f-string
+formatting, token counting). A SegmentTable is built once from the rows:
+start/end columns in NumPy arrays and all texts in one string buffer with
+offsets, so slicing by time is a binary search, a contiguous range is a
+view, and character/token totals of any range are prefix-sum lookups.
+"""
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+# Line prefixes: %-templates taking (start, end), or a constant
+SUMMARY_LINE = "- [%.1fs–%.1fs] "
+SUMMARY_LINE_PLAIN = "- "
+REFINE_LINE = "[%.1fs-%.1fs] "
+
+
+class SegmentTable:
+    """
+    Immutable, chronologically ordered segments.
+
+    Texts are stored back to back in `buffer`, each followed by a newline;
+    text i is `buffer[offsets[i]:offsets[i + 1] - 1]`. Slices share the
+    buffer and views of the columns with the table they come from.
+    """
+
+    __slots__ = ("starts", "ends", "buffer", "offsets", "_cache", "_lock")
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, buffer: str, offsets: np.ndarray):
+        self.starts = starts
+        self.ends = ends
+        self.buffer = buffer
+        self.offsets = offsets
+        self._cache: Dict = {}  # formatted lines and token counts, computed on first use
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict]) -> "SegmentTable":
+        """Build from segment rows (start_seconds, end_seconds, text), already in chronological order."""
+        rows = list(rows)
+        texts = [row["text"] or "" for row in rows]
+        starts = np.fromiter((row["start_seconds"] for row in rows), dtype=np.float64, count=len(rows))
+        ends = np.fromiter((row["end_seconds"] for row in rows), dtype=np.float64, count=len(rows))
+        return cls.from_columns(starts, ends, texts)
+
+    @classmethod
+    def from_columns(cls, starts: np.ndarray, ends: np.ndarray, texts: Sequence[str]) -> "SegmentTable":
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(t) + 1 for t in texts], out=offsets[1:])
+        buffer = "".join(t + "\n" for t in texts)
+        return cls(starts, ends, buffer, offsets)
+
+    @classmethod
+    def of(cls, segments: Union["SegmentTable", Iterable[Dict]]) -> "SegmentTable":
+        """`segments` itself if it already is a table, else a table built from its rows."""
+        return segments if isinstance(segments, SegmentTable) else cls.from_rows(segments)
+
+    # Access ---------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def text(self, i: int) -> str:
+        return self.buffer[self.offsets[i]:self.offsets[i + 1] - 1]
+
+    def texts(self) -> List[str]:
+        """All texts, cut from the buffer in one split (unless some contain newlines themselves)."""
+        def compute() -> List[str]:
+            block = self.buffer[int(self.offsets[0]):int(self.offsets[-1])]
+            if block.count("\n") == len(self):
+                return block.split("\n")[:-1]
+            return [self.text(i) for i in range(len(self))]
+        return self._cached("texts", compute)
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Rows as dicts (start_seconds, end_seconds, text), for code that still expects them."""
+        for start, end, text in zip(self.starts.tolist(), self.ends.tolist(), self.texts()):
+            yield {"start_seconds": start, "end_seconds": end, "text": text}
+
+    # Slicing --------------------------------------------------------------
+
+    def __getitem__(self, key: slice) -> "SegmentTable":
+        """Contiguous range of segments, sharing this table's buffer."""
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            return self.take(range(start, stop, step))
+        stop = max(start, stop)
+        return SegmentTable(self.starts[start:stop], self.ends[start:stop], self.buffer, self.offsets[start:stop + 1])
+
+    def between(self, start_seconds: float, end_seconds: float) -> "SegmentTable":
+        """Segments starting in [start_seconds, end_seconds)."""
+        lo, hi = np.searchsorted(self.starts, [start_seconds, end_seconds], side="left")
+        return self[int(lo):int(hi)]
+
+    def take(self, indices: Iterable[int]) -> "SegmentTable":
+        """Segments at `indices` (kept in that order), in a new table."""
+        indices = np.fromiter(indices, dtype=np.int64)
+        return SegmentTable.from_columns(
+            self.starts[indices], self.ends[indices], [self.text(i) for i in indices.tolist()]
+        )
+
+    # Lengths --------------------------------------------------------------
+
+    @property
+    def char_count(self) -> int:
+        """Characters of all texts (separators excluded)."""
+        return int(self.offsets[-1] - self.offsets[0]) - len(self)
+
+    @property
+    def duration(self) -> float:
+        return float(self.ends[-1] - self.starts[0]) if len(self) else 0.0
+
+    def token_counts(self, count_tokens: Callable[[str], int]) -> np.ndarray:
+        """Token count of each text, computed once per counter."""
+        return self._cached(("tokens", count_tokens), lambda: np.fromiter(
+            (count_tokens(t) for t in self.texts()), dtype=np.int64, count=len(self)
+        ))
+
+    def token_total(self, count_tokens: Callable[[str], int], start: int = 0, stop: Optional[int] = None) -> int:
+        """Tokens of texts [start, stop), an O(1) lookup once the counts are known."""
+        prefix = self._cached(("token_prefix", count_tokens), lambda: np.concatenate(
+            ([0], np.cumsum(self.token_counts(count_tokens)))
+        ))
+        stop = len(self) if stop is None else stop
+        return int(prefix[stop] - prefix[start])
+
+    # Formatting -----------------------------------------------------------
+
+    def stamps(self, prefix: str) -> List[str]:
+        """
+        `prefix % (start, end)` for every segment, in a single formatting call
+        over the interleaved columns instead of one per segment.
+        """
+        n = len(self)
+        if "%" not in prefix:
+            return [prefix] * n
+        interleaved = np.empty(2 * n, dtype=np.float64)
+        interleaved[0::2] = self.starts
+        interleaved[1::2] = self.ends
+        return ((prefix + "\0") * n % tuple(interleaved.tolist())).split("\0")[:n]
+
+    def lines(self, prefix: str = SUMMARY_LINE) -> List[str]:
+        """One `<prefix><text>` line per segment, cached per prefix."""
+        return self._cached(("lines", prefix), lambda: [
+            stamp + text for stamp, text in zip(self.stamps(prefix), self.texts())
+        ])
+
+    def line_token_counts(self, prefix: str, count_tokens: Callable[[str], int]) -> List[int]:
+        """Token count of each formatted line, cached per prefix and counter."""
+        return self._cached(("line_tokens", prefix, count_tokens), lambda: [
+            count_tokens(line) for line in self.lines(prefix)
+        ])
+
+    def render(self, prefix: str = SUMMARY_LINE) -> str:
+        return "\n".join(self.lines(prefix))
+
+    def _cached(self, key, compute):
+        with self._lock:
+            value = self._cache.get(key)
+        if value is None:
+            value = compute()
+            with self._lock:
+                value = self._cache.setdefault(key, value)
+        return value
+
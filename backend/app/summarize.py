@@ -1,6 +1,22 @@
+import hashlib
+import json
 import os
-from typing import List, Dict, Optional
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Optional, Tuple, Union
+
+from app.summary_cache import summary_cache, make_key
+from app.llm import llm, LLMClient
+from app.metrics import in_context, log_event, span
+from app.chunking import get_token_counter, chunk_token_budget, pack_lines, CHUNK_OVERLAP_TOKENS
+from app.segments import SegmentTable, SUMMARY_LINE, SUMMARY_LINE_PLAIN
+
+# Map-reduce tuning (overridable via .env)
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+# Variants of one /summarize/batch request summarized at the same time
+SUMMARY_MAX_VARIANTS_CONCURRENCY = int(os.getenv("SUMMARY_MAX_VARIANTS_CONCURRENCY", "3"))
+SUMMARY_MODEL = "gpt-4o-mini"  # Most cost-effective model
+MAX_CHUNK_TOKENS = chunk_token_budget(SUMMARY_MODEL)  # Also the budget for one combine call
+count_tokens = get_token_counter(SUMMARY_MODEL)
 
 # System prompts by language - ADAPTIVE STRUCTURE
 SYSTEM_PROMPTS = {
@@ -160,68 +176,9 @@ Transcription:
     }
 }
 
-def build_segments_md(segments: List[Dict], include_timestamps: bool = True) -> str:
-    lines = []
-    for s in segments:
-        start = float(s["start_seconds"])
-        end = float(s["end_seconds"])
-        txt = s["text"]
-        if include_timestamps:
-            lines.append(f"- [{start:.1f}s–{end:.1f}s] {txt}")
-        else:
-            lines.append(f"- {txt}")
-    return "\n".join(lines)
-
-def chunk_segments(segments: List[Dict], max_chars: int = 20000) -> List[str]:
-    """
-    Split segments into chunks that fit within token limits.
-    Each chunk will be around max_chars to stay under GPT token limits.
-    Optimized for fewer chunks = lower API costs.
-    """
-    chunks = []
-    current_chunk = []
-    current_length = 0
-
-    for seg in segments:
-        seg_text = f"[{seg['start_seconds']:.1f}s–{seg['end_seconds']:.1f}s] {seg['text']}\n"
-        seg_length = len(seg_text)
-
-        if current_length + seg_length > max_chars and current_chunk:
-            # Save current chunk and start new one
-            chunks.append("".join(current_chunk))
-            current_chunk = [seg_text]
-            current_length = seg_length
-        else:
-            current_chunk.append(seg_text)
-            current_length += seg_length
-
-    # Add the last chunk
-    if current_chunk:
-        chunks.append("".join(current_chunk))
-
-    return chunks
-
-
-def summarize_chunk(client: OpenAI, chunk: str, system_prompt: str, user_prompt_template: str, chunk_index: int, total_chunks: int) -> str:
-    """Summarize a single chunk of the meeting."""
-    chunk_info = f"\n\n[This is part {chunk_index + 1} of {total_chunks} of the meeting]" if total_chunks > 1 else ""
-
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",  # Most cost-effective model
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt_template.format(segments=chunk) + chunk_info},
-        ],
-        temperature=0.2,
-        max_tokens=1500 if total_chunks > 1 else 3000,  # Optimized for cost
-    )
-    return resp.choices[0].message.content
-
-
-def combine_summaries(client: OpenAI, summaries: List[str], system_prompt: str, language: str) -> str:
-    """Combine multiple chunk summaries into one coherent summary with adaptive structure."""
-    combine_prompt = {
-        "en": """You are reviewing multiple partial summaries of a long meeting. Your task is to combine them into one comprehensive, coherent summary.
+# Prompts used when merging partial summaries of long meetings
+COMBINE_PROMPTS = {
+    "en": """You are reviewing multiple partial summaries of a long meeting. Your task is to combine them into one comprehensive, coherent summary.
 
 IMPORTANT: Analyze the content of all partial summaries to:
 1. Identify the overall meeting type and themes
@@ -239,7 +196,7 @@ Partial summaries:
 {summaries}
 
 Provide a complete, unified summary with a dynamic structure that best represents the full meeting.""",
-        "fr": """Tu examines plusieurs résumés partiels d'une longue réunion. Ta tâche est de les combiner en un seul résumé complet et cohérent.
+    "fr": """Tu examines plusieurs résumés partiels d'une longue réunion. Ta tâche est de les combiner en un seul résumé complet et cohérent.
 
 IMPORTANT: Analyse le contenu de tous les résumés partiels pour:
 1. Identifier le type global de réunion et les thèmes
@@ -257,85 +214,329 @@ Résumés partiels:
 {summaries}
 
 Fournis un résumé complet et unifié avec une structure dynamique qui représente au mieux la réunion complète."""
-    }
+}
 
-    lang = language if language in combine_prompt else "en"
-    numbered_summaries = "\n\n".join([f"## Part {i+1}\n{s}" for i, s in enumerate(summaries)])
+# Bumped automatically whenever any prompt changes, so cached summaries are invalidated
+PROMPT_VERSION = hashlib.sha256(
+    json.dumps([SYSTEM_PROMPTS, USER_PROMPTS, COMBINE_PROMPTS], sort_keys=True).encode("utf-8")
+).hexdigest()[:16]
+
+
+# Segment rows as returned by the repository, or a table already built from them
+Segments = Union[SegmentTable, List[Dict]]
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",  # Most cost-effective model
-        messages=[
+
+def format_segment_lines(segments: Segments, include_timestamps: bool = True) -> List[str]:
+    """Format each segment once; the same lines feed both the full markdown and the chunks."""
+    return SegmentTable.of(segments).lines(SUMMARY_LINE if include_timestamps else SUMMARY_LINE_PLAIN)
+
+
+def build_segments_md(segments: Segments, include_timestamps: bool = True) -> str:
+    return "\n".join(format_segment_lines(segments, include_timestamps))
+
+
+def chunk_segments(
+    segments: Segments,
+    max_tokens: int = MAX_CHUNK_TOKENS,
+    include_timestamps: bool = True,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> List[str]:
+    """
+    Split segments into chunks of at most max_tokens tokens (measured with the
+    model tokenizer, or an offline estimate), never cutting inside a segment.
+    """
+    table = SegmentTable.of(segments)
+    prefix = SUMMARY_LINE if include_timestamps else SUMMARY_LINE_PLAIN
+    return pack_lines(
+        table.lines(prefix), table.line_token_counts(prefix, count_tokens), max_tokens, overlap_tokens, count_tokens
+    )
+
+
+def summarize_chunk(client: LLMClient, chunk: str, system_prompt: str, user_prompt_template: str, chunk_index: int, total_chunks: int) -> str:
+    """Summarize a single chunk of the meeting."""
+    chunk_info = f"\n\n[This is part {chunk_index + 1} of {total_chunks} of the meeting]" if total_chunks > 1 else ""
+
+    return client.complete({
+        "model": SUMMARY_MODEL,
+        "messages": [
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": combine_prompt[lang].format(summaries=numbered_summaries)},
+            {"role": "user", "content": user_prompt_template.format(segments=chunk) + chunk_info},
         ],
-        temperature=0.2,
-        max_tokens=3000,  # Optimized for cost while preserving quality
-    )
-    return resp.choices[0].message.content
+        "temperature": 0.2,
+        "max_tokens": 1500 if total_chunks > 1 else 3000,  # Optimized for cost
+    })
+
+
+def combine_request(summaries: List[str], system_prompt: str, language: str) -> Dict:
+    """`chat.completions.create` kwargs combining partial summaries into one with adaptive structure."""
+    lang = language if language in COMBINE_PROMPTS else "en"
+    numbered_summaries = "\n\n".join([f"## Part {i+1}\n{s}" for i, s in enumerate(summaries)])
+    return {
+        "model": SUMMARY_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": COMBINE_PROMPTS[lang].format(summaries=numbered_summaries)},
+        ],
+        "temperature": 0.2,
+        "max_tokens": 3000,  # Optimized for cost while preserving quality
+    }
+
+
+def combine_summaries(client: LLMClient, summaries: List[str], system_prompt: str, language: str) -> str:
+    """Combine multiple chunk summaries into one coherent summary with adaptive structure."""
+    return client.complete(combine_request(summaries, system_prompt, language))
+
+
+def map_chunks(
+    client: LLMClient,
+    chunks: List[str],
+    system_prompt: str,
+    user_prompt_template: str,
+    max_concurrency: int = SUMMARY_MAX_CONCURRENCY,
+) -> List[str]:
+    """Summarize all chunks in parallel (bounded by max_concurrency), preserving chunk order."""
+    def run(i: int) -> str:
+        # Chunk-level cache: only chunks whose text changed are re-summarized
+        key = make_key("chunk", PROMPT_VERSION, SUMMARY_MODEL, system_prompt, user_prompt_template, i, len(chunks), chunks[i])
+
+        def compute() -> str:
+            log_event("summarizing chunk", chunk=i + 1, chunks=len(chunks))
+            return summarize_chunk(client, chunks[i], system_prompt, user_prompt_template, i, len(chunks))
+
+        return summary_cache.get_or_compute(key, compute)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(chunks)))) as executor:
+        return list(executor.map(in_context(run), range(len(chunks))))
+
+
+def group_summaries(summaries: List[str], counts: List[int], max_tokens: int = MAX_CHUNK_TOKENS) -> List[List[str]]:
+    """Pack consecutive summaries into groups whose combined size fits in max_tokens (at least 2 per group)."""
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_length = 0
+    for summary, n in zip(summaries, counts):
+        if current_length + n > max_tokens and len(current) >= 2:
+            groups.append(current)
+            current, current_length = [], 0
+        current.append(summary)
+        current_length += n
+    if current:
+        groups.append(current)
+    return groups
+
+
+def reduce_levels(
+    client: LLMClient,
+    summaries: List[str],
+    system_prompt: str,
+    language: str,
+    max_tokens: int = MAX_CHUNK_TOKENS,
+    max_concurrency: int = SUMMARY_MAX_CONCURRENCY,
+) -> List[str]:
+    """
+    Tree reduce: while the partial summaries don't fit in one combine call,
+    combine them group by group (in parallel) into fewer, higher-level summaries.
+    Returns summaries that fit in the final combine call.
+    """
+    level = 0
+    while True:
+        counts = [count_tokens(s) for s in summaries]
+        if sum(counts) <= max_tokens or len(summaries) <= 2:
+            break
+        groups = group_summaries(summaries, counts, max_tokens)
+        level += 1
+        log_event("reduce level", reduce_level=level, summaries=len(summaries), groups=len(groups))
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(groups)))) as executor:
+            summaries = list(executor.map(
+                in_context(lambda group: group[0] if len(group) == 1 else cached_combine(client, group, system_prompt, language)),
+                groups,
+            ))
+    return summaries
+
+
+def combine_key(summaries: List[str], system_prompt: str, language: str) -> str:
+    return make_key("combine", PROMPT_VERSION, SUMMARY_MODEL, system_prompt, language, summaries)
+
+
+def cached_combine(client: LLMClient, summaries: List[str], system_prompt: str, language: str) -> str:
+    key = combine_key(summaries, system_prompt, language)
+    return summary_cache.get_or_compute(key, lambda: combine_summaries(client, summaries, system_prompt, language))
+
+
+class PreparedTranscript:
+    """
+    Everything about a transcript that doesn't depend on the summary format,
+    language or detail level: segment lines, token counts and chunks. Built
+    once, shared by every variant summarized from the same transcript.
+    """
+
+    def __init__(self, segments: Segments, include_timestamps: bool = True):
+        with span("transcript_prep", segments=len(segments)):
+            self.include_timestamps = include_timestamps
+            table = SegmentTable.of(segments)
+            prefix = SUMMARY_LINE if include_timestamps else SUMMARY_LINE_PLAIN
+            self.lines = table.lines(prefix)
+            self.seg_md = "\n".join(self.lines)
+            # Count tokens once per segment line; the counts drive both the threshold and the packing
+            self.counts = table.line_token_counts(prefix, count_tokens)
+            self.total_tokens = sum(self.counts)
+            self.chunks: List[str] = []
+            if self.total_tokens > MAX_CHUNK_TOKENS:
+                self.chunks = pack_lines(self.lines, self.counts, MAX_CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, count_tokens)
+
+    def cache_key(self, format: str, language: str, detail_level: str) -> str:
+        # Identical transcript + parameters + prompts + model => identical summary
+        return make_key(
+            "summary", PROMPT_VERSION, SUMMARY_MODEL, format, language, detail_level, self.include_timestamps, self.seg_md
+        )
 
 
 def summarize(
-    segments: List[Dict],
+    segments: Segments,
     format: str = "structured",
     language: str = "en",
     detail_level: str = "medium",
-    include_timestamps: bool = True
+    include_timestamps: bool = True,
+    user_id: Optional[str] = None,
 ) -> str:
     """
     Generate a summary from meeting segments with user preferences.
     Handles long meetings by chunking and combining summaries.
 
     Args:
-        segments: List of segment dictionaries with start_seconds, end_seconds, and text
+        segments: Segment rows (start_seconds, end_seconds, text) or a SegmentTable
         format: Summary format - 'structured', 'bullet_points', 'paragraph', 'action_items'
         language: Language code - 'en', 'fr', etc.
         detail_level: Level of detail - 'brief', 'medium', 'detailed'
         include_timestamps: Whether to include timestamps in segment listings
+        user_id: User the LLM calls are scheduled for (fair queuing in the gateway)
 
     Returns:
         str: The generated summary text
     """
-    client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+    return summarize_prepared(PreparedTranscript(segments, include_timestamps), format, language, detail_level, user_id)
+
+
+def summarize_prepared(
+    transcript: PreparedTranscript,
+    format: str = "structured",
+    language: str = "en",
+    detail_level: str = "medium",
+    user_id: Optional[str] = None,
+) -> str:
+    """`summarize` on an already prepared transcript."""
+    with span("summarize", format=format, tokens=transcript.total_tokens, chunks=len(transcript.chunks)) as fields:
+        cache_key = transcript.cache_key(format, language, detail_level)
+        cached = summary_cache.get(cache_key)
+        fields["cache_hit"] = cached is not None
+        if cached is not None:
+            return cached
+
+        client = llm.for_user(user_id)
+        summary, step_key, request = _prepare_final_call(client, transcript, format, language, detail_level)
+        if summary is None:
+            if step_key is not None:
+                summary = summary_cache.get_or_compute(step_key, lambda: client.complete(request))
+            else:
+                summary = client.complete(request)
+        summary_cache.set(cache_key, summary)
+        return summary
+
+
+def summarize_variants(
+    segments: Segments,
+    variants: List[Dict],
+    include_timestamps: bool = True,
+    user_id: Optional[str] = None,
+    max_concurrency: int = SUMMARY_MAX_VARIANTS_CONCURRENCY,
+) -> List[str]:
+    """
+    Summarize the same transcript in several variants (dicts with format,
+    language and detail_level), preparing the transcript once and running
+    the variants concurrently. Results come back in the order of `variants`.
+    """
+    transcript = PreparedTranscript(segments, include_timestamps)
 
+    def run(variant: Dict) -> str:
+        return summarize_prepared(
+            transcript, variant["format"], variant["language"], variant["detail_level"], user_id
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(variants)))) as executor:
+        return list(executor.map(in_context(run), variants))
+
+
+def summarize_stream(
+    segments: Segments,
+    format: str = "structured",
+    language: str = "en",
+    detail_level: str = "medium",
+    include_timestamps: bool = True,
+    user_id: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Same as `summarize`, yielding the summary text as it is generated.
+
+    For long meetings the map and intermediate reduce steps run as usual;
+    only the final LLM call is streamed. A cached summary is yielded at once.
+    """
+    transcript = PreparedTranscript(segments, include_timestamps)
+    cache_key = transcript.cache_key(format, language, detail_level)
+    summary = summary_cache.get(cache_key)
+    if summary is not None:
+        yield summary
+        return
+
+    client = llm.for_user(user_id)
+    summary, step_key, request = _prepare_final_call(client, transcript, format, language, detail_level)
+    if summary is None and step_key is not None:
+        summary = summary_cache.get(step_key)
+    if summary is not None:
+        yield summary
+    else:
+        parts: List[str] = []
+        for delta in client.stream(request):
+            parts.append(delta)
+            yield delta
+        summary = "".join(parts)
+        if step_key is not None:
+            summary_cache.set(step_key, summary)
+    summary_cache.set(cache_key, summary)
+
+
+def _prepare_final_call(
+    client: LLMClient, transcript: PreparedTranscript, format: str, language: str, detail_level: str
+) -> Tuple[Optional[str], Optional[str], Dict]:
+    """
+    Run every step of a summary but the last LLM call.
+
+    Returns (summary, None, {}) when no call is left (single chunk), else
+    (None, cache key of the call or None, `chat.completions.create` kwargs).
+    """
     # Get appropriate prompts, default to English if language not supported
     lang = language if language in SYSTEM_PROMPTS else "en"
     system_prompt = SYSTEM_PROMPTS[lang].get(format, SYSTEM_PROMPTS[lang]["structured"])
     user_prompt_template = USER_PROMPTS[lang].get(detail_level, USER_PROMPTS[lang]["medium"])
 
-    seg_md = build_segments_md(segments, include_timestamps)
-
-    # Check if content is too long and needs chunking
-    # Using higher threshold (20k) to minimize API calls and reduce costs
-    if len(seg_md) > 20000:
-        print(f"Long meeting detected ({len(seg_md)} chars). Using chunking strategy...")
-
-        # Split into chunks
-        chunks = chunk_segments(segments, max_chars=20000)
-        print(f"Split into {len(chunks)} chunks")
-
-        # Summarize each chunk
-        chunk_summaries = []
-        for i, chunk in enumerate(chunks):
-            print(f"Summarizing chunk {i+1}/{len(chunks)}...")
-            summary = summarize_chunk(client, chunk, system_prompt, user_prompt_template, i, len(chunks))
-            chunk_summaries.append(summary)
-
-        # Combine all chunk summaries into final summary
-        if len(chunk_summaries) > 1:
-            print("Combining chunk summaries into final summary...")
-            final_summary = combine_summaries(client, chunk_summaries, system_prompt, lang)
-            return final_summary
-        else:
-            return chunk_summaries[0]
+    if transcript.chunks:
+        log_event("long meeting, map-reduce", tokens=transcript.total_tokens, chunks=len(transcript.chunks))
+
+        # Map: summarize chunks concurrently, results come back in chunk order
+        chunk_summaries = map_chunks(client, transcript.chunks, system_prompt, user_prompt_template)
+        if len(chunk_summaries) == 1:
+            return chunk_summaries[0], None, {}
+
+        # Reduce: combine partial summaries, hierarchically if they don't fit in one call
+        summaries = reduce_levels(client, chunk_summaries, system_prompt, lang)
+        return None, combine_key(summaries, system_prompt, lang), combine_request(summaries, system_prompt, lang)
     else:
         # Short meeting - process normally in single API call (most cost-efficient)
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",  # Most cost-effective model ($0.15/1M input, $0.60/1M output)
-            messages=[
+        return None, None, {
+            "model": SUMMARY_MODEL,  # $0.15/1M input, $0.60/1M output
+            "messages": [
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt_template.format(segments=seg_md)},
+                {"role": "user", "content": user_prompt_template.format(segments=transcript.seg_md)},
             ],
-            temperature=0.2,
-            max_tokens=2500,  # Optimized: enough for detailed summary, lower cost
-        )
-        return resp.choices[0].message.content
+            "temperature": 0.2,
+            "max_tokens": 2500,  # Optimized: enough for detailed summary, lower cost
+        }
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+# Cache configuration (overridable via .env)
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "summary_cache.db")
+SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+SUMMARY_CACHE_MEMORY_ENTRIES = int(os.getenv("SUMMARY_CACHE_MEMORY_ENTRIES", "256"))
+SUMMARY_CACHE_DISK_ENTRIES = int(os.getenv("SUMMARY_CACHE_DISK_ENTRIES", "10000"))
+
+
+def make_key(*parts) -> str:
+    """Content-addressed key: sha256 over the JSON encoding of all parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Two-tier cache for LLM outputs.
+
+    - Memory tier: LRU of the most recently used entries.
+    - Disk tier: SQLite table shared by all workers and kept across restarts.
+
+    Entries expire after `ttl` seconds; both tiers are bounded in entry count
+    and evict the least recently used entries first.
+    """
+
+    def __init__(
+        self,
+        db_path: str = SUMMARY_CACHE_PATH,
+        ttl: int = SUMMARY_CACHE_TTL_SECONDS,
+        memory_entries: int = SUMMARY_CACHE_MEMORY_ENTRIES,
+        disk_entries: int = SUMMARY_CACHE_DISK_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS summary_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_summary_cache_accessed ON summary_cache(accessed_at)")
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[0]
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM summary_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] > now:
+                self._conn.execute("UPDATE summary_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                self._remember(key, row[0], row[1])
+                self.stats["disk_hits"] += 1
+                return row[0]
+            if row is not None:
+                self._conn.execute("DELETE FROM summary_cache WHERE key = ?", (key,))
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summary_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            self._evict_disk(now)
+
+    def _evict_disk(self, now: float) -> None:
+        self._conn.execute("DELETE FROM summary_cache WHERE expires_at <= ?", (now,))
+        count = self._conn.execute("SELECT COUNT(*) FROM summary_cache").fetchone()[0]
+        if count > self.disk_entries:
+            cur = self._conn.execute(
+                "DELETE FROM summary_cache WHERE key IN "
+                "(SELECT key FROM summary_cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.disk_entries,),
+            )
+            self.stats["evictions"] += cur.rowcount
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        """Return the cached value for `key`, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM summary_cache").fetchone()[0]
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+
+summary_cache = SummaryCache()
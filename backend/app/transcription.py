@@ -0,0 +1,96 @@
+"""
+Worker-side transcription functions.
+
+Everything in this module runs inside the job worker processes, so it must
+stay importable without FastAPI or Supabase and return picklable values.
+"""
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from app.whisper_models import registry, WHISPER_DEFAULT_MODEL, WHISPER_WARM_MODELS
+from app.utils.audio_utils import load_audio, pcm_fingerprint, SAMPLE_RATE
+from app.utils.vad import find_windows
+
+
+def init_worker(torch_threads: int = 1, model_loader: Optional[Callable[[str], object]] = None) -> None:
+    """
+    Process pool initializer: pin the torch thread count so that workers
+    don't oversubscribe the cores, then start loading the configured models.
+    A `model_loader` (picklable) replaces whisper.load_model in the worker.
+    """
+    if model_loader is not None:
+        registry.loader = model_loader
+    else:
+        import torch
+
+        torch.set_num_threads(torch_threads)
+    if WHISPER_WARM_MODELS:
+        registry.warm(WHISPER_WARM_MODELS)
+
+
+def run_timed(fn: Callable, *args):
+    """Run `fn(*args)` and return (result, started_at, finished_at) wall-clock timestamps."""
+    started_at = time.time()
+    result = fn(*args)
+    return result, started_at, time.time()
+
+
+def ping() -> bool:
+    """No-op task used to make the pool spawn its workers at startup."""
+    return True
+
+
+def pcm_path_for(raw_path: str) -> Path:
+    """Where the decoded samples of an upload are kept for the window workers."""
+    return Path(f"{raw_path}.pcm.npy")
+
+
+def analyze_upload(
+    raw_path: str, target_seconds: float, first_window_seconds: Optional[float] = None
+) -> Dict:
+    """
+    Decode the upload once, split it at silences into windows of about
+    `target_seconds` (the last one ends at the decoded duration) and
+    fingerprint the decoded audio for deduplication.
+
+    The samples are saved next to the upload as a .npy file (`pcm_path`),
+    which the window workers memory-map instead of decoding the file again.
+    """
+    samples = load_audio(raw_path)
+    pcm_path = pcm_path_for(raw_path)
+    np.save(pcm_path, samples)
+    return {
+        "windows": find_windows(
+            samples, SAMPLE_RATE, target_seconds=target_seconds, first_window_seconds=first_window_seconds
+        ),
+        "pcm_sha256": pcm_fingerprint(samples),
+        "pcm_path": str(pcm_path),
+    }
+
+
+def transcribe_window(pcm_path: str, start: float, end: Optional[float], model_name: str = WHISPER_DEFAULT_MODEL) -> Dict:
+    """
+    Transcribe [start, end) of the decoded upload saved by `analyze_upload`.
+    The file is memory-mapped, so the workers share its pages and only read
+    their own window. Segment times are shifted by `start` so they are
+    absolute positions in the recording.
+    """
+    t0 = time.perf_counter()
+    samples = np.load(pcm_path, mmap_mode="r")
+    audio = np.array(samples[int(start * SAMPLE_RATE):None if end is None else int(end * SAMPLE_RATE)])
+    t1 = time.perf_counter()
+    result = registry.get(model_name).transcribe(audio, fp16=False, word_timestamps=False)
+    t2 = time.perf_counter()
+    return {
+        "model": f"whisper-{model_name}",
+        "text": result.get("text"),
+        "language": result.get("language"),
+        "segments": [
+            {"start": seg["start"] + start, "end": seg["end"] + start, "text": seg["text"]}
+            for seg in result.get("segments", [])
+        ],
+        "timings": {"pcm_load": t1 - t0, "whisper_inference": t2 - t1},
+    }
@@ -0,0 +1,63 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Tuple
+
+import aiofiles
+from fastapi import UploadFile
+
+# Upload limits (overridable via .env)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(1024 * 1024 * 1024)))  # 1 GiB
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # 1 MiB
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the maximum upload size of {max_bytes // (1024 * 1024)} MB")
+        self.max_bytes = max_bytes
+
+
+async def save_upload(
+    file: UploadFile,
+    dest: Path,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> Tuple[int, str]:
+    """
+    Stream an UploadFile to disk chunk by chunk, hashing it on the fly.
+
+    Peak memory is bounded by `chunk_size` whatever the size of the upload.
+    The partial file is removed if the size cap is exceeded.
+
+    Returns:
+        (size in bytes, sha256 hex digest) of the written file.
+
+    Raises:
+        UploadTooLargeError: If the upload is larger than `max_bytes`.
+    """
+    # Reject early when the client announced the size
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(dest, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                hasher.update(chunk)
+                await out.write(chunk)
+    except Exception:
+        dest.unlink(missing_ok=True)
+        raise
+    finally:
+        await file.close()
+
+    return size, hasher.hexdigest()
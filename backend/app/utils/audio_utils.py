@@ -1,16 +1,91 @@
+import hashlib
+import subprocess
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
+
 try:
     from pydub import AudioSegment
 except ImportError:  # pragma: no cover
     AudioSegment = None  # type: ignore
 
+SAMPLE_RATE = 16000
+
+
+def load_audio(
+    input_path: str | Path,
+    start: float = 0.0,
+    duration: Optional[float] = None,
+    sample_rate: int = SAMPLE_RATE,
+) -> np.ndarray:
+    """
+    Decode an audio file straight to a mono float32 NumPy array.
+
+    ffmpeg writes raw samples to a pipe, so no intermediate file is created.
+    The result is the format Whisper expects, and can be passed to
+    `model.transcribe` as is.
+
+    Args:
+        input_path: Path to the input audio file (mp3, m4a, wav, etc.).
+        start: Offset in seconds where decoding starts (ffmpeg seeks, it doesn't decode the skipped part).
+        duration: Number of seconds to decode. Defaults to the rest of the file.
+        sample_rate: Target sample rate (default 16000).
+
+    Returns:
+        float32 samples in [-1, 1].
+
+    Raises:
+        FileNotFoundError: If the input file does not exist.
+        RuntimeError: If ffmpeg fails to decode the file.
+    """
+    src = Path(input_path)
+    if not src.exists():
+        raise FileNotFoundError(f"Input file not found: {src}")
+
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0"]
+    if start > 0:
+        cmd += ["-ss", f"{start:.3f}"]
+    if duration is not None:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += ["-i", str(src), "-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "-"]
+
+    try:
+        out = subprocess.run(cmd, check=True, capture_output=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')[-500:]}") from e
+    return np.frombuffer(out, dtype=np.float32)
+
+
+def pcm_fingerprint(samples: np.ndarray) -> str:
+    """
+    sha256 of decoded samples quantized to 16-bit: identical for the same
+    recording in another container, with other tags or losslessly converted.
+    """
+    pcm = np.round(np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    return hashlib.sha256(pcm.tobytes()).hexdigest()
+
+
+def probe_duration(input_path: str | Path) -> Optional[float]:
+    """Duration in seconds read from the container headers by ffprobe, or None if unknown."""
+    cmd = [
+        "ffprobe", "-v", "error", "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1", str(input_path),
+    ]
+    try:
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.strip()
+        return float(out)
+    except (subprocess.CalledProcessError, ValueError, FileNotFoundError):
+        return None
+
 
 def to_wav(input_path: str | Path, output_path: Optional[str | Path] = None, sample_rate: int = 16000, channels: int = 1) -> Path:
     """
     Convert an audio file to WAV format with the given sample rate and channels.
 
+    Prefer `load_audio` for transcription: it avoids writing and re-reading
+    an intermediate file. This is kept for exporting WAV files.
+
     Args:
         input_path: Path to the input audio file (mp3, m4a, wav, etc.).
         output_path: Optional path for the resulting wav. Defaults to same stem with .wav.
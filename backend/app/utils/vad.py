@@ -0,0 +1,131 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.audio_utils import SAMPLE_RATE
+
+
+def frame_energy(samples: np.ndarray, sample_rate: int = SAMPLE_RATE, frame_ms: int = 30) -> np.ndarray:
+    """RMS energy of consecutive non-overlapping frames."""
+    frame = int(sample_rate * frame_ms / 1000)
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[: n_frames * frame].reshape(n_frames, frame)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def find_windows(
+    samples: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    target_seconds: float = 300.0,
+    search_seconds: float = 30.0,
+    min_silence_seconds: float = 0.3,
+    frame_ms: int = 30,
+    first_window_seconds: Optional[float] = None,
+) -> List[Tuple[float, float]]:
+    """
+    Energy-based VAD splitter.
+
+    Cuts the audio roughly every `target_seconds`, moving each cut to the
+    middle of the quietest silence (at least `min_silence_seconds` long) found
+    within `search_seconds` of the target. Falls back to the quietest single
+    frame when no such silence exists. A shorter `first_window_seconds` gets
+    the first results out sooner when streaming.
+
+    Returns:
+        List of (start_seconds, end_seconds) windows covering the whole audio.
+    """
+    duration = len(samples) / sample_rate
+    length = first_window_seconds or target_seconds
+    if duration <= length * 1.5:
+        return [(0.0, duration)]
+
+    energy = frame_energy(samples, sample_rate, frame_ms)
+    frame_s = frame_ms / 1000
+    # Adaptive threshold: a bit above the noise floor of this recording,
+    # but always well below typical speech energy
+    threshold = max(min(float(np.percentile(energy, 10)) * 2.0, float(np.median(energy)) * 0.5), 1e-4)
+    silent = energy < threshold
+    min_run = max(1, int(min_silence_seconds / frame_s))
+
+    cuts: List[float] = []
+    position = 0.0
+    while duration - position > length * 1.5:
+        target = position + length
+        search = min(search_seconds, length / 3)
+        lo = max(int((target - search) / frame_s), int(position / frame_s) + 1)
+        hi = min(int((target + search) / frame_s), len(energy))
+
+        best: Optional[Tuple[float, int]] = None  # (mean energy, center frame)
+        run_start = None
+        for i in range(lo, hi + 1):
+            if i < hi and silent[i]:
+                if run_start is None:
+                    run_start = i
+                continue
+            if run_start is not None and i - run_start >= min_run:
+                score = float(energy[run_start:i].mean())
+                if best is None or score < best[0]:
+                    best = (score, (run_start + i) // 2)
+            run_start = None
+
+        if best is None:
+            best = (0.0, lo + int(np.argmin(energy[lo:hi])))
+        cut = best[1] * frame_s
+        cuts.append(cut)
+        position = cut
+        length = target_seconds
+
+    bounds = [0.0] + cuts + [duration]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def _words(text: str) -> List[str]:
+    return [w.strip(".,!?;:…").lower() for w in text.split()]
+
+
+class SegmentStitcher:
+    """
+    Incrementally concatenates per-window segments (already in absolute time).
+
+    Drops segments that end before the end of what was already kept, and
+    removes words repeated at the start of a window when Whisper decoded them
+    at the end of the previous window too.
+    """
+
+    def __init__(self, max_overlap_words: int = 8):
+        self.max_overlap_words = max_overlap_words
+        self.last: Optional[dict] = None
+
+    def add(self, segments: List[dict]) -> List[dict]:
+        """Add the next window's segments, returning the ones that were kept."""
+        kept: List[dict] = []
+        first_kept = self.last is not None  # trim the first segment of the window that is not already covered
+        for seg in segments:
+            if self.last is not None and seg["end"] <= self.last["end"]:
+                continue
+            if first_kept:
+                first_kept = False
+                prev_words = _words(self.last["text"])
+                words = seg["text"].split()
+                norm = _words(seg["text"])
+                for n in range(min(self.max_overlap_words, len(prev_words), len(norm)), 0, -1):
+                    if prev_words[-n:] == norm[:n]:
+                        seg = {**seg, "text": " " + " ".join(words[n:])}
+                        break
+                if not seg["text"].strip():
+                    continue
+                seg = {**seg, "start": max(seg["start"], self.last["end"])}
+            kept.append(seg)
+            self.last = seg
+        return kept
+
+
+def stitch_segments(windows: List[List[dict]], max_overlap_words: int = 8) -> List[dict]:
+    """Concatenate the segments of all windows in order (see SegmentStitcher)."""
+    stitcher = SegmentStitcher(max_overlap_words)
+    stitched: List[dict] = []
+    for segments in windows:
+        stitched.extend(stitcher.add(segments))
+    return stitched
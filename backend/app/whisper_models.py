@@ -0,0 +1,105 @@
+"""
+Registry of Whisper models, loaded lazily and kept in an LRU bounded by memory.
+
+One registry lives in each transcription worker process.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+
+from app.metrics import log_event
+
+# Approximate resident memory of each model on CPU (fp32), in MB
+WHISPER_MODEL_SIZES_MB = {
+    "tiny": 150,
+    "base": 300,
+    "small": 1000,
+    "medium": 3000,
+}
+WHISPER_DEFAULT_MODEL = os.getenv("WHISPER_DEFAULT_MODEL", "base")
+WHISPER_MEMORY_BUDGET_MB = int(os.getenv("WHISPER_MEMORY_BUDGET_MB", "4000"))
+# Comma-separated list of models to load in the background when a worker starts
+WHISPER_WARM_MODELS = [m.strip() for m in os.getenv("WHISPER_WARM_MODELS", "").split(",") if m.strip()]
+
+
+class UnknownModelError(ValueError):
+    """Raised when a Whisper model name is not in WHISPER_MODEL_SIZES_MB."""
+
+
+def validate_model_name(name: str) -> str:
+    if name not in WHISPER_MODEL_SIZES_MB:
+        raise UnknownModelError(
+            f"Unknown Whisper model '{name}'. Choose one of: {', '.join(WHISPER_MODEL_SIZES_MB)}"
+        )
+    return name
+
+
+def covers(transcript_model: str, requested: str) -> bool:
+    """Whether a transcript made with `transcript_model` ('whisper-small') is as good as `requested` would be."""
+    name = transcript_model.removeprefix("whisper-")
+    sizes = list(WHISPER_MODEL_SIZES_MB)
+    return name in sizes and requested in sizes and sizes.index(name) >= sizes.index(requested)
+
+
+def load_whisper_model(name: str):
+    import whisper  # heavy import (torch), only where models are actually used
+
+    return whisper.load_model(name)
+
+
+class ModelRegistry:
+    """
+    Loads Whisper models on first use and evicts the least recently used ones over budget.
+
+    `loader` turns a model name into a model; it defaults to whisper.load_model.
+    """
+
+    def __init__(self, memory_budget_mb: int = WHISPER_MEMORY_BUDGET_MB, loader: Optional[Callable[[str], object]] = None):
+        self.memory_budget_mb = memory_budget_mb
+        self.loader = loader or load_whisper_model
+        self._models: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def loaded(self) -> List[str]:
+        with self._lock:
+            return list(self._models)
+
+    def _used_mb(self) -> int:
+        return sum(WHISPER_MODEL_SIZES_MB[name] for name in self._models)
+
+    def get(self, name: str = WHISPER_DEFAULT_MODEL):
+        validate_model_name(name)
+        # Loading holds the lock so concurrent callers never load the same model twice
+        with self._lock:
+            model = self._models.get(name)
+            if model is not None:
+                self._models.move_to_end(name)
+                return model
+
+            # Make room before loading, always keeping at least the requested model
+            while self._models and self._used_mb() + WHISPER_MODEL_SIZES_MB[name] > self.memory_budget_mb:
+                evicted, _ = self._models.popitem(last=False)
+                log_event("evicting whisper model", model=evicted, budget_mb=self.memory_budget_mb)
+
+            log_event("loading whisper model", model=name)
+            model = self.loader(name)
+            self._models[name] = model
+            return model
+
+    def warm(self, names: Iterable[str]) -> threading.Thread:
+        """Load `names` in a background thread."""
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    log_event("whisper model warm-up failed", logging.WARNING, model=name, error=str(e))
+
+        thread = threading.Thread(target=run, name="whisper-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+registry = ModelRegistry()
@@ -0,0 +1,115 @@
+"""
+Benchmark: decoding an upload into Whisper-ready samples.
+
+Compares the in-memory pipe decoder (`load_audio`) with the two former
+file-based paths, which wrote a 16 kHz WAV next to the upload that Whisper
+then decoded again:
+
+- ffmpeg_to_wav: `ffmpeg -i in -ar 16000 -ac 1 out.wav` (old main.to_wav)
+- pydub_to_wav:  utils.audio_utils.to_wav
+
+Usage (from backend/):
+    python -m benchmarks.bench_audio_decode [input_audio] [--seconds 600] [--repeat 5]
+
+Without an input file, a synthetic recording of --seconds is generated with ffmpeg.
+"""
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict
+
+from app.utils.audio_utils import load_audio, to_wav as pydub_to_wav
+
+
+def ffmpeg_to_wav(input_path: Path) -> Path:
+    out = input_path.with_suffix(".wav")
+    cmd = ["ffmpeg", "-y", "-i", str(input_path), "-ar", "16000", "-ac", "1", str(out)]
+    subprocess.run(cmd, check=True, capture_output=True)
+    return out
+
+
+def make_sample(path: Path, seconds: int) -> None:
+    """Speech-like test signal: a warbling tone with pauses, encoded as mp3."""
+    expr = "sin(2*PI*(220+40*sin(2*PI*0.5*t))*t)*gt(sin(2*PI*0.2*t),-0.3)*0.5"
+    cmd = [
+        "ffmpeg", "-y", "-f", "lavfi", "-i", f"aevalsrc={expr}:s=44100:d={seconds}",
+        "-ac", "2", "-b:a", "128k", str(path),
+    ]
+    subprocess.run(cmd, check=True, capture_output=True)
+
+
+def via_ffmpeg_wav(src: Path) -> Dict:
+    wav = ffmpeg_to_wav(src)
+    written = wav.stat().st_size
+    samples = load_audio(wav)  # what whisper.load_audio does with the WAV path
+    wav.unlink()
+    return {"samples": len(samples), "disk_bytes": written}
+
+
+def via_pydub_wav(src: Path) -> Dict:
+    wav = pydub_to_wav(src, src.with_name(src.stem + "_pydub.wav"))
+    written = wav.stat().st_size
+    samples = load_audio(wav)
+    wav.unlink()
+    return {"samples": len(samples), "disk_bytes": written}
+
+
+def via_pipe(src: Path) -> Dict:
+    samples = load_audio(src)
+    return {"samples": len(samples), "disk_bytes": 0}
+
+
+METHODS: Dict[str, Callable[[Path], Dict]] = {
+    "ffmpeg_to_wav": via_ffmpeg_wav,
+    "pydub_to_wav": via_pydub_wav,
+    "load_audio": via_pipe,
+}
+
+
+def run(src: Path, repeat: int) -> None:
+    print(f"Input: {src} ({src.stat().st_size / 1e6:.1f} MB)\n")
+    print(f"{'method':<15} {'median s':>10} {'min s':>8} {'disk MB':>9} {'py peak MB':>11} {'samples':>11}")
+    for name, fn in METHODS.items():
+        try:
+            fn(src)  # warm-up (page cache, imports)
+        except Exception as e:
+            print(f"{name:<15} skipped: {e}")
+            continue
+        timings = []
+        peak = 0
+        for _ in range(repeat):
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            info = fn(src)
+            timings.append(time.perf_counter() - t0)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        print(
+            f"{name:<15} {statistics.median(timings):>10.3f} {min(timings):>8.3f} "
+            f"{info['disk_bytes'] / 1e6:>9.1f} {peak / 1e6:>11.1f} {info['samples']:>11}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", help="Audio file to decode (default: synthetic recording)")
+    parser.add_argument("--seconds", type=int, default=600, help="Length of the synthetic recording")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.input:
+            src = Path(tmp) / Path(args.input).name
+            src.write_bytes(Path(args.input).read_bytes())
+        else:
+            src = Path(tmp) / "sample.mp3"
+            make_sample(src, args.seconds)
+        run(src, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
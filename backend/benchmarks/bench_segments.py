@@ -0,0 +1,153 @@
+"""
+Benchmark: segment rows (list of dicts) vs SegmentTable on the summarization
+and refinement hot paths.
+
+- prepare:      format every segment line, count tokens, pack chunks (PreparedTranscript)
+- refine_turn:  retrieve the context of one /refine-summary turn from a cached
+                BM25 index and format it (select_context + the prompt lines)
+- memory:       Python heap held by the segments of one transcript
+
+The dict-based variants are the code these paths used before SegmentTable.
+
+Usage (from backend/):
+    python -m benchmarks.bench_segments [--segments 3000] [--repeat 5]
+
+The synthetic transcript has --segments segments of 5-40 words (3000 is
+about 3 hours of meeting).
+"""
+import argparse
+import logging
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from app.chunking import pack_lines, CHUNK_OVERLAP_TOKENS
+from app.retrieval import BM25Index, REFINE_CONTEXT_TOKENS, REFINE_CONTEXT_TOP_K
+from app.segments import SegmentTable, REFINE_LINE
+from app.summarize import PreparedTranscript, count_tokens, MAX_CHUNK_TOKENS
+
+WORDS = (
+    "budget release roadmap customer latency incident design review hiring quarter "
+    "migration database onboarding feedback pricing deadline sprint retro launch "
+    "we should the team agreed next week follow up on the plan about it and then"
+).split()
+
+QUERIES = ["what was decided about the budget", "make it shorter", "add the action items on hiring"]
+
+
+def make_rows(n: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    rows, t = [], 0.0
+    for _ in range(n):
+        length = rng.uniform(1.5, 6.0)
+        rows.append({
+            "start_seconds": round(t, 2),
+            "end_seconds": round(t + length, 2),
+            "text": " ".join(rng.choices(WORDS, k=rng.randint(5, 40))).capitalize() + ".",
+        })
+        t += length + rng.uniform(0, 0.5)
+    return rows
+
+
+# Dict-based reference implementations --------------------------------------
+
+def dict_prepare(rows: List[Dict]) -> List[str]:
+    lines = [f"- [{float(s['start_seconds']):.1f}s–{float(s['end_seconds']):.1f}s] {s['text']}" for s in rows]
+    counts = [count_tokens(line) for line in lines]
+    if sum(counts) > MAX_CHUNK_TOKENS:
+        return pack_lines(lines, counts, MAX_CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, count_tokens)
+    return ["\n".join(lines)]
+
+
+def dict_refine_turn(index: BM25Index, rows: List[Dict], query: str) -> str:
+    scores = index.scores(query)
+    if scores:
+        candidates = sorted(scores, key=scores.get, reverse=True)[:REFINE_CONTEXT_TOP_K]
+    else:
+        fits = int(REFINE_CONTEXT_TOKENS / (index.avg_length * 1.3 + 8))
+        count = max(1, min(REFINE_CONTEXT_TOP_K, fits))
+        step = max(1, len(rows) // count)
+        candidates = list(range(0, len(rows), step))[:count]
+    picked, used = [], 0
+    for i in candidates:
+        cost = count_tokens(rows[i]["text"]) + 8
+        if used + cost > REFINE_CONTEXT_TOKENS:
+            continue
+        picked.append(i)
+        used += cost
+    return "\n".join(
+        f"[{rows[i]['start_seconds']:.1f}s-{rows[i]['end_seconds']:.1f}s] {rows[i]['text']}" for i in sorted(picked)
+    )
+
+
+# Table-based paths ----------------------------------------------------------
+
+def table_prepare(rows: List[Dict]) -> List[str]:
+    transcript = PreparedTranscript(SegmentTable.from_rows(rows))
+    return transcript.chunks or [transcript.seg_md]
+
+
+def table_refine_turn(index: BM25Index, query: str) -> str:
+    return index.select_context(query, REFINE_CONTEXT_TOKENS, count_tokens).render(REFINE_LINE)
+
+
+def timed(fn: Callable[[], object], repeat: int) -> List[float]:
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return timings
+
+
+def heap_bytes(build: Callable[[], object]) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept  # only freed once measured
+    return size
+
+
+def run(n: int, repeat: int) -> None:
+    rows = make_rows(n)
+    table = SegmentTable.from_rows(rows)
+    index = BM25Index(table)
+
+    # Same output on both sides, or the comparison is meaningless
+    assert dict_prepare(rows) == table_prepare(rows)
+    for query in QUERIES:
+        assert dict_refine_turn(index, rows, query) == table_refine_turn(index, query)
+
+    print(f"{n} segments, {table.char_count / 1e3:.0f}k characters, {table.duration / 3600:.1f} h\n")
+    print(f"{'path':<20} {'median ms':>10} {'min ms':>8}")
+    cases = {
+        "prepare/dicts": lambda: dict_prepare(rows),
+        "prepare/table": lambda: table_prepare(rows),
+        "refine_turn/dicts": lambda: [dict_refine_turn(index, rows, q) for q in QUERIES],
+        "refine_turn/table": lambda: [table_refine_turn(index, q) for q in QUERIES],
+    }
+    for name, fn in cases.items():
+        timings = timed(fn, repeat)
+        print(f"{name:<20} {statistics.median(timings) * 1e3:>10.2f} {min(timings) * 1e3:>8.2f}")
+
+    print(f"\n{'memory':<20} {'heap MB':>10}")
+    print(f"{'rows (dicts)':<20} {heap_bytes(lambda: make_rows(n)) / 1e6:>10.2f}")
+    print(f"{'SegmentTable':<20} {heap_bytes(lambda: SegmentTable.from_rows(rows)) / 1e6:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.getLogger("app").setLevel(logging.WARNING)  # no span log per prepared transcript
+    run(args.segments, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
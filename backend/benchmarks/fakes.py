@@ -0,0 +1,301 @@
+"""
+Local stand-ins for the cloud services and Whisper, for load tests (see benchmarks.loadtest).
+
+- `supabase_app`: in-memory subset of Supabase's PostgREST API (the filters,
+  orders, upserts and embeddings the repository uses), Storage uploads and
+  copies, and an empty JWKS.
+- `openai_app`: /v1/chat/completions, streamed or not, with configurable
+  latency and injected 429s.
+- `stubbed_api`: the API itself, its transcription workers loading
+  StubModel instead of Whisper (an app factory: `uvicorn --factory`).
+
+Configured through environment variables so they can run under uvicorn:
+
+    FAKE_LLM_LATENCY        seconds before the first token (default 0.5)
+    FAKE_LLM_TOKEN_DELAY    seconds between streamed tokens (default 0.01)
+    FAKE_LLM_WORDS          words per completion (default 150)
+    FAKE_LLM_429_RATE       fraction of calls answered with a 429 (default 0)
+    FAKE_WHISPER_REALTIME_FACTOR
+                            StubModel seconds per second of audio (default 0.02)
+
+Usage (from backend/):
+    uvicorn benchmarks.fakes:supabase_app --port 54321
+    uvicorn benchmarks.fakes:openai_app --port 54322
+    uvicorn benchmarks.fakes:stubbed_api --factory --port 8000
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.utils.audio_utils import SAMPLE_RATE
+
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))
+FAKE_LLM_TOKEN_DELAY = float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.01"))
+FAKE_LLM_WORDS = int(os.getenv("FAKE_LLM_WORDS", "150"))
+FAKE_LLM_429_RATE = float(os.getenv("FAKE_LLM_429_RATE", "0"))
+FAKE_WHISPER_REALTIME_FACTOR = float(os.getenv("FAKE_WHISPER_REALTIME_FACTOR", "0.02"))
+
+LOREM = (
+    "the team agreed to ship the release next quarter after the budget review while the design "
+    "owner follows up on customer feedback and the latency incident retrospective"
+).split()
+
+
+# Supabase -------------------------------------------------------------
+
+supabase_app = FastAPI(title="Fake Supabase")
+tables: Dict[str, List[Dict]] = defaultdict(list)
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "and", "or"}
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def matches(row: Dict, params) -> bool:
+    """Only `col=eq.value` filters; others (e.g. the summaries keyset `and=`) are ignored."""
+    for column, condition in params.items():
+        if column in RESERVED_PARAMS or "." in column or not condition.startswith("eq."):
+            continue
+        value = row.get(column)
+        expected = condition[3:]
+        if isinstance(value, bool):
+            value = str(value).lower()
+        if str(value) != expected:
+            return False
+    return True
+
+
+def sort_rows(rows: List[Dict], order: Optional[str]) -> List[Dict]:
+    for term in reversed((order or "").split(",")):
+        if not term:
+            continue
+        column, _, direction = term.partition(".")
+        rows = sorted(rows, key=lambda r: (r.get(column) is None, r.get(column)), reverse=direction.startswith("desc"))
+    return rows
+
+
+def project(row: Dict, select: str) -> Dict:
+    if not select or select == "*" or select.startswith("*,"):
+        return dict(row)
+    return {column: row.get(column) for column in select.split(",")}
+
+
+def segments_of(transcript_id: str) -> List[Dict]:
+    segments = [
+        {k: s[k] for k in ("start_seconds", "end_seconds", "text")}
+        for s in tables["segments"] if s["transcript_id"] == transcript_id
+    ]
+    return sort_rows(segments, "start_seconds.asc")
+
+
+def embed_transcripts(meeting: Dict) -> Dict:
+    """The meetings -> transcripts(..., segments(...)) embedding of the repository."""
+    transcripts = [
+        {**t, "segments": segments_of(t["id"])} for t in tables["transcripts"] if t["meeting_id"] == meeting["id"]
+    ]
+    return {**meeting, "transcripts": transcripts}
+
+
+KEYSET_RE = re.compile(r"^\((\w+)\.gt\.([^,]+),and\(\w+\.eq\.[^,]+,id\.gt\.([^)]+)\)\)$")
+
+
+def after_keyset(rows: List[Dict], condition: Optional[str]) -> List[Dict]:
+    """The `or=(col.gt.X,and(col.eq.X,id.gt.Y))` keyset filter of iter_segments."""
+    match = KEYSET_RE.match(condition or "")
+    if not match:
+        return rows
+    column, value, last_id = match.group(1), float(match.group(2)), match.group(3)
+    return [r for r in rows if r[column] > value or (r[column] == value and r["id"] > last_id)]
+
+
+def new_row(table: str, values: Dict) -> Dict:
+    row = {"id": str(uuid.uuid4()), "created_at": now_iso(), "updated_at": now_iso(), **values}
+    if table == "summaries":
+        row["summary_preview"] = (row.get("summary_text") or "")[:200]
+    return row
+
+
+@supabase_app.get("/rest/v1/{table}")
+async def rest_select(table: str, request: Request):
+    params = request.query_params
+    rows = [row for row in tables[table] if matches(row, params)]
+    rows = after_keyset(sort_rows(rows, params.get("order")), params.get("or"))
+    if params.get("limit"):
+        rows = rows[:int(params["limit"])]
+    select = params.get("select", "*")
+    if table == "meetings" and "transcripts(" in select:
+        return JSONResponse([embed_transcripts(row) for row in rows])
+    if table == "transcripts" and "segments(" in select:
+        return JSONResponse([{**row, "segments": segments_of(row["id"])} for row in rows])
+    return JSONResponse([project(row, select) for row in rows])
+
+
+@supabase_app.post("/rest/v1/{table}")
+async def rest_insert(table: str, request: Request):
+    body = await request.json()
+    values = body if isinstance(body, list) else [body]
+    on_conflict = request.query_params.get("on_conflict")
+    prefer = request.headers.get("prefer", "")
+    result = []
+    for item in values:
+        existing = None
+        if on_conflict:
+            existing = next((r for r in tables[table] if r.get(on_conflict) == item.get(on_conflict)), None)
+        if existing is not None:
+            if "ignore-duplicates" in prefer:
+                continue
+            existing.update(item, updated_at=now_iso())
+            result.append(existing)
+        else:
+            row = new_row(table, item)
+            tables[table].append(row)
+            result.append(row)
+    return JSONResponse(result, status_code=201)
+
+
+@supabase_app.patch("/rest/v1/{table}")
+async def rest_update(table: str, request: Request):
+    values = {k: (now_iso() if v == "now()" else v) for k, v in (await request.json()).items()}
+    rows = [row for row in tables[table] if matches(row, request.query_params)]
+    for row in rows:
+        row.update(values)
+        if table == "summaries":
+            row["summary_preview"] = (row.get("summary_text") or "")[:200]
+    return JSONResponse(rows)
+
+
+@supabase_app.delete("/rest/v1/{table}")
+async def rest_delete(table: str, request: Request):
+    deleted = [row for row in tables[table] if matches(row, request.query_params)]
+    tables[table] = [row for row in tables[table] if row not in deleted]
+    return JSONResponse(deleted)
+
+
+@supabase_app.post("/rest/v1/rpc/{function}")
+async def rest_rpc(function: str):
+    return JSONResponse([])
+
+
+@supabase_app.post("/storage/v1/object/copy")
+async def storage_copy(request: Request):
+    body = await request.json()
+    return JSONResponse({"Key": f"{body['bucketId']}/{body['destinationKey']}"})
+
+
+@supabase_app.post("/storage/v1/object/{bucket}/{path:path}")
+async def storage_upload(bucket: str, path: str, request: Request):
+    async for _ in request.stream():
+        pass
+    return JSONResponse({"Key": f"{bucket}/{path}"})
+
+
+@supabase_app.get("/auth/v1/.well-known/jwks.json")
+async def jwks():
+    return JSONResponse({"keys": []})
+
+
+# OpenAI ---------------------------------------------------------------
+
+openai_app = FastAPI(title="Fake OpenAI")
+openai_stats = {"calls": 0, "rate_limited": 0}
+
+
+def completion_text() -> str:
+    words = random.choices(LOREM, k=FAKE_LLM_WORDS)
+    half = len(words) // 2
+    return "## Summary\n\n" + " ".join(words[:half]) + "\n\n## Action items\n\n- " + " ".join(words[half:])
+
+
+@openai_app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    openai_stats["calls"] += 1
+    if random.random() < FAKE_LLM_429_RATE:
+        openai_stats["rate_limited"] += 1
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429, headers={"retry-after": "1"},
+        )
+
+    await asyncio.sleep(FAKE_LLM_LATENCY)
+    text = completion_text()
+    prompt_tokens = sum(len(m.get("content", "")) // 4 for m in body.get("messages", []))
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": FAKE_LLM_WORDS, "total_tokens": prompt_tokens + FAKE_LLM_WORDS}
+    base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": body.get("model")}
+
+    if not body.get("stream"):
+        return JSONResponse({
+            **base, "object": "chat.completion", "usage": usage,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+        })
+
+    async def events():
+        for i, word in enumerate(text.split(" ")):
+            chunk = {
+                **base, "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "finish_reason": None, "delta": {"content": word if i == 0 else " " + word}}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(FAKE_LLM_TOKEN_DELAY)
+        done = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "finish_reason": "stop", "delta": {}}]}
+        yield f"data: {json.dumps(done)}\n\n"
+        if body.get("stream_options", {}).get("include_usage"):
+            yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@openai_app.get("/stats")
+async def get_openai_stats():
+    return JSONResponse(openai_stats)
+
+
+# Whisper --------------------------------------------------------------
+
+STUB_WORDS = (
+    "budget roadmap release customer onboarding hiring deadline marketing design review "
+    "migration database latency incident retrospective pricing contract launch quarter "
+    "objective metric feedback sprint backlog meeting decision action owner"
+).split()
+
+
+class StubModel:
+    """
+    Stand-in for a Whisper model: sleeps in proportion to the audio length
+    and returns one segment of filler words every 5 seconds.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def transcribe(self, audio, **kwargs) -> Dict:
+        duration = len(audio) / SAMPLE_RATE
+        time.sleep(duration * FAKE_WHISPER_REALTIME_FACTOR)
+        rng = random.Random(len(audio))
+        segments = [
+            {"start": float(t), "end": float(min(t + 5, duration)), "text": " " + " ".join(rng.choices(STUB_WORDS, k=12))}
+            for t in range(0, int(duration), 5)
+        ]
+        return {"text": "".join(seg["text"] for seg in segments), "language": "en", "segments": segments}
+
+
+def stubbed_api():
+    """The API, with StubModel as the model loader of its transcription workers."""
+    from app.engine import engine
+    from app.main import app
+
+    engine.model_loader = StubModel  # pickled by reference into the spawned workers
+    return app
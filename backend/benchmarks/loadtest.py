@@ -0,0 +1,403 @@
+"""
+Load test: the API end to end, against local stand-ins for Supabase, OpenAI and Whisper.
+
+Boots the fake Supabase and OpenAI servers (benchmarks.fakes) and the app
+under uvicorn, its workers loading StubModel instead of Whisper
+(benchmarks.fakes:stubbed_api). Then seeds meetings with transcripts and
+summaries and runs --concurrency clients for --duration seconds, each
+picking requests from --mix. Reports req/s and p50/p95/p99
+latency per endpoint, and the peak RSS of the app and its transcription
+workers.
+
+Results can be saved as a baseline and later runs compared against it:
+a p95 or throughput worse than the baseline by more than --tolerance fails
+the run (exit code 1).
+
+Usage (from backend/):
+    python -m benchmarks.loadtest [--duration 30] [--concurrency 16]
+        [--mix summaries=10,summarize=3,refine=2,transcribe=1]
+        [--llm-latency 0.5] [--llm-429-rate 0.02] [--cold-cache] [--dedup]
+        [--save-baseline benchmarks/baselines/default.json]
+        [--baseline benchmarks/baselines/default.json]
+
+Transcription jobs are also timed from submission until the job is seen
+done (polled every 0.25 s) as `transcribe_job`. RSS is read from /proc, so
+it is only reported on Linux. Requires ffmpeg for the sample recording.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from jose import jwt
+
+from benchmarks.bench_audio_decode import make_sample
+from benchmarks.fakes import STUB_WORDS
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+JWT_SECRET = "loadtest-secret"
+FORMATS = ["structured", "bullet_points", "paragraph", "action_items"]
+DETAIL_LEVELS = ["brief", "medium", "detailed"]
+REFINE_MESSAGES = [
+    "Make it shorter",
+    "Add more detail about the budget discussion",
+    "What was decided about the release?",
+    "List the action items with their owners",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_token(user_id: str, role: str = "authenticated") -> str:
+    return jwt.encode({"sub": user_id, "role": role, "exp": int(time.time()) + 24 * 3600}, JWT_SECRET, algorithm="HS256")
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+# Processes ------------------------------------------------------------
+
+def serve(app: str, port: int, env: Dict[str, str], cwd: Path, log_path: Path, factory: bool = False) -> subprocess.Popen:
+    log = log_path.open("w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+        + (["--factory"] if factory else []),
+        env={**os.environ, "PYTHONPATH": str(BACKEND_DIR), **env},
+        cwd=cwd, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {process.returncode}")
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def process_tree(pid: int) -> List[int]:
+    pids = [pid]
+    for task in Path(f"/proc/{pid}/task").glob("*"):
+        try:
+            children = (task / "children").read_text().split()
+        except OSError:
+            continue
+        for child in children:
+            pids.extend(process_tree(int(child)))
+    return pids
+
+
+def tree_rss_mb(pid: int) -> float:
+    total_kb = 0
+    for p in process_tree(pid):
+        try:
+            for line in Path(f"/proc/{p}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+# Seeding --------------------------------------------------------------
+
+async def seed(supabase_url: str, users: int, meetings_per_user: int, segments: int) -> Dict[str, Dict]:
+    """Meetings with a transcript, segments and one summary each, written straight to the fake Supabase."""
+    rng = random.Random(0)
+    fixtures: Dict[str, Dict] = {}
+    async with httpx.AsyncClient(base_url=f"{supabase_url}/rest/v1") as client:
+        for _ in range(users):
+            user_id = str(uuid.uuid4())
+            fixtures[user_id] = {"token": make_token(user_id), "meetings": [], "summaries": []}
+            for m in range(meetings_per_user):
+                meeting = (await client.post("/meetings", json={
+                    "user_id": user_id, "title": f"Meeting {m}", "status": "done", "progress": 100,
+                })).json()[0]
+                transcript = (await client.post("/transcripts", json={
+                    "meeting_id": meeting["id"], "model": "whisper-base", "text": "", "language": "en",
+                })).json()[0]
+                await client.post("/segments", json=[
+                    {
+                        "transcript_id": transcript["id"],
+                        "start_seconds": i * 5.0,
+                        "end_seconds": i * 5.0 + 5.0,
+                        "speaker_label": None,
+                        "text": " ".join(rng.choices(STUB_WORDS, k=15)),
+                    }
+                    for i in range(segments)
+                ])
+                summary = (await client.post("/summaries", json={
+                    "meeting_id": meeting["id"], "user_id": user_id, "transcript_id": transcript["id"],
+                    "title": meeting["title"], "summary_text": "## Summary\n\nSeeded summary.",
+                    "format": "structured", "language": "en", "detail_level": "medium",
+                    "model_used": "seed", "generation_time_seconds": 0,
+                })).json()[0]
+                fixtures[user_id]["meetings"].append(meeting["id"])
+                fixtures[user_id]["summaries"].append(summary["id"])
+    return fixtures
+
+
+# Load -----------------------------------------------------------------
+
+class LoadRun:
+    def __init__(self, api_url: str, fixtures: Dict[str, Dict], mix: Dict[str, int], sample: Path, dedup: bool):
+        self.api_url = api_url
+        self.fixtures = fixtures
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.sample = sample.read_bytes()
+        self.dedup = dedup
+        self.results: Dict[str, List[Tuple[float, int]]] = defaultdict(list)  # op -> [(seconds, status)]
+        self.pending_jobs: List[asyncio.Task] = []
+
+    async def summaries(self, client: httpx.AsyncClient, user: Dict) -> httpx.Response:
+        return await client.get("/summaries", params={"limit": 20})
+
+    async def summarize(self, client: httpx.AsyncClient, user: Dict) -> httpx.Response:
+        return await client.post("/summarize", json={
+            "meeting_id": random.choice(user["meetings"]),
+            "format": random.choice(FORMATS),
+            "detail_level": random.choice(DETAIL_LEVELS),
+        })
+
+    async def refine(self, client: httpx.AsyncClient, user: Dict) -> httpx.Response:
+        return await client.post("/refine-summary", json={
+            "summary_id": random.choice(user["summaries"]),
+            "user_message": random.choice(REFINE_MESSAGES),
+            "chat_history": [],
+        })
+
+    async def transcribe(self, client: httpx.AsyncClient, user: Dict) -> httpx.Response:
+        # Unless measuring deduplication, make every upload distinct (the WAV data runs to the end of the file)
+        audio = self.sample if self.dedup else self.sample[:-64] + os.urandom(64)
+        res = await client.post(
+            "/transcribe",
+            files={"file": ("loadtest.wav", audio, "audio/wav")},
+            data={"auto_summary": "false"},
+        )
+        if res.status_code == 202:
+            self.pending_jobs.append(asyncio.create_task(self.wait_job(client, res.json()["job_id"], time.perf_counter())))
+        return res
+
+    async def wait_job(self, client: httpx.AsyncClient, job_id: str, submitted: float) -> None:
+        while True:
+            await asyncio.sleep(0.25)
+            try:
+                job = (await client.get(f"/jobs/{job_id}")).json()
+            except httpx.HTTPError:
+                continue
+            if job.get("status") in ("done", "failed"):
+                status = 200 if job["status"] == "done" else 500
+                self.results["transcribe_job"].append((time.perf_counter() - submitted, status))
+                return
+
+    async def client_loop(self, user: Dict, deadline: float) -> None:
+        headers = {"Authorization": f"Bearer {user['token']}"}
+        async with httpx.AsyncClient(base_url=self.api_url, headers=headers, timeout=300) as client:
+            while time.perf_counter() < deadline:
+                op = random.choices(self.ops, self.weights)[0]
+                start = time.perf_counter()
+                try:
+                    status = (await getattr(self, op)(client, user)).status_code
+                except httpx.HTTPError:
+                    status = 0
+                self.results[op].append((time.perf_counter() - start, status))
+            # Let the transcriptions this client started finish before its connections close
+            await asyncio.gather(*self.pending_jobs, return_exceptions=True)
+
+    async def run(self, concurrency: int, duration: float) -> float:
+        users = list(self.fixtures.values())
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(self.client_loop(users[i % len(users)], deadline) for i in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def summarize_results(results: Dict[str, List[Tuple[float, int]]], elapsed: float) -> Dict[str, Dict]:
+    report = {}
+    for op, samples in sorted(results.items()):
+        ok = [seconds for seconds, status in samples if 200 <= status < 300]
+        report[op] = {
+            "requests": len(samples),
+            "ok": len(ok),
+            "rejected": sum(1 for _, status in samples if status in (429, 503)),
+            "errors": sum(1 for _, status in samples if status == 0 or (status >= 400 and status not in (429, 503))),
+            "rps": round(len(ok) / elapsed, 2),
+            "p50_ms": None if not ok else round(percentile(ok, 50) * 1000, 1),
+            "p95_ms": None if not ok else round(percentile(ok, 95) * 1000, 1),
+            "p99_ms": None if not ok else round(percentile(ok, 99) * 1000, 1),
+        }
+    return report
+
+
+def print_report(report: Dict[str, Dict], peak_rss_mb: Optional[float]) -> None:
+    print(f"\n{'endpoint':<16} {'requests':>9} {'ok':>7} {'429/503':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for op, r in report.items():
+        print(
+            f"{op:<16} {r['requests']:>9} {r['ok']:>7} {r['rejected']:>8} {r['errors']:>7} {r['rps']:>8} "
+            f"{str(r['p50_ms']):>9} {str(r['p95_ms']):>9} {str(r['p99_ms']):>9}"
+        )
+    if peak_rss_mb is not None:
+        print(f"\npeak RSS (app + workers): {peak_rss_mb:.0f} MB")
+
+
+def compare(report: Dict[str, Dict], peak_rss_mb: Optional[float], baseline: Dict, tolerance: float) -> bool:
+    """Print the change against `baseline`; False if any endpoint regressed beyond `tolerance`."""
+    ok = True
+    print(f"\nvs. baseline ({baseline.get('saved_at', '?')}), tolerance {tolerance:.0%}:")
+    for op, r in report.items():
+        base = baseline["results"].get(op)
+        if not base or not base.get("p95_ms") or not r.get("p95_ms"):
+            continue
+        p95_change = r["p95_ms"] / base["p95_ms"] - 1
+        rps_change = (r["rps"] / base["rps"] - 1) if base["rps"] else 0.0
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        ok = ok and not regressed
+        print(f"  {op:<16} p95 {p95_change:+.0%}  req/s {rps_change:+.0%}{'  REGRESSION' if regressed else ''}")
+    base_rss = baseline.get("peak_rss_mb")
+    if peak_rss_mb and base_rss:
+        rss_change = peak_rss_mb / base_rss - 1
+        regressed = rss_change > tolerance
+        ok = ok and not regressed
+        print(f"  {'peak RSS':<16} {rss_change:+.0%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        op, _, weight = part.partition("=")
+        if op not in ("summaries", "summarize", "refine", "transcribe"):
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{op}'")
+        mix[op] = int(weight or 1)
+    return mix
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+        workdir = Path(tmp)
+        sample = workdir / "sample.wav"
+        make_sample(sample, args.audio_seconds)
+
+        supabase_port, openai_port, api_port = free_port(), free_port(), free_port()
+        supabase_url = f"http://127.0.0.1:{supabase_port}"
+        fake_env = {
+            "FAKE_LLM_LATENCY": str(args.llm_latency),
+            "FAKE_LLM_TOKEN_DELAY": str(args.llm_token_delay),
+            "FAKE_LLM_429_RATE": str(args.llm_429_rate),
+        }
+        app_env = {
+            "SUPABASE_URL": supabase_url,
+            "SUPABASE_SERVICE_ROLE_KEY": make_token("service", role="service_role"),
+            "OPENAI_API_KEY": "sk-loadtest",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+            "JWT_SECRET": JWT_SECRET,
+            "FAKE_WHISPER_REALTIME_FACTOR": str(args.whisper_factor),
+            "TRANSCRIBE_WORKERS": str(args.workers),
+        }
+        if args.cold_cache:
+            app_env["SUMMARY_CACHE_TTL_SECONDS"] = "0"
+
+        processes = [
+            serve("benchmarks.fakes:supabase_app", supabase_port, fake_env, workdir, workdir / "supabase.log"),
+            serve("benchmarks.fakes:openai_app", openai_port, fake_env, workdir, workdir / "openai.log"),
+        ]
+        try:
+            await wait_ready(supabase_url, processes[0])
+            await wait_ready(f"http://127.0.0.1:{openai_port}", processes[1])
+            api = serve("benchmarks.fakes:stubbed_api", api_port, app_env, workdir, workdir / "api.log", factory=True)
+            processes.append(api)
+            await wait_ready(f"http://127.0.0.1:{api_port}", api)
+
+            fixtures = await seed(supabase_url, args.users, args.meetings_per_user, args.segments)
+            print(f"Seeded {args.users} users x {args.meetings_per_user} meetings x {args.segments} segments")
+            print(f"Running {args.concurrency} clients for {args.duration:.0f}s, mix {args.mix}")
+
+            load = LoadRun(f"http://127.0.0.1:{api_port}", fixtures, args.mix, sample, args.dedup)
+            peak_rss: List[float] = []
+
+            async def sample_rss():
+                while True:
+                    peak_rss.append(tree_rss_mb(api.pid))
+                    await asyncio.sleep(0.5)
+
+            sampler = asyncio.create_task(sample_rss())
+            elapsed = await load.run(args.concurrency, args.duration)
+            sampler.cancel()
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait(timeout=30)
+
+        report = summarize_results(load.results, elapsed)
+        peak_rss_mb = max(peak_rss) if peak_rss and max(peak_rss) > 0 else None
+        print_report(report, peak_rss_mb)
+
+    ok = True
+    if args.baseline:
+        ok = compare(report, peak_rss_mb, json.loads(Path(args.baseline).read_text()), args.tolerance)
+    if args.save_baseline:
+        path = Path(args.save_baseline)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "save_baseline")},
+            "results": report,
+            "peak_rss_mb": peak_rss_mb,
+        }, indent=2))
+        print(f"\nBaseline saved to {path}")
+    return 0 if ok else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", type=parse_mix, default="summaries=10,summarize=3,refine=2,transcribe=1")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--meetings-per-user", type=int, default=3)
+    parser.add_argument("--segments", type=int, default=200, help="Segments per seeded transcript")
+    parser.add_argument("--audio-seconds", type=int, default=60, help="Length of the uploaded recording")
+    parser.add_argument("--workers", type=int, default=2, help="Transcription worker processes")
+    parser.add_argument("--whisper-factor", type=float, default=0.02, help="Stub inference seconds per audio second")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds before the first LLM token")
+    parser.add_argument("--llm-token-delay", type=float, default=0.01)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0, help="Fraction of LLM calls answered with 429")
+    parser.add_argument("--cold-cache", action="store_true", help="Disable the summary cache")
+    parser.add_argument("--dedup", action="store_true", help="Upload the same recording every time (measures reuse)")
+    parser.add_argument("--baseline", help="Compare against this saved baseline")
+    parser.add_argument("--save-baseline", help="Save this run's results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95/req/s/RSS regression")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
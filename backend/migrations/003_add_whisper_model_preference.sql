@@ -0,0 +1,3 @@
+-- Let users choose the Whisper model used for their transcriptions
+ALTER TABLE user_preferences
+    ADD COLUMN IF NOT EXISTS whisper_model VARCHAR(20) DEFAULT 'base'; -- 'tiny', 'base', 'small', 'medium'
@@ -0,0 +1,3 @@
+-- Transcription progress (0-100), updated while a meeting is 'processing'
+ALTER TABLE meetings
+    ADD COLUMN IF NOT EXISTS progress SMALLINT DEFAULT 0;
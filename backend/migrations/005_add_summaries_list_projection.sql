@@ -0,0 +1,11 @@
+-- Lightweight list projection and keyset pagination for GET /summaries
+
+-- Short preview so list pages don't ship the full summary text
+ALTER TABLE summaries
+    ADD COLUMN IF NOT EXISTS summary_preview TEXT
+    GENERATED ALWAYS AS (left(summary_text, 200)) STORED;
+
+-- Keyset pagination per user: WHERE user_id = ? AND (created_at, id) < (?, ?)
+-- ORDER BY created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_summaries_user_created_id
+    ON summaries(user_id, created_at DESC, id DESC);
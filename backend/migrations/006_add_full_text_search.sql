@@ -0,0 +1,83 @@
+-- Full-text search over transcript segments and summaries (GET /search)
+-- The 'simple' configuration (no stemming) is used because meetings are in several languages.
+
+-- Generated columns: Postgres updates them on every insert/update, so new
+-- segments and refined summaries are searchable as soon as they are written
+ALTER TABLE segments
+    ADD COLUMN IF NOT EXISTS text_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', coalesce(text, ''))) STORED;
+
+ALTER TABLE summaries
+    ADD COLUMN IF NOT EXISTS search_tsv tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(summary_text, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_segments_text_tsv ON segments USING GIN (text_tsv);
+CREATE INDEX IF NOT EXISTS idx_summaries_search_tsv ON summaries USING GIN (search_tsv);
+
+-- Joins used to scope segment hits to the user
+CREATE INDEX IF NOT EXISTS idx_segments_transcript_id ON segments(transcript_id);
+CREATE INDEX IF NOT EXISTS idx_transcripts_meeting_id ON transcripts(meeting_id);
+CREATE INDEX IF NOT EXISTS idx_meetings_user_id ON meetings(user_id);
+
+-- Ranked hits of both kinds with highlighted snippets, best first.
+-- ts_headline only runs on the rows that survive each LIMIT.
+CREATE OR REPLACE FUNCTION search_meetings(
+    p_user_id UUID,
+    p_query TEXT,
+    p_limit INT DEFAULT 20,
+    p_kind TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    kind TEXT,
+    id TEXT,
+    meeting_id TEXT,
+    title TEXT,
+    start_seconds DOUBLE PRECISION,
+    end_seconds DOUBLE PRECISION,
+    snippet TEXT,
+    rank REAL
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH q AS (SELECT websearch_to_tsquery('simple', p_query) AS query),
+    segment_hits AS (
+        SELECT s.id, m.id AS meeting_id, m.title, s.start_seconds, s.end_seconds, s.text,
+               ts_rank(s.text_tsv, q.query) AS rank
+        FROM q, segments s
+        JOIN transcripts t ON t.id = s.transcript_id
+        JOIN meetings m ON m.id = t.meeting_id
+        WHERE m.user_id = p_user_id
+          AND s.text_tsv @@ q.query
+          AND (p_kind IS NULL OR p_kind = 'segment')
+        ORDER BY rank DESC
+        LIMIT p_limit
+    ),
+    summary_hits AS (
+        SELECT su.id, su.meeting_id, su.title, su.summary_text,
+               ts_rank(su.search_tsv, q.query) AS rank
+        FROM q, summaries su
+        WHERE su.user_id = p_user_id
+          AND su.search_tsv @@ q.query
+          AND (p_kind IS NULL OR p_kind = 'summary')
+        ORDER BY rank DESC
+        LIMIT p_limit
+    )
+    SELECT * FROM (
+        SELECT 'segment', h.id::text, h.meeting_id::text, h.title,
+               h.start_seconds::double precision, h.end_seconds::double precision,
+               ts_headline('simple', h.text, q.query, 'StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10'),
+               h.rank
+        FROM segment_hits h, q
+        UNION ALL
+        SELECT 'summary', h.id::text, h.meeting_id::text, h.title, NULL, NULL,
+               ts_headline('simple', h.summary_text, q.query,
+                           'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10'),
+               h.rank
+        FROM summary_hits h, q
+    ) hits
+    ORDER BY 8 DESC
+    LIMIT p_limit;
+$$;
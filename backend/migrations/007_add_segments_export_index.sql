@@ -0,0 +1,4 @@
+-- Ordered, paged reads of a transcript's segments (exports):
+-- WHERE transcript_id = ? AND (start_seconds, id) > (?, ?) ORDER BY start_seconds, id
+CREATE INDEX IF NOT EXISTS idx_segments_transcript_start_id
+    ON segments(transcript_id, start_seconds, id);
@@ -0,0 +1,82 @@
+-- Deduplication of identical uploads: a meeting whose audio matches an
+-- already transcribed one reuses that transcript instead of running Whisper.
+
+-- sha256 of the uploaded file, and of its decoded 16 kHz mono 16-bit PCM
+-- (matches the same recording remuxed, retagged or losslessly converted)
+ALTER TABLE meetings
+    ADD COLUMN IF NOT EXISTS audio_sha256 TEXT,
+    ADD COLUMN IF NOT EXISTS audio_pcm_sha256 TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_meetings_audio_sha256
+    ON meetings(audio_sha256) WHERE status = 'done';
+CREATE INDEX IF NOT EXISTS idx_meetings_audio_pcm_sha256
+    ON meetings(audio_pcm_sha256) WHERE status = 'done';
+
+-- Copy-on-write reference: a reused transcript has no segments of its own and
+-- reads those of source_transcript_id (never itself a reference). Segments
+-- are never modified, so nothing is copied; deleting a source transcript is
+-- refused while references exist.
+ALTER TABLE transcripts
+    ADD COLUMN IF NOT EXISTS source_transcript_id UUID REFERENCES transcripts(id);
+
+CREATE INDEX IF NOT EXISTS idx_transcripts_source_transcript_id
+    ON transcripts(source_transcript_id) WHERE source_transcript_id IS NOT NULL;
+
+-- Search segment hits through the referencing transcripts too
+CREATE OR REPLACE FUNCTION search_meetings(
+    p_user_id UUID,
+    p_query TEXT,
+    p_limit INT DEFAULT 20,
+    p_kind TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    kind TEXT,
+    id TEXT,
+    meeting_id TEXT,
+    title TEXT,
+    start_seconds DOUBLE PRECISION,
+    end_seconds DOUBLE PRECISION,
+    snippet TEXT,
+    rank REAL
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH q AS (SELECT websearch_to_tsquery('simple', p_query) AS query),
+    segment_hits AS (
+        SELECT s.id, m.id AS meeting_id, m.title, s.start_seconds, s.end_seconds, s.text,
+               ts_rank(s.text_tsv, q.query) AS rank
+        FROM q, segments s
+        JOIN transcripts t ON s.transcript_id = COALESCE(t.source_transcript_id, t.id)
+        JOIN meetings m ON m.id = t.meeting_id
+        WHERE m.user_id = p_user_id
+          AND s.text_tsv @@ q.query
+          AND (p_kind IS NULL OR p_kind = 'segment')
+        ORDER BY rank DESC
+        LIMIT p_limit
+    ),
+    summary_hits AS (
+        SELECT su.id, su.meeting_id, su.title, su.summary_text,
+               ts_rank(su.search_tsv, q.query) AS rank
+        FROM q, summaries su
+        WHERE su.user_id = p_user_id
+          AND su.search_tsv @@ q.query
+          AND (p_kind IS NULL OR p_kind = 'summary')
+        ORDER BY rank DESC
+        LIMIT p_limit
+    )
+    SELECT * FROM (
+        SELECT 'segment', h.id::text, h.meeting_id::text, h.title,
+               h.start_seconds::double precision, h.end_seconds::double precision,
+               ts_headline('simple', h.text, q.query, 'StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10'),
+               h.rank
+        FROM segment_hits h, q
+        UNION ALL
+        SELECT 'summary', h.id::text, h.meeting_id::text, h.title, NULL, NULL,
+               ts_headline('simple', h.summary_text, q.query,
+                           'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10'),
+               h.rank
+        FROM summary_hits h, q
+    ) hits
+    ORDER BY 8 DESC
+    LIMIT p_limit;
+$$;
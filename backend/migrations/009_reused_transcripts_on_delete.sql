@@ -0,0 +1,44 @@
+-- Deleting a transcript that other transcripts reuse (see 008).
+--
+-- 008 declared source_transcript_id without an ON DELETE clause, so once a
+-- transcript had been reused its owner could delete neither it nor its
+-- meeting. Now the segments are handed over to one referencing
+-- transcript before the source goes, and the other references are pointed
+-- at that heir. ON DELETE SET NULL is only a safety net behind the trigger.
+
+ALTER TABLE transcripts
+    DROP CONSTRAINT IF EXISTS transcripts_source_transcript_id_fkey;
+ALTER TABLE transcripts
+    ADD CONSTRAINT transcripts_source_transcript_id_fkey
+    FOREIGN KEY (source_transcript_id) REFERENCES transcripts(id) ON DELETE SET NULL;
+
+CREATE OR REPLACE FUNCTION materialize_reused_segments()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    heir UUID;
+BEGIN
+    SELECT id INTO heir
+    FROM transcripts
+    WHERE source_transcript_id = OLD.id
+    ORDER BY id
+    LIMIT 1;
+
+    IF heir IS NULL THEN
+        RETURN OLD;
+    END IF;
+
+    -- Moving is enough: the deleted transcript's segments would go with it
+    UPDATE segments SET transcript_id = heir WHERE transcript_id = OLD.id;
+    UPDATE transcripts SET source_transcript_id = heir
+        WHERE source_transcript_id = OLD.id AND id <> heir;
+    UPDATE transcripts SET source_transcript_id = NULL WHERE id = heir;
+    RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_materialize_reused_segments ON transcripts;
+CREATE TRIGGER trg_materialize_reused_segments
+    BEFORE DELETE ON transcripts
+    FOR EACH ROW EXECUTE FUNCTION materialize_reused_segments();
@@ -0,0 +1,17 @@
+"""
+Unit tests for the pure parts of the backend (no ffmpeg, Whisper, Supabase
+or OpenAI needed). Run from backend/:
+
+    pip install -r requirements.txt -r requirements-dev.txt
+    python -m pytest -q
+"""
+import os
+import tempfile
+
+# Module-level singletons (caches, job queue, Supabase client) are created at
+# import time: give them dummy credentials and a scratch working directory.
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test-service-role-key")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.chdir(tempfile.mkdtemp(prefix="backend-tests-"))
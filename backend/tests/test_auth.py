@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import pytest
+from jose import jwt
+
+from app import auth
+from app.auth import TokenCache
+
+SECRET = "test-secret"
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = TokenCache(max_entries=2)
+    monkeypatch.setattr(auth, "token_cache", cache)
+    monkeypatch.setattr(auth, "JWT_SECRET", SECRET)
+    return cache
+
+
+def token(sub, exp_in=3600):
+    return jwt.encode({"sub": sub, "exp": int(time.time()) + exp_in}, SECRET, algorithm="HS256")
+
+
+def test_verified_claims_are_cached_by_token_hash(cache):
+    bearer = token("user-1")
+    assert asyncio.run(auth.verify_token(bearer))["sub"] == "user-1"
+    assert asyncio.run(auth.verify_token(bearer))["sub"] == "user-1"
+    assert cache.get_stats() == {"hits": 1, "misses": 1, "entries": 1}
+    assert bearer not in str(cache._entries)
+
+
+def test_cached_claims_expire_with_the_token(cache, monkeypatch):
+    cache.put("t", {"sub": "user-1", "exp": time.time() + 10})
+    monkeypatch.setattr(auth.time, "time", lambda: 2e10)
+    assert cache.get("t") is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_tokens_without_exp_are_not_cached(cache):
+    cache.put("t", {"sub": "user-1"})
+    assert cache.get("t") is None
+
+
+def test_least_recently_used_token_is_evicted(cache):
+    for name in ("a", "b"):
+        cache.put(name, {"sub": name, "exp": time.time() + 60})
+    assert cache.get("a")["sub"] == "a"
+    cache.put("c", {"sub": "c", "exp": time.time() + 60})
+    assert cache.get("b") is None
+    assert cache.get("a")["sub"] == "a"
+
+
+def test_bad_signature_is_not_cached(cache):
+    forged = jwt.encode({"sub": "user-1", "exp": int(time.time()) + 60}, "other", algorithm="HS256")
+    with pytest.raises(Exception):
+        asyncio.run(auth.verify_token(forged))
+    assert cache.get_stats()["entries"] == 0
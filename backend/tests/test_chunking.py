@@ -0,0 +1,37 @@
+from app.chunking import estimate_tokens, pack_lines, split_sentences
+
+
+def words(text):
+    return len(text.split())
+
+
+def pack(lines, max_tokens, overlap_tokens=0):
+    return pack_lines(lines, [words(line) for line in lines], max_tokens, overlap_tokens, words)
+
+
+def test_short_transcript_is_one_chunk():
+    assert pack(["a b", "c d"], 10) == ["a b\nc d"]
+
+
+def test_chunks_stay_under_budget_and_never_split_a_line():
+    lines = [f"w{i} x y" for i in range(10)]
+    chunks = pack(lines, 7)
+    assert all(words(chunk) <= 7 for chunk in chunks)
+    assert [line for chunk in chunks for line in chunk.split("\n")] == lines
+
+
+def test_tail_of_a_chunk_is_repeated_as_overlap():
+    lines = ["a b", "c d", "e f", "g h"]
+    chunks = pack(lines, 4, overlap_tokens=2)
+    assert chunks == ["a b\nc d", "c d\ne f", "e f\ng h"]
+
+
+def test_oversized_line_is_split_at_sentences():
+    long_line = "One two three. Four five six. Seven eight."
+    chunks = pack(["intro", long_line], 4)
+    assert chunks == ["intro\nOne two three.", "Four five six.", "Seven eight."]
+
+
+def test_split_sentences_and_estimate():
+    assert split_sentences("Hi. How are you? Fine… ok") == ["Hi.", "How are you?", "Fine…", "ok"]
+    assert estimate_tokens("hello, world") == 2 + 1 + 2
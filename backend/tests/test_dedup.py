@@ -0,0 +1,45 @@
+import asyncio
+
+from app import pipeline
+from app.whisper_models import covers
+
+
+def test_covers_same_or_larger_model():
+    assert covers("whisper-small", "small")
+    assert covers("whisper-medium", "base")
+    assert not covers("whisper-base", "small")
+    assert not covers("whisper-unknown", "base")
+
+
+def test_reusable_transcript_lookup_is_scoped_to_the_user(monkeypatch):
+    calls = []
+
+    async def find_transcribed_audio(user_id, column, digest):
+        calls.append((user_id, column, digest))
+        return [
+            {"id": "m1", "transcripts": [{"id": "t1", "model": "whisper-base"}]},
+            {"id": "m2", "transcripts": [{"id": "t2", "model": "whisper-medium"}]},
+        ]
+
+    monkeypatch.setattr(pipeline.db, "find_transcribed_audio", find_transcribed_audio)
+
+    match = asyncio.run(pipeline.find_reusable_transcript("user-a", "audio_sha256", "abc", "small"))
+    assert calls == [("user-a", "audio_sha256", "abc")]
+    assert match["transcript"]["id"] == "t2"
+
+    assert asyncio.run(pipeline.find_reusable_transcript("user-a", "audio_sha256", None, "small")) is None
+    assert len(calls) == 1
+
+
+def test_repository_filters_on_user_id(monkeypatch):
+    seen = {}
+
+    async def request(name, method, table, params=None, json=None, prefer=None):
+        seen.update(params)
+        return []
+
+    monkeypatch.setattr(pipeline.db, "_request", request)
+    asyncio.run(pipeline.db.find_transcribed_audio("user-a", "audio_pcm_sha256", "abc"))
+    assert seen["user_id"] == "eq.user-a"
+    assert seen["audio_pcm_sha256"] == "eq.abc"
+    assert seen["status"] == "eq.done"
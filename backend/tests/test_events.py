@@ -0,0 +1,127 @@
+import asyncio
+from functools import partial
+
+import pytest
+from fastapi import HTTPException
+
+from app import main
+from app.events import JobEvents
+
+
+async def collect(stream, limit=20):
+    items = []
+    async for item in stream:
+        items.append(item)
+        if len(items) == limit:
+            break
+    return items
+
+
+def test_late_subscriber_replays_past_events_then_gets_live_ones():
+    async def scenario():
+        events = JobEvents()
+        events.publish("job-1", "progress", {"percent": 10})
+        events.publish("job-1", "progress", {"percent": 50})
+        stream = events.subscribe("job-1")
+        received = [await stream.__anext__(), await stream.__anext__()]
+        events.publish("job-1", "done", {"transcript_id": "t1"})
+        events.close("job-1")
+        return received + await collect(stream)
+
+    assert asyncio.run(scenario()) == [
+        ("progress", {"percent": 10}),
+        ("progress", {"percent": 50}),
+        ("done", {"transcript_id": "t1"}),
+    ]
+
+
+def test_closed_job_replays_and_ends():
+    async def scenario():
+        events = JobEvents()
+        events.publish("job-1", "failed", {"error": "boom"})
+        events.close("job-1")
+        return await collect(events.subscribe("job-1"))
+
+    assert asyncio.run(scenario()) == [("failed", {"error": "boom"})]
+
+
+def test_idle_subscription_yields_keepalives():
+    async def scenario():
+        events = JobEvents()
+        return await collect(events.subscribe("job-1", keepalive=0.01), limit=2)
+
+    assert asyncio.run(scenario()) == [None, None]
+
+
+def test_disconnected_subscriber_is_removed():
+    async def scenario():
+        events = JobEvents()
+        events.publish("job-1", "progress", {"percent": 10})
+        stream = events.subscribe("job-1")
+        await stream.__anext__()
+        channel = events._channels["job-1"]
+        assert len(channel.subscribers) == 1
+        await stream.aclose()
+        return channel.subscribers
+
+    assert asyncio.run(scenario()) == set()
+
+
+@pytest.fixture
+def job_stream(monkeypatch):
+    events = JobEvents()
+    monkeypatch.setattr(events, "subscribe", partial(JobEvents.subscribe, events, keepalive=0.01))
+    monkeypatch.setattr(main, "job_events", events)
+    jobs = {"job-1": {"id": "job-1", "user_id": "user-1", "status": "running", "result": None, "error": None}}
+    monkeypatch.setattr(main.job_queue, "get", lambda job_id: jobs.get(job_id))
+    return events, jobs
+
+
+def test_endpoint_streams_until_done_with_keepalives(job_stream):
+    events, jobs = job_stream
+
+    async def scenario():
+        response = await main.stream_job_events("job-1", "user-1")
+        frames = []
+        async for frame in response.body_iterator:
+            frames.append(frame)
+            if frame.startswith(": keep-alive"):
+                events.publish("job-1", "done", {"transcript_id": "t1"})
+                events.close("job-1")
+        return frames
+
+    events.publish("job-1", "progress", {"percent": 5})
+    assert asyncio.run(scenario()) == [
+        'event: progress\ndata: {"percent": 5}\n\n',
+        ": keep-alive\n\n",
+        'event: done\ndata: {"transcript_id": "t1"}\n\n',
+    ]
+    assert events._channels["job-1"].subscribers == set()
+
+
+def test_endpoint_notices_a_job_finished_without_events(job_stream):
+    events, jobs = job_stream
+
+    async def scenario():
+        response = await main.stream_job_events("job-1", "user-1")
+        jobs["job-1"].update(status="failed", error="worker died")
+        return [frame async for frame in response.body_iterator]
+
+    assert asyncio.run(scenario()) == ['event: failed\ndata: {"error": "worker died"}\n\n']
+
+
+def test_endpoint_answers_old_jobs_from_the_queue(job_stream):
+    events, jobs = job_stream
+    jobs["job-1"].update(status="done", result={"transcript_id": "t1"})
+
+    async def scenario():
+        response = await main.stream_job_events("job-1", "user-1")
+        return [frame async for frame in response.body_iterator]
+
+    assert asyncio.run(scenario()) == ['event: done\ndata: {"transcript_id": "t1"}\n\n']
+
+
+def test_endpoint_hides_other_users_jobs(job_stream):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.stream_job_events("job-1", "user-2"))
+    assert error.value.status_code == 404
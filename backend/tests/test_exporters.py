@@ -0,0 +1,76 @@
+import asyncio
+from pathlib import Path
+
+from app.exporters import ExportCache, content_disposition, iterate_file, render_srt, render_vtt, timestamp
+
+
+async def _pages(*pages):
+    for page in pages:
+        yield page
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+SEGMENTS = [
+    {"start_seconds": 0, "end_seconds": 2.5, "text": " Bonjour à tous. "},
+    {"start_seconds": 3661.0005, "end_seconds": 3662.25, "text": "Next point."},
+]
+
+
+def test_timestamp():
+    assert timestamp(0) == "00:00:00,000"
+    assert timestamp(3661.0005) == "01:01:01,000"
+    assert timestamp("62.5", ".") == "00:01:02.500"
+
+
+def test_render_srt_numbers_cues_across_pages():
+    text = "".join(asyncio.run(_collect(render_srt("t", _pages(SEGMENTS[:1], SEGMENTS[1:])))))
+    assert text == (
+        "1\n00:00:00,000 --> 00:00:02,500\nBonjour à tous.\n\n"
+        "2\n01:01:01,000 --> 01:01:02,250\nNext point.\n\n"
+    )
+
+
+def test_render_vtt():
+    text = "".join(asyncio.run(_collect(render_vtt("t", _pages(SEGMENTS)))))
+    assert text.startswith("WEBVTT\n\n00:00:00.000 --> 00:00:02.500\nBonjour à tous.\n\n")
+    assert "01:01:01.000 --> 01:01:02.250\nNext point." in text
+
+
+def test_content_disposition_non_ascii_title():
+    header = content_disposition("Cœur réunion", "pdf")
+    header.encode("latin-1")  # what Starlette does with header values
+    assert 'filename="C_ur reunion.pdf"' in header
+    assert "filename*=UTF-8''C%C5%93ur%20r%C3%A9union.pdf" in header
+
+
+def test_content_disposition_strips_quotes_and_separators():
+    header = content_disposition('a"b/c\r\n', "md")
+    assert header.startswith('attachment; filename="a_b_c__.md"')
+    assert content_disposition("", "srt").startswith('attachment; filename="export.srt"')
+    assert content_disposition("会議", "srt").isascii()
+
+
+def test_export_cache_keeps_complete_exports_only(tmp_path: Path):
+    cache = ExportCache(str(tmp_path))
+
+    async def chunks():
+        yield b"abc"
+        yield b"def"
+
+    assert cache.get("k") is None
+    assert b"".join(asyncio.run(_collect(cache.tee("k", chunks())))) == b"abcdef"
+    path = cache.get("k")
+    assert path is not None
+    assert b"".join(asyncio.run(_collect(iterate_file(path, chunk_size=2)))) == b"abcdef"
+
+    async def abandoned():
+        tee = cache.tee("partial", chunks())
+        await tee.__anext__()
+        await tee.aclose()  # client went away
+
+    asyncio.run(abandoned())
+    assert cache.get("partial") is None
+    assert not list(tmp_path.glob("*.tmp"))
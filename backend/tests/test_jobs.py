@@ -0,0 +1,67 @@
+import pytest
+
+from app import jobs
+from app.jobs import JobQueue, QueueFullError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(jobs.time, "time", lambda: now[0])
+    return now
+
+
+def enqueue(queue, name, duration):
+    return queue.enqueue("transcription", {"name": name}, duration_seconds=duration)
+
+
+def claimed(queue):
+    names = []
+    while (job := queue.claim_next()) is not None:
+        names.append(job["payload"]["name"])
+    return names
+
+
+def test_fifo_claims_oldest_first(tmp_path, clock):
+    queue = JobQueue(str(tmp_path / "jobs.db"), scheduling="fifo")
+    for i, (name, duration) in enumerate([("long", 3000), ("short", 60), ("unknown", None)]):
+        clock[0] = 1000.0 + i
+        enqueue(queue, name, duration)
+    assert claimed(queue) == ["long", "short", "unknown"]
+
+
+def test_sjf_claims_shortest_audio_first(tmp_path, clock):
+    queue = JobQueue(str(tmp_path / "jobs.db"), scheduling="sjf")
+    for i, (name, duration) in enumerate([("long", 3000), ("unknown", None), ("short", 60), ("medium", 600)]):
+        clock[0] = 1000.0 + i
+        enqueue(queue, name, duration)
+    assert claimed(queue) == ["short", "medium", "long", "unknown"]
+
+
+def test_sjf_aging_lets_a_long_wait_win(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_SJF_AGING", 1.0)
+    queue = JobQueue(str(tmp_path / "jobs.db"), scheduling="sjf")
+    enqueue(queue, "long", 600)
+    clock[0] += 580  # waited 580 s: 600 - 580 = 20 < 60
+    enqueue(queue, "short", 60)
+    assert claimed(queue) == ["long", "short"]
+
+
+def test_claimed_job_is_running_and_counts_against_capacity(tmp_path, clock):
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_size=1, scheduling="sjf")
+    job = enqueue(queue, "only", 10)
+    assert queue.claim_next()["status"] == "running"
+    with pytest.raises(QueueFullError):
+        enqueue(queue, "next", 10)
+    queue.mark_done(job["id"], {"ok": True})
+    assert queue.get(job["id"])["result"] == {"ok": True}
+    queue.check_capacity()
+
+
+def test_requeue_running_after_restart(tmp_path, clock):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path)
+    enqueue(queue, "interrupted", 10)
+    queue.claim_next()
+    assert JobQueue(path).requeue_running() == 1
+    assert claimed(JobQueue(path)) == ["interrupted"]
@@ -0,0 +1,66 @@
+import threading
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import APIConnectionError
+
+from app import llm as llm_module
+from app.llm import LLMGateway, LLMUnavailableError
+
+REQUEST = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 10}
+
+
+class FakeCompletions:
+    def __init__(self, failures=0):
+        self.failures = failures
+
+    def create(self, **request):
+        if self.failures:
+            self.failures -= 1
+            raise APIConnectionError(request=httpx.Request("POST", "http://llm.test"))
+        message = SimpleNamespace(content="ok")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def gateway_with(completions, **kwargs):
+    gateway = LLMGateway(max_concurrency=1, retry_base_delay=0, **kwargs)
+    gateway._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return gateway
+
+
+def test_slot_is_released_during_retry_backoff(monkeypatch):
+    gateway = gateway_with(FakeCompletions(failures=2))
+    in_flight_while_sleeping = []
+    monkeypatch.setattr(llm_module.time, "sleep", lambda delay: in_flight_while_sleeping.append(gateway.scheduler.active))
+
+    assert gateway.complete(REQUEST, "user-1") == "ok"
+    assert in_flight_while_sleeping == [0, 0]
+    assert gateway.scheduler.active == 0
+    stats = gateway.get_stats()
+    assert (stats["calls"], stats["failures"], stats["retries"]) == (3, 2, 2)
+
+
+def test_exhausted_retries_release_the_slot(monkeypatch):
+    gateway = gateway_with(FakeCompletions(failures=5), max_retries=1)
+    monkeypatch.setattr(llm_module.time, "sleep", lambda delay: None)
+
+    with pytest.raises(LLMUnavailableError):
+        gateway.complete(REQUEST, "user-1")
+    assert gateway.scheduler.active == 0
+
+
+def test_stats_count_every_concurrent_call():
+    gateway = gateway_with(FakeCompletions())
+    gateway.scheduler.slots = 8
+
+    def calls():
+        for _ in range(50):
+            gateway.complete(REQUEST, "user-1")
+
+    threads = [threading.Thread(target=calls) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert gateway.get_stats()["calls"] == 400
@@ -0,0 +1,129 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app import preferences
+from app.preferences import DEFAULT_PREFERENCES, PreferencesService
+
+
+class FakeTable:
+    """user_preferences with a UNIQUE user_id, counting round-trips."""
+
+    def __init__(self):
+        self.rows = {}
+        self.calls = []
+
+    async def select(self, table, user_id):
+        self.calls.append(("select", table))
+        return [dict(self.rows[user_id])] if user_id in self.rows else []
+
+    async def upsert(self, table, row, on_conflict, ignore_duplicates=False):
+        self.calls.append(("upsert", table, on_conflict, ignore_duplicates))
+        user_id = row[on_conflict]
+        if user_id in self.rows:
+            if ignore_duplicates:
+                return []
+            self.rows[user_id].update(row)
+        else:
+            self.rows[user_id] = dict(row)
+        return [dict(self.rows[user_id])]
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeTable()
+    monkeypatch.setattr(preferences.db, "select", table.select)
+    monkeypatch.setattr(preferences.db, "upsert", table.upsert)
+    return table
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(preferences, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_get_creates_defaults_with_ignore_duplicates(table, clock):
+    service = PreferencesService(ttl=60)
+
+    row = asyncio.run(service.get("user-1"))
+
+    assert row == {"user_id": "user-1", **DEFAULT_PREFERENCES}
+    assert table.calls == [("select", "user_preferences"), ("upsert", "user_preferences", "user_id", True)]
+    assert list(table.rows) == ["user-1"]
+
+
+def test_get_defaults_keeps_a_concurrent_save(monkeypatch, table, clock):
+    service = PreferencesService(ttl=60)
+    # Another tab saves between our SELECT and our INSERT of the defaults
+    original_select = table.select
+
+    async def select_then_save(table_name, user_id):
+        rows = await original_select(table_name, user_id)
+        if not rows and user_id not in table.rows:
+            table.rows[user_id] = {"user_id": user_id, **DEFAULT_PREFERENCES, "default_language": "fr"}
+        return rows
+
+    monkeypatch.setattr(preferences.db, "select", select_then_save)
+
+    row = asyncio.run(service.get("user-1"))
+
+    assert row["default_language"] == "fr"
+    assert table.rows["user-1"]["default_language"] == "fr"
+    assert len(table.rows) == 1
+
+
+def test_get_is_cached_until_ttl_expires(table, clock):
+    table.rows["user-1"] = {"user_id": "user-1", "default_language": "de"}
+    service = PreferencesService(ttl=60)
+
+    assert asyncio.run(service.get("user-1"))["default_language"] == "de"
+    table.rows["user-1"]["default_language"] = "it"
+    clock.now += 59
+    assert asyncio.run(service.get("user-1"))["default_language"] == "de"
+    assert len(table.calls) == 1
+
+    clock.now += 1
+    assert asyncio.run(service.get("user-1"))["default_language"] == "it"
+    assert len(table.calls) == 2
+    assert service.get_stats() == {"hits": 1, "misses": 2, "entries": 1}
+
+
+def test_save_writes_through_the_cache(table, clock):
+    service = PreferencesService(ttl=60)
+    asyncio.run(service.get("user-1"))
+
+    saved = asyncio.run(service.save("user-1", {"default_language": "fr"}))
+    calls = len(table.calls)
+
+    assert table.calls[-1] == ("upsert", "user_preferences", "user_id", False)
+    assert saved["default_language"] == "fr"
+    assert asyncio.run(service.get("user-1"))["default_language"] == "fr"
+    assert len(table.calls) == calls
+
+
+def test_invalidate_one_user_or_all(table, clock):
+    service = PreferencesService(ttl=60)
+    for user_id in ("user-1", "user-2"):
+        table.rows[user_id] = {"user_id": user_id, "default_language": "en"}
+        asyncio.run(service.get(user_id))
+    table.rows["user-1"]["default_language"] = "fr"
+    table.rows["user-2"]["default_language"] = "es"
+
+    service.invalidate("user-1")
+    assert asyncio.run(service.get("user-1"))["default_language"] == "fr"
+    assert asyncio.run(service.get("user-2"))["default_language"] == "en"
+
+    service.invalidate()
+    assert service.get_stats()["entries"] == 0
+    assert asyncio.run(service.get("user-2"))["default_language"] == "es"
+
+
+def test_cache_evicts_least_recently_used(table, clock):
+    service = PreferencesService(ttl=60, max_entries=2)
+    for user_id in ("user-1", "user-2", "user-3"):
+        asyncio.run(service.get(user_id))
+
+    assert list(service._cache) == ["user-2", "user-3"]
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app import refine_sessions as module
+from app.refine_sessions import RefineSession, RefineSessionStore, SessionExpiredError
+
+
+def words(text):
+    return len(text.split())
+
+
+def chat(turns):
+    history = []
+    for i in range(turns):
+        history += [{"role": "user", "content": f"ask {i}"}, {"role": "assistant", "content": f"answer {i}"}]
+    return history
+
+
+def test_seeding_keeps_recent_turns_and_memos_the_rest(monkeypatch):
+    monkeypatch.setattr(module, "REFINE_RECENT_TURNS", 2)
+    session = RefineSession.from_history(chat(4))
+    assert session.turn_count == 4
+    assert session.turns == [("ask 2", "answer 2"), ("ask 3", "answer 3")]
+    assert session.memo == "- User asked: ask 0\n- User asked: ask 1"
+    assert session.last_user_message == "ask 3"
+
+
+def test_history_messages_fit_the_budget_newest_first():
+    session = RefineSession()
+    session.memo = "short memo"
+    session.turns = [("one two", "three four"), ("five", "six")]
+    messages, used = session.history_messages(20, words)
+    assert [m["role"] for m in messages] == ["system", "user", "assistant"]
+    assert messages[1]["content"] == "five"
+    assert used == words("Memo of the earlier conversation:\nshort memo") + 2 + 8
+
+
+def test_record_rolls_old_turns_into_the_memo(monkeypatch):
+    monkeypatch.setattr(module, "REFINE_RECENT_TURNS", 1)
+    monkeypatch.setattr(module, "compress_memo", lambda memo, turns, user_id: f"memo of {turns[0][0]}")
+
+    async def turns():
+        session = RefineSession()
+        session.record("first", "a", "user-1", words)
+        session.record("second", "b", "user-1", words)
+        await session.settled()
+        return session
+
+    session = asyncio.run(turns())
+    assert session.turns == [("second", "b")]
+    assert session.memo == "memo of first"
+    assert session.turn_count == 2
+
+
+def test_memo_falls_back_to_user_requests_without_llm(monkeypatch):
+    monkeypatch.setattr(module, "REFINE_RECENT_TURNS", 1)
+
+    def unavailable(*args):
+        raise RuntimeError("no LLM")
+
+    monkeypatch.setattr(module, "compress_memo", unavailable)
+
+    async def turns():
+        session = RefineSession()
+        session.record("make it shorter", "ok", "user-1", words)
+        session.record("in French", "ok", "user-1", words)
+        await session.settled()
+        return session
+
+    assert asyncio.run(turns()).memo == "- User asked: make it shorter"
+
+
+def test_store_returns_the_same_session_until_it_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+    store = RefineSessionStore(ttl=60)
+
+    session = store.open("user-1", "summary-1", "s1", [])
+    session.turn_count = 1
+    assert store.open("user-1", "summary-1", "s1", [], expected_turns=1) is session
+    assert store.open("user-2", "summary-1", "s1", []) is not session
+
+    now[0] += 61
+    with pytest.raises(SessionExpiredError):
+        store.open("user-1", "summary-1", "s1", [], expected_turns=1)
+    reseeded = store.open("user-1", "summary-1", "s1", chat(1), expected_turns=1)
+    assert reseeded.turns == [("ask 0", "answer 0")]
+    assert store.get_stats()["reseeded"] == 1
+
+
+def test_store_is_bounded():
+    store = RefineSessionStore(max_entries=2)
+    for session_id in ("a", "b", "c"):
+        store.open("user-1", "summary-1", session_id, [])
+    assert store.get_stats()["entries"] == 2
+
+
+def test_no_session_id_builds_an_unstored_session():
+    store = RefineSessionStore()
+    assert store.open("user-1", "summary-1", None, chat(1)).turns == [("ask 0", "answer 0")]
+    assert store.get_stats()["entries"] == 0
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from app.repository import SUMMARY_LIST_COLUMNS, Repository
+
+
+class FakeRequest:
+    """Stands in for Repository._request: records calls, answers from a queue."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def __call__(self, name, method, table, params=None, json=None, prefer=None):
+        self.calls.append({"name": name, "method": method, "table": table, "params": params})
+        return self.responses.pop(0) if self.responses else []
+
+
+@pytest.fixture
+def repo():
+    return Repository(url="http://db.test", key="key")
+
+
+def test_list_summaries_first_page(repo):
+    repo._request = FakeRequest()
+
+    asyncio.run(repo.list_summaries("user-1", 20))
+
+    assert repo._request.calls[0]["params"] == {
+        "select": SUMMARY_LIST_COLUMNS,
+        "user_id": "eq.user-1",
+        "order": "created_at.desc,id.desc",
+        "limit": "20",
+    }
+
+
+def test_list_summaries_keyset_and_filters(repo):
+    repo._request = FakeRequest()
+
+    asyncio.run(repo.list_summaries(
+        "user-1", 20, after=("2024-05-01T10:00:00+00:00", "s-9"), format="bullet", language="fr",
+        created_after="2024-01-01", created_before="2024-06-01",
+    ))
+
+    params = repo._request.calls[0]["params"]
+    assert params["format"] == "eq.bullet"
+    assert params["language"] == "eq.fr"
+    # One `and` holds the date range and the keyset, so neither overwrites the other
+    assert params["and"] == (
+        '(created_at.gte."2024-01-01",created_at.lt."2024-06-01",'
+        'or(created_at.lt."2024-05-01T10:00:00+00:00",'
+        'and(created_at.eq."2024-05-01T10:00:00+00:00",id.lt.s-9)))'
+    )
+    assert "or" not in params
+
+
+def test_iter_segments_pages_until_a_short_page(repo):
+    repo._request = FakeRequest(
+        [{"id": "a", "start_seconds": 0.0}, {"id": "b", "start_seconds": 1.5}],
+        [{"id": "c", "start_seconds": 1.5}, {"id": "d", "start_seconds": 3.0}],
+        [{"id": "e", "start_seconds": 4.0}],
+    )
+
+    async def collect():
+        return [page async for page in repo.iter_segments("t-1", page_size=2)]
+
+    pages = asyncio.run(collect())
+
+    assert [[s["id"] for s in page] for page in pages] == [["a", "b"], ["c", "d"], ["e"]]
+    params = [call["params"] for call in repo._request.calls]
+    assert len(params) == 3
+    assert "or" not in params[0]
+    assert params[1]["or"] == "(start_seconds.gt.1.5,and(start_seconds.eq.1.5,id.gt.b))"
+    assert params[2]["or"] == "(start_seconds.gt.3.0,and(start_seconds.eq.3.0,id.gt.d))"
+    assert all(p["transcript_id"] == "eq.t-1" and p["limit"] == "2" for p in params)
+
+
+def test_iter_segments_full_last_page_costs_one_empty_request(repo):
+    repo._request = FakeRequest([{"id": "a", "start_seconds": 0.0}, {"id": "b", "start_seconds": 1.0}], [])
+
+    async def collect():
+        return [page async for page in repo.iter_segments("t-1", page_size=2)]
+
+    assert len(asyncio.run(collect())) == 1
+    assert len(repo._request.calls) == 2
+
+
+def test_get_meeting_with_segments_embedded(repo):
+    segments = [{"start_seconds": 0.0, "end_seconds": 2.0, "text": "hello"}]
+    repo._request = FakeRequest([
+        {"id": "m-1", "title": "Sync", "transcripts": [{"id": "t-1", "source_transcript_id": None, "segments": segments}]},
+    ])
+
+    meeting, transcript_id, result = asyncio.run(repo.get_meeting_with_segments("m-1"))
+
+    assert meeting == {"id": "m-1", "title": "Sync"}
+    assert transcript_id == "t-1"
+    assert result == segments
+    assert len(repo._request.calls) == 1
+    assert repo._request.calls[0]["params"]["id"] == "eq.m-1"
+
+
+def test_get_meeting_with_segments_follows_source_transcript(repo):
+    segments = [{"start_seconds": 0.0, "end_seconds": 2.0, "text": "shared"}]
+    repo._request = FakeRequest(
+        [{"id": "m-2", "transcripts": [{"id": "t-2", "source_transcript_id": "t-1", "segments": []}]}],
+        segments,
+    )
+
+    meeting, transcript_id, result = asyncio.run(repo.get_meeting_with_segments("m-2"))
+
+    assert transcript_id == "t-2"
+    assert result == segments
+    second = repo._request.calls[1]
+    assert second["table"] == "segments"
+    assert second["params"]["transcript_id"] == "eq.t-1"
+    assert second["params"]["order"] == "start_seconds.asc"
+
+
+def test_get_meeting_with_segments_missing(repo):
+    repo._request = FakeRequest([], [{"id": "m-3", "transcripts": []}])
+
+    assert asyncio.run(repo.get_meeting_with_segments("nope")) == (None, None, [])
+    assert asyncio.run(repo.get_meeting_with_segments("m-3")) == ({"id": "m-3"}, None, [])
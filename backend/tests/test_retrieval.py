@@ -0,0 +1,73 @@
+import numpy as np
+
+from app.retrieval import BM25Index, TranscriptIndexCache, tokenize
+from app.segments import SegmentTable
+
+TEXTS = [
+    "Welcome everyone to the weekly sync",
+    "The budget for the launch was approved",
+    "Marketing wants a bigger budget next quarter, budget talks continue",
+    "Hiring is paused until the réunion in May",
+    "Nothing else to report today",
+    "The launch date moves to June",
+]
+
+
+def words(text):
+    return len(text.split())
+
+
+def table(texts=TEXTS):
+    starts = np.arange(len(texts), dtype=np.float64) * 10
+    return SegmentTable.from_columns(starts, starts + 5, texts)
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Réunion, BUDGET a") == ["reunion", "budget"]
+
+
+def test_segments_are_ranked_by_query_terms():
+    index = BM25Index(table())
+    scores = index.scores("budget")
+    assert set(scores) == {1, 2}
+    assert scores[2] > scores[1]
+    assert index.scores("reunion") == index.scores("réunion") != {}
+
+
+def test_selection_keeps_the_best_matches_in_chronological_order():
+    index = BM25Index(table())
+    picked = index.select_context("budget launch", 1000, words, top_k=3)
+    assert picked.texts() == [TEXTS[1], TEXTS[2], TEXTS[5]]
+    assert picked.starts.tolist() == [10.0, 20.0, 50.0]
+
+    best = index.select_context("budget launch", 1000, words, top_k=1)
+    assert best.texts() == [TEXTS[1]]
+
+
+def test_selection_stays_within_the_token_budget():
+    index = BM25Index(table())
+    budget = words(TEXTS[1]) + 8  # only the shorter of the two budget segments fits
+    picked = index.select_context("budget", budget, words)
+    assert picked.texts() == [TEXTS[1]]
+    assert index.select_context("budget", 5, words).texts() == []
+
+
+def test_unmatched_or_empty_queries_spread_over_the_meeting():
+    texts = [f"point {i} discussed" for i in range(100)]
+    index = BM25Index(table(texts))
+    for query in ("make it shorter", ""):
+        picked = index.select_context(query, 110, words, top_k=40)
+        starts = picked.starts.tolist()
+        # 110 / (3 words * 1.3 + 8) -> 9 segments, one every 11
+        assert starts == [110.0 * i for i in range(9)]
+
+
+def test_index_cache_is_a_bounded_lru():
+    cache = TranscriptIndexCache(max_entries=2)
+    a, b, c = (BM25Index(table()) for _ in range(3))
+    cache.put("a", a)
+    cache.put("b", b)
+    assert cache.get("a") is a
+    cache.put("c", c)
+    assert cache.get("b") is None
+    assert cache.get("a") is a and cache.get("c") is c
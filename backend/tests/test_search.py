@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.search import SqliteSearchIndex, fts5_query
+
+
+def summary(summary_id, text, user_id="user-1", title="Weekly sync"):
+    return {"id": summary_id, "title": title, "summary_text": text, "user_id": user_id, "meeting_id": "meeting-1"}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SqliteSearchIndex(str(tmp_path / "search.db"))
+    asyncio.run(index.index_segments("user-1", "meeting-1", "Weekly sync", [
+        {"id": "s1", "text": "The budget was approved for the next quarter", "start_seconds": 12.0, "end_seconds": 15.5},
+        {"id": "s2", "text": "Budget budget budget, we talked about the budget", "start_seconds": 20.0, "end_seconds": 24.0},
+        {"id": "s3", "text": "Hiring is on hold", "start_seconds": 30.0, "end_seconds": 32.0},
+    ]))
+    asyncio.run(index.index_segments("user-2", "meeting-2", "Other team", [
+        {"id": "o1", "text": "Our budget is secret", "start_seconds": 0.0, "end_seconds": 2.0},
+    ]))
+    return index
+
+
+def search(index, query, user_id="user-1", **kwargs):
+    return asyncio.run(index.search(user_id, query, **kwargs))
+
+
+def test_fts5_query_quotes_terms_and_drops_operators():
+    assert fts5_query('budget "approved') == '"budget" "approved"*'
+    assert fts5_query("hiring OR NOT -x* NEAR(a)") == '"hiring" "OR" "NOT" "x" "NEAR" "a"*'
+    assert fts5_query('"" ***') == ""
+
+
+def test_operator_input_is_searched_literally(index):
+    assert search(index, 'budget" OR "hiring') == []
+    assert search(index, "") == []
+
+
+def test_results_are_scoped_to_the_user(index):
+    assert {hit["id"] for hit in search(index, "budget")} == {"s1", "s2"}
+    assert [hit["id"] for hit in search(index, "budget", user_id="user-2")] == ["o1"]
+
+
+def test_segment_hits_are_ranked_with_marked_snippets(index):
+    hits = search(index, "budget")
+    assert [hit["id"] for hit in hits] == ["s2", "s1"]
+    assert hits[0]["rank"] > hits[1]["rank"]
+    assert "<mark>budget</mark>" in hits[1]["snippet"].lower()
+    assert (hits[1]["start_seconds"], hits[1]["end_seconds"]) == (12.0, 15.5)
+    assert [hit["id"] for hit in search(index, "quar")] == ["s1"]  # prefix on the last term
+
+
+def test_reindexing_a_summary_replaces_it(index):
+    asyncio.run(index.index_summary(summary("sum-1", "Decided to freeze hiring")))
+    asyncio.run(index.index_summary(summary("sum-1", "Decided to approve the roadmap")))
+    assert search(index, "hiring", kind="summary") == []
+    hits = search(index, "roadmap", kind="summary")
+    assert [(hit["kind"], hit["id"]) for hit in hits] == [("summary", "sum-1")]
+    assert hits[0]["start_seconds"] is None
+
+
+def test_kind_filter_and_summary_removal(index):
+    asyncio.run(index.index_summary(summary("sum-1", "The budget is approved")))
+    assert {hit["kind"] for hit in search(index, "budget")} == {"segment", "summary"}
+    assert {hit["kind"] for hit in search(index, "budget", kind="segment")} == {"segment"}
+
+    asyncio.run(index.remove_summary("sum-1"))
+    assert search(index, "budget", kind="summary") == []
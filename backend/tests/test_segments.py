@@ -0,0 +1,46 @@
+from app.segments import SegmentTable, REFINE_LINE, SUMMARY_LINE_PLAIN
+
+ROWS = [
+    {"start_seconds": 0, "end_seconds": "1.5", "text": "Hello there"},
+    {"start_seconds": "2.0", "end_seconds": 3.25, "text": "Budget is approved"},
+    {"start_seconds": 4.0, "end_seconds": 5.0, "text": None},
+    {"start_seconds": 6.0, "end_seconds": 7.0, "text": "Two\nlines"},
+]
+
+
+def words(text):
+    return len(text.split())
+
+
+def test_lines_and_texts():
+    table = SegmentTable.from_rows(ROWS)
+    assert table.texts() == ["Hello there", "Budget is approved", "", "Two\nlines"]
+    assert table.lines()[:2] == ["- [0.0s–1.5s] Hello there", "- [2.0s–3.2s] Budget is approved"]
+    assert table.lines(REFINE_LINE)[3] == "[6.0s-7.0s] Two\nlines"
+    assert table.lines(SUMMARY_LINE_PLAIN)[0] == "- Hello there"
+    assert list(table)[1] == {"start_seconds": 2.0, "end_seconds": 3.25, "text": "Budget is approved"}
+
+
+def test_slices_share_the_buffer():
+    table = SegmentTable.from_rows(ROWS)
+    middle = table[1:3]
+    assert middle.buffer is table.buffer
+    assert middle.texts() == ["Budget is approved", ""]
+    assert middle.char_count == len("Budget is approved")
+    assert table.between(2.0, 6.0).texts() == ["Budget is approved", ""]
+    assert len(table[3:1]) == 0
+    assert table[::2].texts() == ["Hello there", ""]
+
+
+def test_take_keeps_the_given_order():
+    picked = SegmentTable.from_rows(ROWS).take([3, 0])
+    assert picked.texts() == ["Two\nlines", "Hello there"]
+    assert picked.starts.tolist() == [6.0, 0.0]
+
+
+def test_token_totals_are_prefix_sums():
+    table = SegmentTable.from_rows(ROWS)
+    assert table.token_total(words) == 2 + 3 + 0 + 2
+    assert table.token_total(words, 1, 3) == 3
+    assert table[1:].token_total(words) == 5
+    assert table.duration == 7.0
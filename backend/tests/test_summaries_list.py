@@ -0,0 +1,70 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.auth import get_current_user_id
+
+SUMMARY_ID = str(uuid.UUID(int=7))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    async def list_summaries(user_id, limit, **filters):
+        calls.append(filters)
+        return [
+            {"id": SUMMARY_ID, "created_at": "2026-03-01T10:00:00.5+00:00"},
+            {"id": str(uuid.UUID(int=6)), "created_at": "2026-02-01T10:00:00+00:00"},
+        ][:limit]
+
+    monkeypatch.setattr(main.db, "list_summaries", list_summaries)
+    main.app.dependency_overrides[get_current_user_id] = lambda: "user-1"
+    yield TestClient(main.app), calls
+    main.app.dependency_overrides.clear()
+
+
+def test_cursor_round_trip():
+    cursor = main.encode_cursor({"id": SUMMARY_ID, "created_at": "2026-03-01T10:00:00.5+00:00"})
+    assert main.decode_cursor(cursor) == ("2026-03-01T10:00:00.500000+00:00", SUMMARY_ID)
+
+
+@pytest.mark.parametrize("raw", [
+    f'2026-03-01",id.gt.0)|{SUMMARY_ID}',
+    "2026-03-01T10:00:00|not-a-uuid",
+    f"yesterday|{SUMMARY_ID}",
+])
+def test_tampered_cursor_is_rejected(client, raw):
+    http, calls = client
+    cursor = main.encode_cursor({"created_at": raw.split("|")[0], "id": raw.split("|")[-1]})
+    assert http.get("/summaries", params={"cursor": cursor}).status_code == 400
+    assert calls == []
+
+
+def test_next_page_cursor_points_after_the_last_row(client):
+    http, calls = client
+    response = http.get("/summaries", params={"limit": 1})
+    assert response.status_code == 200
+    assert main.decode_cursor(response.json()["next_cursor"])[1] == SUMMARY_ID
+
+    http.get("/summaries", params={"limit": 1, "cursor": response.json()["next_cursor"]})
+    assert calls[-1]["after"] == ("2026-03-01T10:00:00.500000+00:00", SUMMARY_ID)
+
+
+def test_created_filters_are_sent_in_iso_form(client):
+    http, calls = client
+    response = http.get("/summaries", params={"created_after": "2026-01-01", "created_before": "2026-02-01T00:00:00Z"})
+    assert response.status_code == 200
+    assert calls[-1]["created_after"] == "2026-01-01T00:00:00"
+    assert calls[-1]["created_before"] == "2026-02-01T00:00:00+00:00"
+
+
+@pytest.mark.parametrize("name", ["created_after", "created_before"])
+def test_bad_created_filter_is_a_400(client, name):
+    http, calls = client
+    response = http.get("/summaries", params={name: '2026-01-01",id.gt.0'})
+    assert response.status_code == 400
+    assert name in response.json()["detail"]
+    assert calls == []
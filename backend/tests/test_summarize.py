@@ -0,0 +1,92 @@
+import random
+import re
+import threading
+import time
+
+import pytest
+
+from app import summarize
+from app.summary_cache import SummaryCache
+
+
+def words(text):
+    return len(text.split())
+
+
+class FakeClient:
+    """Answers chunk prompts with 'summary of <chunk>' and combine prompts with a numbered combination."""
+
+    def __init__(self, summary_words=0, delay=0.0):
+        self.summary_words = summary_words
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def complete(self, request):
+        prompt = request["messages"][-1]["content"]
+        time.sleep(random.uniform(0, self.delay))  # calls finish out of order
+        with self._lock:
+            self.calls.append(prompt)
+            number = len(self.calls)
+        filler = " w" * self.summary_words
+        if "Partial summaries:" in prompt:
+            parts = len(re.findall(r"^## Part \d+$", prompt, re.MULTILINE))
+            return f"combined#{number} of {parts}{filler}"
+        chunk = prompt.split("\n\n[This is part")[0]
+        return f"summary of {chunk}{filler}"
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+    monkeypatch.setattr(summarize, "summary_cache", SummaryCache(str(tmp_path / "cache.db")))
+    monkeypatch.setattr(summarize, "count_tokens", words)
+
+
+def test_parallel_map_keeps_chunk_order():
+    chunks = [f"chunk {i}" for i in range(12)]
+    client = FakeClient(delay=0.01)
+    result = summarize.map_chunks(client, chunks, "system", "{segments}", max_concurrency=6)
+    assert result == [f"summary of chunk {i}" for i in range(12)]
+    assert len(client.calls) == 12
+
+
+def test_grouping_respects_the_reduce_budget():
+    summaries = list("abcdefg")
+    groups = summarize.group_summaries(summaries, [3] * 7, max_tokens=7)
+    assert groups == [["a", "b"], ["c", "d"], ["e", "f"], ["g"]]
+    assert all(3 * len(group) <= 7 or len(group) == 1 for group in groups)
+
+
+def test_oversized_summaries_are_still_paired():
+    groups = summarize.group_summaries(["a", "b", "c"], [10, 10, 1], max_tokens=7)
+    assert groups == [["a", "b"], ["c"]]
+
+
+def test_reduce_runs_levels_until_the_summaries_fit():
+    client = FakeClient(summary_words=8)
+    summaries = [f"part {i}" + " w" * 8 for i in range(9)]  # 10 tokens each
+    reduced = summarize.reduce_levels(client, summaries, "system", "en", max_tokens=25)
+    # 9 -> 5 (4 combines) -> 3 (2 combines) -> 2 (1 combine)
+    assert len(client.calls) == 7
+    assert len(reduced) == 2
+
+
+def test_long_meeting_ends_in_a_single_final_call(monkeypatch):
+    monkeypatch.setattr(summarize, "MAX_CHUNK_TOKENS", 40)
+    client = FakeClient(summary_words=1500)
+    monkeypatch.setattr(summarize.llm, "for_user", lambda user_id: client)
+    segments = [
+        {"start_seconds": 5.0 * i, "end_seconds": 5.0 * i + 5, "text": f"segment {i} " + "talk " * 8}
+        for i in range(30)
+    ]
+
+    summary = summarize.summarize(segments, user_id="user-1")
+
+    chunk_calls = [call for call in client.calls if "Partial summaries:" not in call]
+    combine_calls = [call for call in client.calls if "Partial summaries:" in call]
+    assert len(chunk_calls) == len(summarize.PreparedTranscript(segments).chunks) > 3
+    # 1500-token summaries: 3 fit in one 5000-token combine, so the reduce needs several levels
+    assert len(combine_calls) > len(chunk_calls) // 3 + 1
+    final_parts = int(re.match(r"combined#(\d+) of (\d+)", summary).group(2))
+    assert summary.startswith(f"combined#{len(client.calls)} of ")
+    assert 2 <= final_parts <= 3
@@ -0,0 +1,101 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, summarize
+from app.auth import get_current_user_id
+from app.summary_cache import SummaryCache
+
+SEGMENTS = [
+    {"start_seconds": 0.0, "end_seconds": 4.0, "text": "We agreed on the budget."},
+    {"start_seconds": 4.0, "end_seconds": 9.0, "text": "Anna owns the hiring plan."},
+]
+
+
+class FakeClient:
+    def __init__(self):
+        self.requests = []
+
+    def complete(self, request):
+        self.requests.append(request)
+        return f"summary {len(self.requests)}: {request['messages'][0]['content'][:20]}"
+
+
+@pytest.fixture
+def llm_client(monkeypatch, tmp_path):
+    client = FakeClient()
+    monkeypatch.setattr(summarize, "summary_cache", SummaryCache(str(tmp_path / "cache.db")))
+    monkeypatch.setattr(summarize.llm, "for_user", lambda user_id: client)
+    return client
+
+
+@pytest.fixture
+def api(monkeypatch, llm_client):
+    inserts = []
+
+    async def get_meeting_with_segments(meeting_id):
+        return {"id": meeting_id, "user_id": "user-1", "title": "Weekly sync"}, "transcript-1", SEGMENTS
+
+    async def insert(table, rows):
+        inserts.append((table, rows))
+        return [{"id": f"summary-{i}", **row} for i, row in enumerate(rows)]
+
+    async def index_summary(row):
+        pass
+
+    monkeypatch.setattr(main.db, "get_meeting_with_segments", get_meeting_with_segments)
+    monkeypatch.setattr(main.db, "insert", insert)
+    monkeypatch.setattr(main.search_index, "index_summary", index_summary)
+    main.app.dependency_overrides[get_current_user_id] = lambda: "user-1"
+    yield TestClient(main.app), inserts
+    main.app.dependency_overrides.clear()
+
+
+def test_variants_share_one_prepared_transcript(monkeypatch, llm_client):
+    prepared = []
+    original = summarize.PreparedTranscript
+
+    def counting(*args, **kwargs):
+        prepared.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(summarize, "PreparedTranscript", counting)
+    variants = [
+        {"format": "structured", "language": "en", "detail_level": "medium"},
+        {"format": "action_items", "language": "en", "detail_level": "brief"},
+        {"format": "bullet_points", "language": "fr", "detail_level": "detailed"},
+    ]
+    results = summarize.summarize_variants(SEGMENTS, variants, user_id="user-1")
+
+    assert len(prepared) == 1
+    assert len(llm_client.requests) == 3
+    # Results come back in the order of the variants
+    for variant, result in zip(variants, results):
+        assert result.endswith(summarize.SYSTEM_PROMPTS[variant["language"]][variant["format"]][:20])
+
+
+def test_batch_collapses_duplicates_and_inserts_once(api, llm_client):
+    http, inserts = api
+    response = http.post("/summarize/batch", json={"meeting_id": "meeting-1", "variants": [
+        {"format": "structured"},
+        {"format": "action_items", "detail_level": "brief"},
+        {"format": "structured", "language": "en", "detail_level": "medium"},
+    ]})
+
+    assert response.status_code == 200
+    assert len(inserts) == 1
+    table, rows = inserts[0]
+    assert table == "summaries"
+    assert [(row["format"], row["detail_level"]) for row in rows] == [("structured", "medium"), ("action_items", "brief")]
+    assert {row["transcript_id"] for row in rows} == {"transcript-1"}
+    assert len(llm_client.requests) == 2
+    assert [s["summary_id"] for s in response.json()["summaries"]] == ["summary-0", "summary-1"]
+
+
+@pytest.mark.parametrize("count, detail", [(0, "At least one"), (main.SUMMARIZE_BATCH_MAX_VARIANTS + 1, "At most")])
+def test_batch_rejects_empty_or_too_many_variants(api, llm_client, count, detail):
+    http, inserts = api
+    variants = [{"format": "structured", "detail_level": f"level-{i}"} for i in range(count)]
+    response = http.post("/summarize/batch", json={"meeting_id": "meeting-1", "variants": variants})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith(detail)
+    assert inserts == [] and llm_client.requests == []
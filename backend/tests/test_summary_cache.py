@@ -0,0 +1,62 @@
+import pytest
+
+from app import summary_cache as summary_cache_module
+from app.summary_cache import SummaryCache, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(summary_cache_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_key_depends_on_every_part():
+    assert make_key("transcript", {"b": 1, "a": 2}) == make_key("transcript", {"a": 2, "b": 1})
+    assert make_key("transcript", "fr") != make_key("transcript", "en")
+
+
+def test_disk_tier_survives_a_restart(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    SummaryCache(path).set("k", "summary")
+
+    restarted = SummaryCache(path)
+    assert restarted.get("k") == "summary"
+    assert restarted.get("k") == "summary"
+    stats = restarted.get_stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+
+
+def test_entries_expire(tmp_path, clock):
+    cache = SummaryCache(str(tmp_path / "cache.db"), ttl=60)
+    cache.set("k", "summary")
+    clock[0] += 61
+    assert cache.get("k") is None
+    assert cache.get_stats()["disk_entries"] == 0
+
+
+def test_both_tiers_evict_least_recently_used(tmp_path, clock):
+    cache = SummaryCache(str(tmp_path / "cache.db"), memory_entries=1, disk_entries=2)
+    for key in ("a", "b"):
+        clock[0] += 1
+        cache.set(key, key.upper())
+    clock[0] += 1
+    assert cache.get("a") == "A"  # from disk, now the most recently used
+    clock[0] += 1
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get_stats()["disk_entries"] == 2
+
+
+def test_get_or_compute_computes_once(tmp_path, clock):
+    cache = SummaryCache(str(tmp_path / "cache.db"))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "summary"
+
+    assert cache.get_or_compute("k", compute) == "summary"
+    assert cache.get_or_compute("k", compute) == "summary"
+    assert len(calls) == 1
@@ -0,0 +1,73 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.auth import get_current_user_id
+from app.jobs import QueueFullError
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    deleted = []
+
+    async def preferences(user_id):
+        return {"whisper_model": "base", "auto_generate_summary": False}
+
+    async def insert(table, rows):
+        return [{"id": "meeting-1", **rows}]
+
+    async def delete(table, **eq):
+        deleted.append((table, eq))
+        return []
+
+    monkeypatch.setattr(main, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(main.user_preferences, "get", preferences)
+    monkeypatch.setattr(main.db, "insert", insert)
+    monkeypatch.setattr(main.db, "delete", delete)
+    monkeypatch.setattr(main, "probe_duration", lambda path: 60.0)
+    monkeypatch.setattr(main.job_queue, "check_capacity", lambda: None)
+    main.app.dependency_overrides[get_current_user_id] = lambda: "user-1"
+    yield TestClient(main.app), tmp_path, deleted
+    main.app.dependency_overrides.clear()
+
+
+def test_queue_full_after_precheck_removes_upload_and_meeting(client, monkeypatch):
+    http, upload_dir, deleted = client
+
+    def enqueue(*args, **kwargs):
+        raise QueueFullError(retry_after=30)
+
+    monkeypatch.setattr(main.job_queue, "enqueue", enqueue)
+    res = http.post("/transcribe", files={"file": ("call.wav", b"RIFF....", "audio/wav")})
+
+    assert res.status_code == 429
+    assert res.headers["retry-after"] == "30"
+    assert list(upload_dir.iterdir()) == []
+    assert deleted == [("meetings", {"id": "meeting-1"})]
+
+
+def test_failed_meeting_insert_removes_upload(client, monkeypatch):
+    http, upload_dir, deleted = client
+
+    async def insert(table, rows):
+        raise RuntimeError("PostgREST unavailable")
+
+    monkeypatch.setattr(main.db, "insert", insert)
+    res = http.post("/transcribe", files={"file": ("call.wav", b"RIFF....", "audio/wav")})
+
+    assert res.status_code == 500
+    assert list(upload_dir.iterdir()) == []
+    assert deleted == []
+
+
+def test_queued_upload_is_kept(client, monkeypatch):
+    http, upload_dir, deleted = client
+    monkeypatch.setattr(main.job_queue, "enqueue", lambda *a, **k: {"id": "job-1", "status": "pending"})
+    monkeypatch.setattr(main.dispatcher, "notify", lambda: None)
+
+    res = http.post("/transcribe", files={"file": ("call.wav", b"RIFF....", "audio/wav")})
+
+    assert res.status_code == 202
+    assert res.json() == {"meeting_id": "meeting-1", "job_id": "job-1", "status": "pending"}
+    assert len(list(upload_dir.iterdir())) == 1
+    assert deleted == []
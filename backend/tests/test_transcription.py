@@ -0,0 +1,40 @@
+import numpy as np
+
+from app import transcription
+from app.utils.audio_utils import SAMPLE_RATE
+
+
+class RecordingModel:
+    def __init__(self):
+        self.audio = None
+
+    def transcribe(self, audio, **kwargs):
+        self.audio = audio
+        return {"text": " hi", "language": "en", "segments": [{"start": 0.5, "end": 1.0, "text": " hi"}]}
+
+
+def test_upload_is_decoded_once_and_windows_read_the_saved_samples(monkeypatch, tmp_path):
+    raw = tmp_path / "call.m4a"
+    raw.write_bytes(b"not really audio")
+    samples = np.linspace(-1, 1, 4 * SAMPLE_RATE, dtype=np.float32)
+    decodes = []
+
+    def load_audio(path, *args):
+        decodes.append((path, args))
+        return samples
+
+    monkeypatch.setattr(transcription, "load_audio", load_audio)
+    analysis = transcription.analyze_upload(str(raw), target_seconds=300)
+    assert analysis["windows"][-1][1] == 4.0
+    assert analysis["pcm_path"] == str(transcription.pcm_path_for(str(raw)))
+
+    model = RecordingModel()
+    monkeypatch.setattr(transcription.registry, "get", lambda name: model)
+    result = transcription.transcribe_window(analysis["pcm_path"], 1.0, 3.0, "base")
+
+    assert len(decodes) == 1
+    np.testing.assert_array_equal(model.audio, samples[SAMPLE_RATE:3 * SAMPLE_RATE])
+    assert result["segments"] == [{"start": 1.5, "end": 2.0, "text": " hi"}]
+
+    transcription.transcribe_window(analysis["pcm_path"], 3.0, None, "base")
+    assert len(model.audio) == SAMPLE_RATE
@@ -0,0 +1,78 @@
+import numpy as np
+
+from app.utils.vad import SegmentStitcher, find_windows, stitch_segments
+
+SR = 16000
+
+
+def speech_with_silences(seconds, silences):
+    rng = np.random.default_rng(0)
+    samples = rng.uniform(-0.5, 0.5, int(seconds * SR)).astype(np.float32)
+    for start, end in silences:
+        samples[int(start * SR):int(end * SR)] = 0.0
+    return samples
+
+
+def test_short_audio_is_one_window():
+    assert find_windows(np.zeros(10 * SR, dtype=np.float32), target_seconds=60) == [(0.0, 10.0)]
+
+
+def test_cuts_move_to_the_nearest_silence():
+    samples = speech_with_silences(100, [(27.0, 28.0), (61.0, 62.0)])
+    windows = find_windows(samples, target_seconds=30, search_seconds=10)
+    assert windows[0][0] == 0.0 and windows[-1][1] == 100.0
+    assert all(a[1] == b[0] for a, b in zip(windows, windows[1:]))
+    cuts = [end for _, end in windows[:-1]]
+    assert 27.0 <= cuts[0] <= 28.0
+    assert 61.0 <= cuts[1] <= 62.0
+
+
+def test_first_window_can_be_shorter():
+    samples = speech_with_silences(100, [(9.5, 10.5)])
+    windows = find_windows(samples, target_seconds=40, search_seconds=10, first_window_seconds=10)
+    assert 9.5 <= windows[0][1] <= 10.5
+
+
+def test_stitcher_drops_words_repeated_across_windows():
+    stitcher = SegmentStitcher()
+    assert stitcher.add([{"start": 0.0, "end": 4.0, "text": " We agreed on the budget."}])
+    kept = stitcher.add([
+        {"start": 3.5, "end": 6.0, "text": " the budget. Next item is hiring."},
+        {"start": 6.0, "end": 8.0, "text": " Anna leads it."},
+    ])
+    assert kept == [
+        {"start": 4.0, "end": 6.0, "text": " Next item is hiring."},
+        {"start": 6.0, "end": 8.0, "text": " Anna leads it."},
+    ]
+
+
+def test_words_repeated_across_windows_are_dropped():
+    windows = [
+        [{"start": 0.0, "end": 4.0, "text": " We agreed on the budget."}],
+        [
+            {"start": 3.5, "end": 6.0, "text": " the budget. Next item is hiring."},
+            {"start": 6.0, "end": 8.0, "text": " Anna leads it."},
+        ],
+    ]
+    assert stitch_segments(windows)[1:] == [
+        {"start": 4.0, "end": 6.0, "text": " Next item is hiring."},
+        {"start": 6.0, "end": 8.0, "text": " Anna leads it."},
+    ]
+
+
+def test_segments_already_covered_are_dropped():
+    windows = [
+        [{"start": 0.0, "end": 5.0, "text": " Hello."}],
+        [{"start": 4.0, "end": 5.0, "text": " Hello."}, {"start": 5.0, "end": 7.0, "text": " Bye."}],
+    ]
+    assert [seg["text"] for seg in stitch_segments(windows)] == [" Hello.", " Bye."]
+
+
+def test_trimming_applies_when_the_first_segment_is_dropped():
+    stitcher = SegmentStitcher()
+    stitcher.add([{"start": 0.0, "end": 10.0, "text": " Then we moved to the roadmap review."}])
+    kept = stitcher.add([
+        {"start": 8.0, "end": 9.5, "text": " moved to"},
+        {"start": 9.0, "end": 12.0, "text": " the roadmap review. It ships in May."},
+    ])
+    assert kept == [{"start": 10.0, "end": 12.0, "text": " It ships in May."}]
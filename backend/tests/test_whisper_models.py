@@ -0,0 +1,65 @@
+import pytest
+
+from app.whisper_models import ModelRegistry, UnknownModelError, covers, validate_model_name
+
+
+class FakeLoader:
+    def __init__(self, failing=()):
+        self.loads = []
+        self.failing = set(failing)
+
+    def __call__(self, name):
+        self.loads.append(name)
+        if name in self.failing:
+            raise RuntimeError(f"cannot load {name}")
+        return f"model:{name}"
+
+
+def test_models_are_loaded_once():
+    loader = FakeLoader()
+    registry = ModelRegistry(memory_budget_mb=4000, loader=loader)
+    assert registry.get("base") == "model:base"
+    assert registry.get("base") == "model:base"
+    assert loader.loads == ["base"]
+
+
+def test_least_recently_used_model_is_evicted_over_budget():
+    loader = FakeLoader()
+    # tiny 150 + base 300 + small 1000 = 1450 MB
+    registry = ModelRegistry(memory_budget_mb=1500, loader=loader)
+    registry.get("tiny")
+    registry.get("base")
+    registry.get("small")
+    assert registry.loaded() == ["tiny", "base", "small"]
+
+    registry.get("tiny")  # refreshes tiny: base is now the least recently used
+    registry.get("base")
+    assert registry.loaded() == ["small", "tiny", "base"]
+
+    registry.get("medium")  # 3000 MB alone is over budget: everything else goes
+    assert registry.loaded() == ["medium"]
+    registry.get("base")
+    assert registry.loaded() == ["base"]
+
+
+def test_warm_skips_models_that_fail_to_load():
+    loader = FakeLoader(failing={"small"})
+    registry = ModelRegistry(loader=loader)
+    registry.warm(["small", "unknown", "tiny"]).join(timeout=5)
+    assert registry.loaded() == ["tiny"]
+    assert loader.loads == ["small", "tiny"]
+
+
+def test_unknown_model_names_are_rejected():
+    assert validate_model_name("small") == "small"
+    with pytest.raises(UnknownModelError):
+        validate_model_name("large-v9")
+    with pytest.raises(UnknownModelError):
+        ModelRegistry(loader=FakeLoader()).get("large-v9")
+
+
+def test_bigger_models_cover_smaller_requests():
+    assert covers("whisper-small", "base")
+    assert covers("whisper-base", "base")
+    assert not covers("whisper-tiny", "base")
+    assert not covers("whisper-large", "base")
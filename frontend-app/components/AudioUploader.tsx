@@ -4,14 +4,29 @@ import { useCallback, useRef, useState } from 'react'
 import { supabase } from '@/lib/supabaseClient'
 import { canGenerateSummary } from '@/lib/subscriptionHelpers'
 import PaymentModal from './PaymentModal'
+import { readEvents } from '@/lib/sse'
 
 type TranscribeResponse = {
   meeting_id: string
-  transcript_id: string
-  language?: string
-  text?: string
+  job_id: string
+  status: string
 }
 
+type JobResponse = {
+  job_id: string
+  status: 'queued' | 'running' | 'done' | 'failed'
+  meeting_id: string
+  result?: {
+    meeting_id: string
+    transcript_id: string
+    language?: string
+    summary_id?: string
+    summary_error?: string
+  } | null
+  error?: string | null
+}
+
+
 interface AudioUploaderProps {
   onProcessingStart?: () => void
   onProcessingProgress?: (progress: number) => void
@@ -23,6 +38,7 @@ export default function AudioUploader({ onProcessingStart, onProcessingProgress,
   const [isDragging, setIsDragging] = useState(false)
   const [uploading, setUploading] = useState(false)
   const [message, setMessage] = useState<string | null>(null)
+  const [preview, setPreview] = useState<string | null>(null)
   const [generatingSummary, setGeneratingSummary] = useState(false)
   const [showPaymentModal, setShowPaymentModal] = useState(false)
   const [summariesCount, setSummariesCount] = useState(0)
@@ -64,88 +80,57 @@ export default function AudioUploader({ onProcessingStart, onProcessingProgress,
     if (f) onSelectFile(f)
   }
 
-  const generateSummary = async (meetingId: string, token: string) => {
-    try {
-      setGeneratingSummary(true)
-      setMessage("Vérification de l'abonnement...")
-      onProcessingProgress?.(65) // 65% checking subscription
-
-      // Check if user can generate summary
-      const { canGenerate, summariesCount: count } = await canGenerateSummary(token)
-
-      if (!canGenerate) {
-        setSummariesCount(count)
-        setShowPaymentModal(true)
-        setMessage("Transcription terminée ✅ (Passez à Pro pour générer des résumés)")
-        setGeneratingSummary(false)
-        onProcessingComplete?.()
-        return
-      }
-
-      setMessage("Génération du résumé...")
-      onProcessingProgress?.(70) // 70% after transcription
-
-      const apiBase = process.env.NEXT_PUBLIC_API_BASE_URL
-
-      // Get user preferences first
-      const prefsRes = await fetch(`${apiBase}/preferences`, {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      })
-
-      let preferences = {
-        default_format: "structured",
-        default_language: "en",
-        default_detail_level: "medium",
-        auto_generate_summary: true,
-        include_timestamps: true,
-      }
-
-      if (prefsRes.ok) {
-        preferences = await prefsRes.json()
-      }
-
-      onProcessingProgress?.(80) // 80% preferences loaded
-
-      // Only generate if auto_generate_summary is enabled
-      if (!preferences.auto_generate_summary) {
-        setMessage("Transcription terminée ✅")
-        onProcessingComplete?.()
-        return
-      }
+  // Le résumé est généré côté serveur à la fin du job (préférence auto_generate_summary)
+  const finishWithSummary = (result: JobResponse['result'], canGenerate: boolean, count: number) => {
+    if (result?.summary_id) {
+      setMessage("Transcription et résumé terminés ✅")
+      onProcessingProgress?.(100)
+    } else if (!canGenerate) {
+      setSummariesCount(count)
+      setShowPaymentModal(true)
+      setMessage("Transcription terminée ✅ (Passez à Pro pour générer des résumés)")
+    } else if (result?.summary_error) {
+      console.error("Error generating summary:", result.summary_error)
+      setMessage("Transcription terminée ✅ (erreur lors de la génération du résumé)")
+    } else {
+      setMessage("Transcription terminée ✅")
+    }
+    onProcessingComplete?.()
+  }
 
-      // Generate summary
-      const summaryRes = await fetch(`${apiBase}/summarize`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          Authorization: `Bearer ${token}`,
-        },
-        body: JSON.stringify({
-          meeting_id: meetingId,
-          format: preferences.default_format,
-          language: preferences.default_language,
-          detail_level: preferences.default_detail_level,
-          include_timestamps: preferences.include_timestamps,
-        }),
-      })
+  // Suit le job via Server-Sent Events : progression et segments au fil de l'eau
+  const waitForJob = async (apiBase: string, jobId: string, token: string): Promise<JobResponse['result']> => {
+    const res = await fetch(`${apiBase}/jobs/${jobId}/events`, {
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
+    })
+    if (!res.ok || !res.body) {
+      const errText = await res.text()
+      throw new Error(errText || `Erreur HTTP ${res.status}`)
+    }
 
-      if (summaryRes.ok) {
-        setMessage("Transcription et résumé terminés ✅")
-        onProcessingProgress?.(100)
-        onProcessingComplete?.()
-      } else {
-        setMessage("Transcription terminée ✅ (erreur lors de la génération du résumé)")
-        onProcessingComplete?.()
+    for await (const { event, data: payload } of readEvents(res)) {
+      if (event === 'progress') {
+        setMessage(`Transcription en cours… ${payload.percent}%`)
+        // 30% → 60% de la barre globale pendant la transcription
+        onProcessingProgress?.(30 + Math.round(payload.percent * 0.3))
+      } else if (event === 'segments') {
+        const last = payload.segments[payload.segments.length - 1]
+        if (last) setPreview(last.text.trim())
+      } else if (event === 'summarizing') {
+        setUploading(false)
+        setGeneratingSummary(true)
+        setPreview(null)
+        setMessage("Génération du résumé...")
+        onProcessingProgress?.(70)
+      } else if (event === 'done') {
+        return payload
+      } else if (event === 'failed') {
+        throw new Error(payload.error || "La transcription a échoué")
       }
-    } catch (err) {
-      console.error("Error generating summary:", err)
-      setMessage("Transcription terminée ✅ (erreur lors de la génération du résumé)")
-      onProcessingComplete?.()
-    } finally {
-      setGeneratingSummary(false)
     }
+    throw new Error("Connexion interrompue pendant la transcription")
   }
 
   const handleTranscribe = async () => {
@@ -179,8 +164,12 @@ export default function AudioUploader({ onProcessingStart, onProcessingProgress,
         return
       }
 
+      // Les utilisateurs sans abonnement n'ont pas de résumé automatique
+      const { canGenerate, summariesCount: count } = await canGenerateSummary(token)
+
       const form = new FormData()
       form.append('file', file)
+      if (!canGenerate) form.append('auto_summary', 'false')
 
       setMessage("Envoi au serveur…")
       onProcessingProgress?.(20) // 20% uploading
@@ -194,23 +183,30 @@ export default function AudioUploader({ onProcessingStart, onProcessingProgress,
         body: form,
       })
 
+      if (res.status === 429) {
+        const retryAfter = res.headers.get('Retry-After')
+        throw new Error(`Serveur occupé, réessayez dans ${retryAfter || 'quelques'} secondes.`)
+      }
       if (!res.ok) {
         const errText = await res.text()
         throw new Error(errText || `Erreur HTTP ${res.status}`)
       }
 
-      onProcessingProgress?.(60) // 60% transcription complete
       const data: TranscribeResponse = await res.json()
-      setMessage("Transcription terminée ✅")
-      setUploading(false)
+      setMessage("En file d'attente…")
+      onProcessingProgress?.(30) // 30% upload accepted, job queued
 
-      // Generate summary automatically
-      await generateSummary(data.meeting_id, token)
+      const result = await waitForJob(apiBase, data.job_id, token)
+      onProcessingProgress?.(90) // transcription (and summary) complete
+      setPreview(null)
+      finishWithSummary(result, canGenerate, count)
     } catch (err: any) {
       console.error(err)
       setMessage(`Erreur: ${err?.message || "Impossible de lancer la transcription"}`)
-      setUploading(false)
       onProcessingComplete?.()
+    } finally {
+      setUploading(false)
+      setGeneratingSummary(false)
     }
   }
 
@@ -288,6 +284,10 @@ export default function AudioUploader({ onProcessingStart, onProcessingProgress,
         <p className="text-sm text-gray-700">{message}</p>
       )}
 
+      {preview && (uploading || generatingSummary) && (
+        <p className="text-xs text-gray-500 italic truncate">« {preview} »</p>
+      )}
+
       <p className="text-xs text-gray-500">
         Formats acceptés : mp3, m4a, wav, etc. Taille max selon config serveur.
       </p>
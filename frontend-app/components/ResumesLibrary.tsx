@@ -5,11 +5,12 @@ import { supabase } from "@/lib/supabaseClient";
 import SummaryRefinementChat from "./SummaryRefinementChat";
 import { Progress } from "@/components/ui/progress";
 
-interface Summary {
+// List items only carry a preview; the full text is fetched when one is opened
+interface SummaryListItem {
   id: string;
   meeting_id: string;
   title: string;
-  summary_text: string;
+  summary_preview: string;
   format: string;
   language: string;
   detail_level: string;
@@ -17,14 +18,20 @@ interface Summary {
   generation_time_seconds: number;
 }
 
+interface Summary extends SummaryListItem {
+  summary_text: string;
+}
+
 interface ResumesLibraryProps {
   isProcessing?: boolean;
   processingProgress?: number;
 }
 
 export default function ResumesLibrary({ isProcessing = false, processingProgress = 0 }: ResumesLibraryProps) {
-  const [summaries, setSummaries] = useState<Summary[]>([]);
+  const [summaries, setSummaries] = useState<SummaryListItem[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedSummary, setSelectedSummary] = useState<Summary | null>(null);
   const [showChat, setShowChat] = useState(false);
   const [message, setMessage] = useState("");
@@ -34,8 +41,12 @@ export default function ResumesLibrary({ isProcessing = false, processingProgres
     loadSummaries();
   }, []);
 
-  const loadSummaries = async () => {
-    setLoading(true);
+  const loadSummaries = async (cursor?: string) => {
+    if (cursor) {
+      setLoadingMore(true);
+    } else {
+      setLoading(true);
+    }
     setMessage("");
 
     try {
@@ -49,7 +60,10 @@ export default function ResumesLibrary({ isProcessing = false, processingProgres
       }
 
       const apiBaseUrl = process.env.NEXT_PUBLIC_API_BASE_URL || "http://localhost:8000";
-      const response = await fetch(`${apiBaseUrl}/summaries`, {
+      const url = cursor
+        ? `${apiBaseUrl}/summaries?cursor=${encodeURIComponent(cursor)}`
+        : `${apiBaseUrl}/summaries`;
+      const response = await fetch(url, {
         headers: {
           Authorization: `Bearer ${token}`,
         },
@@ -57,7 +71,9 @@ export default function ResumesLibrary({ isProcessing = false, processingProgres
 
       if (response.ok) {
         const data = await response.json();
-        setSummaries(data.summaries || []);
+        const page: SummaryListItem[] = data.summaries || [];
+        setSummaries((prev) => (cursor ? [...prev, ...page] : page));
+        setNextCursor(data.next_cursor ?? null);
       } else {
         const errorText = await response.text();
         console.error("Failed to load summaries:", errorText);
@@ -68,6 +84,7 @@ export default function ResumesLibrary({ isProcessing = false, processingProgres
       setMessage("Cannot connect to backend. Make sure the server is running on http://localhost:8000");
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -86,6 +103,73 @@ export default function ResumesLibrary({ isProcessing = false, processingProgres
     return labels[format] || format;
   };
 
+  const openSummary = async (summaryId: string) => {
+    try {
+      const session = await supabase.auth.getSession();
+      const token = session?.data?.session?.access_token;
+
+      if (!token) {
+        setMessage("Not authenticated");
+        return;
+      }
+
+      const apiBaseUrl = process.env.NEXT_PUBLIC_API_BASE_URL || "http://localhost:8000";
+      const response = await fetch(`${apiBaseUrl}/summaries/${summaryId}`, {
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+      });
+
+      if (response.ok) {
+        setSelectedSummary(await response.json());
+      } else {
+        const errorText = await response.text();
+        console.error("Failed to load summary:", errorText);
+        setMessage(`Failed to load summary: ${response.status}`);
+      }
+    } catch (error) {
+      console.error("Error loading summary:", error);
+      setMessage("Cannot connect to backend");
+    }
+  };
+
+  // Exports need the Authorization header, so they are fetched and saved as a blob
+  const downloadExport = async (path: string, fallbackName: string) => {
+    try {
+      const session = await supabase.auth.getSession();
+      const token = session?.data?.session?.access_token;
+
+      if (!token) {
+        setMessage("Not authenticated");
+        return;
+      }
+
+      const apiBaseUrl = process.env.NEXT_PUBLIC_API_BASE_URL || "http://localhost:8000";
+      const response = await fetch(`${apiBaseUrl}${path}`, {
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+      });
+
+      if (!response.ok) {
+        setMessage(`Export failed: ${response.status}`);
+        return;
+      }
+
+      const disposition = response.headers.get("Content-Disposition") || "";
+      const filename = disposition.match(/filename="([^"]+)"/)?.[1] || fallbackName;
+      const url = URL.createObjectURL(await response.blob());
+      const link = document.createElement("a");
+      link.href = url;
+      link.download = filename;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      console.error("Error exporting:", error);
+      setMessage("Cannot connect to backend");
+    }
+  };
+
   const handleDelete = async (summaryId: string) => {
     try {
       const session = await supabase.auth.getSession();
@@ -154,7 +238,7 @@ export default function ResumesLibrary({ isProcessing = false, processingProgres
       <div className="flex justify-between items-center mb-6">
         <h2 className="text-2xl font-bold text-black">Your Summaries</h2>
         <button
-          onClick={loadSummaries}
+          onClick={() => loadSummaries()}
           className="text-sm text-black hover:text-gray-700 font-medium"
         >
           Refresh
@@ -188,7 +272,7 @@ export default function ResumesLibrary({ isProcessing = false, processingProgres
           >
             <div
               className="cursor-pointer"
-              onClick={() => setSelectedSummary(summary)}
+              onClick={() => openSummary(summary.id)}
             >
               <div className="flex justify-between items-start mb-2">
                 <h3 className="text-lg font-semibold text-black pr-8">{summary.title}</h3>
@@ -200,7 +284,7 @@ export default function ResumesLibrary({ isProcessing = false, processingProgres
                 {formatDate(summary.created_at)}
               </div>
               <div className="text-sm text-gray-700 line-clamp-2">
-                {summary.summary_text.substring(0, 200)}...
+                {summary.summary_preview}...
               </div>
               <div className="flex gap-2 mt-3 text-xs text-gray-600">
                 <span className="bg-gray-100 px-2 py-1 rounded">
@@ -242,6 +326,18 @@ export default function ResumesLibrary({ isProcessing = false, processingProgres
         ))}
       </div>
 
+      {nextCursor && (
+        <div className="text-center">
+          <button
+            onClick={() => loadSummaries(nextCursor)}
+            disabled={loadingMore}
+            className="text-sm text-black hover:text-gray-700 font-medium disabled:text-gray-400"
+          >
+            {loadingMore ? "Loading..." : "Load more"}
+          </button>
+        </div>
+      )}
+
       {/* Summary Detail Modal */}
       {selectedSummary && (
         <div className="fixed inset-0 bg-black/50 flex items-center justify-center z-50 p-4">
@@ -304,7 +400,7 @@ export default function ResumesLibrary({ isProcessing = false, processingProgres
                       setSummaries(
                         summaries.map((s) =>
                           s.id === selectedSummary.id
-                            ? { ...s, summary_text: newSummary }
+                            ? { ...s, summary_preview: newSummary.substring(0, 200) }
                             : s
                         )
                       );
@@ -331,6 +427,32 @@ export default function ResumesLibrary({ isProcessing = false, processingProgres
               >
                 Copy to Clipboard
               </button>
+              <select
+                value=""
+                onChange={(e) => {
+                  const [kind, format] = e.target.value.split(":");
+                  if (!format) return;
+                  const path = kind === "summary"
+                    ? `/summaries/${selectedSummary.id}/export?format=${format}`
+                    : `/meetings/${selectedSummary.meeting_id}/export?format=${format}`;
+                  downloadExport(path, `${selectedSummary.title}.${format}`);
+                }}
+                className="bg-gray-200 hover:bg-gray-300 text-black font-medium py-2 px-4 rounded-lg transition-colors"
+              >
+                <option value="">Export…</option>
+                <optgroup label="Summary">
+                  <option value="summary:md">Markdown</option>
+                  <option value="summary:docx">Word (.docx)</option>
+                  <option value="summary:pdf">PDF</option>
+                </optgroup>
+                <optgroup label="Transcript">
+                  <option value="transcript:srt">Subtitles (.srt)</option>
+                  <option value="transcript:vtt">WebVTT (.vtt)</option>
+                  <option value="transcript:txt">Text</option>
+                  <option value="transcript:docx">Word (.docx)</option>
+                  <option value="transcript:pdf">PDF</option>
+                </optgroup>
+              </select>
               <button
                 onClick={() => {
                   setSelectedSummary(null);
@@ -2,6 +2,7 @@
 
 import { useState, useRef, useEffect } from "react";
 import { supabase } from "@/lib/supabaseClient";
+import { readEvents } from "@/lib/sse";
 
 interface Message {
   role: "user" | "assistant";
@@ -27,7 +28,11 @@ export default function SummaryRefinementChat({
   ]);
   const [input, setInput] = useState("");
   const [loading, setLoading] = useState(false);
+  const [streaming, setStreaming] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  // The conversation is kept server-side; the history is only resent if that session expired
+  const sessionId = useRef(crypto.randomUUID());
+  const sessionTurns = useRef(0);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -62,26 +67,54 @@ export default function SummaryRefinementChat({
       }
 
       const apiBaseUrl = process.env.NEXT_PUBLIC_API_BASE_URL || "http://localhost:8000";
-      const response = await fetch(`${apiBaseUrl}/refine-summary`, {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-          Authorization: `Bearer ${token}`,
-        },
-        body: JSON.stringify({
-          summary_id: summaryId,
-          user_message: userMessage,
-          chat_history: messages.slice(1), // Exclude the initial greeting
-        }),
-      });
+      const refine = (withHistory: boolean) =>
+        fetch(`${apiBaseUrl}/refine-summary/stream`, {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+            Authorization: `Bearer ${token}`,
+          },
+          body: JSON.stringify({
+            summary_id: summaryId,
+            user_message: userMessage,
+            session_id: sessionId.current,
+            session_turns: sessionTurns.current,
+            chat_history: withHistory ? messages.slice(1) : [], // Exclude the initial greeting
+          }),
+        });
+
+      let response = await refine(false);
+      if (response.status === 409) {
+        // Server-side session expired: reseed it with the history
+        response = await refine(true);
+      }
 
       if (!response.ok) {
         throw new Error("Failed to refine summary");
       }
 
-      const data = await response.json();
+      // Show the answer as it is generated
+      let text = "";
+      let data: any = null;
+      for await (const { event, data: payload } of readEvents(response)) {
+        if (event === "token") {
+          text += payload.text;
+          setStreaming(true);
+          setMessages([...newMessages, { role: "assistant", content: text }]);
+        } else if (event === "done") {
+          data = payload;
+          break;
+        } else if (event === "error") {
+          throw new Error(payload.detail);
+        }
+      }
+      if (!data) {
+        throw new Error("Connection closed before the answer was complete");
+      }
+
+      sessionTurns.current = data.session_turns ?? sessionTurns.current + 1;
 
-      // Add assistant response
+      // Final assistant response (cleaned up if it is a refined summary)
       setMessages([
         ...newMessages,
         { role: "assistant", content: data.assistant_message },
@@ -102,6 +135,7 @@ export default function SummaryRefinementChat({
       ]);
     } finally {
       setLoading(false);
+      setStreaming(false);
     }
   };
 
@@ -142,7 +176,7 @@ export default function SummaryRefinementChat({
             </div>
           </div>
         ))}
-        {loading && (
+        {loading && !streaming && (
           <div className="flex justify-start">
             <div className="bg-slate-700 rounded-lg px-4 py-2">
               <div className="flex space-x-2">
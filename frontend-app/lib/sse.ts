@@ -0,0 +1,31 @@
+export interface ServerSentEvent {
+  event: string
+  data: any
+}
+
+// Parse a fetch() response body as Server-Sent Events (EventSource can't send an Authorization header)
+export async function* readEvents(res: Response): AsyncGenerator<ServerSentEvent> {
+  if (!res.body) return
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  try {
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) return
+      buffer += decoder.decode(value, { stream: true })
+
+      let sep
+      while ((sep = buffer.indexOf('\n\n')) !== -1) {
+        const raw = buffer.slice(0, sep)
+        buffer = buffer.slice(sep + 2)
+        const event = raw.match(/^event: (.*)$/m)?.[1]
+        const data = raw.match(/^data: (.*)$/m)?.[1]
+        if (!event || !data) continue // keep-alive comments
+        yield { event, data: JSON.parse(data) }
+      }
+    }
+  } finally {
+    reader.cancel().catch(() => {})
+  }
+}